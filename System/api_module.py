@@ -1,27 +1,91 @@
-from flask import Flask, request, jsonify
-from database import Database
-import json
+from functools import wraps
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
+from cache_module import month_scopes, version_etag
+from database_module import Database, DEFAULT_PAGE_SIZE, SEARCH_LIMIT, SEARCH_SCOPES
+from job_module import JobRunner
+from journal_module import CHANGES_LIMIT
+from serialization_module import (FastJSONProvider, compress_response, dumps, etag_variants,
+                                   format_report, format_rows)
 import base64
+from urllib.parse import quote
 import io
 import pandas as pd
 from datetime import datetime, timedelta
 import calendar
 from excel_handler import ExcelHandler
 
+# 可缓存的GET响应：客户端可以保存，但每次使用前都要带 If-None-Match 重新验证
+CACHE_CONTROL = 'private, no-cache'
+
+
 class APIServer:
     def __init__(self):
         """初始化API服务器"""
         self.app = Flask(__name__)
+        # orjson（未安装时为标准库 json）序列化，较大的 JSON 响应按 Accept-Encoding 压缩
+        self.app.json = FastJSONProvider(self.app)
+        self.app.after_request(lambda response: compress_response(response, request))
         self.db = Database()
         self.excel_handler = ExcelHandler(self.db)
+        # Excel 导出、导入作为后台任务执行，客户端轮询 /api/jobs/<job_id>
+        self.jobs = JobRunner({
+            'export_monthly_summary': self.excel_handler.export_monthly_summary,
+            'export_daily_summary': self.excel_handler.export_daily_summary,
+            'import_records': self._import_records
+        })
         self.setup_routes()
     
+    def _import_records(self, file_content: str, progress):
+        """导入任务：file_content 为 Base64 编码的 Excel 文件"""
+        return self.excel_handler.import_records(base64.b64decode(file_content), progress)
+    
+    def conditional(self, scopes, tag=None):
+        """
+        条件GET装饰器：按响应依赖范围的数据版本号生成强 ETag，
+        If-None-Match 命中时只读取版本号，直接返回 304，不执行查询和序列化
+        
+        Args:
+            scopes: 接收路由参数、返回版本范围列表的函数
+            tag: 接收路由参数、返回附加标识的函数，用于响应取决于请求之外的
+                 条件（如省略日期时的今天）的路由，附加标识变化时 ETag 随之变化
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = request.full_path
+                if tag is not None:
+                    key += '|' + tag(*args, **kwargs)
+                etag = version_etag(key, self.db.get_data_versions(scopes(*args, **kwargs)))
+                # 客户端缓存的可能是压缩表示，其 ETag 带编码后缀
+                matched = next((tag for tag in etag_variants(etag)
+                                if request.if_none_match.contains(tag)), None)
+                
+                if matched:
+                    response = Response(status=304)
+                    etag = matched
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = CACHE_CONTROL
+                return response
+            return wrapper
+        return decorator
+    
     def setup_routes(self):
         """设置API路由"""
         
+        def record_scopes(*args, **kwargs):
+            """工资记录类响应依赖的版本范围（记录中包含员工姓名、花型名称）"""
+            return month_scopes(request.args.get('start_date'),
+                                request.args.get('end_date')) + ['employees', 'patterns']
+        
         # ==================== 员工管理API ====================
         
         @self.app.route('/api/employees', methods=['GET'])
+        @self.conditional(lambda: ['employees'])
         def get_employees():
             """获取员工列表"""
             search = request.args.get('search', '')
@@ -33,6 +97,11 @@ class APIServer:
                     'success': True,
                     'data': employees
                 })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
             except Exception as e:
                 return jsonify({
                     'success': False,
@@ -85,6 +154,7 @@ class APIServer:
         # ==================== 花型管理API ====================
         
         @self.app.route('/api/patterns', methods=['GET'])
+        @self.conditional(lambda: ['patterns'])
         def get_patterns():
             """获取花型列表"""
             search = request.args.get('search', '')
@@ -96,6 +166,11 @@ class APIServer:
                     'success': True,
                     'data': patterns
                 })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
             except Exception as e:
                 return jsonify({
                     'success': False,
@@ -135,7 +210,7 @@ class APIServer:
         
         @self.app.route('/api/patterns/<int:pattern_id>', methods=['PUT'])
         def update_pattern(pattern_id):
-            """更新花型信息"""
+            """更新花型信息，可选 effective_from 指定新单价的生效日期"""
             data = request.get_json()
             
             if not data or not data.get('name') or not data.get('price'):
@@ -157,10 +232,96 @@ class APIServer:
                     'message': '花型单价格式错误'
                 }), 400
             
+            # effective_from 可选：新单价自该日起生效，为空时自今天起生效
             result = self.db.update_pattern(
                 pattern_id=pattern_id,
                 name=data['name'],
-                price=price
+                price=price,
+                effective_from=data.get('effective_from')
+            )
+            
+            return jsonify(result)
+        
+        @self.app.route('/api/patterns/<int:pattern_id>/prices', methods=['GET'])
+        @self.conditional(lambda pattern_id: ['patterns'])
+        def get_pattern_prices(pattern_id):
+            """获取花型单价历史"""
+            try:
+                prices = self.db.get_pattern_prices(pattern_id)
+                return jsonify({
+                    'success': True,
+                    'data': prices
+                })
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'message': f'获取单价历史失败: {str(e)}'
+                }), 500
+        
+        @self.app.route('/api/patterns/<int:pattern_id>/prices', methods=['POST'])
+        def set_pattern_price(pattern_id):
+            """设置花型自某日起生效的单价"""
+            data = request.get_json()
+            
+            if not data or not data.get('price') or not data.get('effective_from'):
+                return jsonify({
+                    'success': False,
+                    'message': '单价和生效日期不能为空'
+                }), 400
+            
+            try:
+                price = float(data['price'])
+                if price <= 0:
+                    return jsonify({
+                        'success': False,
+                        'message': '花型单价必须大于0'
+                    }), 400
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'message': '花型单价格式错误'
+                }), 400
+            
+            result = self.db.set_pattern_price(
+                pattern_id=pattern_id,
+                price=price,
+                effective_from=data['effective_from']
+            )
+            
+            return jsonify(result)
+        
+        @self.app.route('/api/patterns/<int:pattern_id>/reprice', methods=['POST'])
+        def reprice_pattern_records(pattern_id):
+            """
+            按每条记录日期生效的花型单价重算历史记录金额，dry_run 为真时只预览
+            
+            请求体可同时给出 price 和 effective_from：在同一事务中先设置自该日起生效的单价再重算，
+            未给出 start_date 时从 effective_from 开始
+            """
+            data = request.get_json(silent=True) or {}
+            
+            price = data.get('price')
+            if price is not None:
+                try:
+                    price = float(price)
+                    if price <= 0:
+                        return jsonify({
+                            'success': False,
+                            'message': '花型单价必须大于0'
+                        }), 400
+                except (TypeError, ValueError):
+                    return jsonify({
+                        'success': False,
+                        'message': '花型单价格式错误'
+                    }), 400
+            
+            result = self.db.reprice_pattern_records(
+                pattern_id=pattern_id,
+                start_date=data.get('start_date'),
+                end_date=data.get('end_date'),
+                dry_run=bool(data.get('dry_run', False)),
+                price=price,
+                effective_from=data.get('effective_from')
             )
             
             return jsonify(result)
@@ -174,6 +335,7 @@ class APIServer:
         # ==================== 工资记录管理API ====================
         
         @self.app.route('/api/records', methods=['GET'])
+        @self.conditional(record_scopes)
         def get_records():
             """获取工资记录列表"""
             employee_id = request.args.get('employee_id', type=int)
@@ -181,7 +343,356 @@ class APIServer:
             start_date = request.args.get('start_date')
             end_date = request.args.get('end_date')
             order_by = request.args.get('order_by', 'record_date DESC')
+            # format=columnar 时按列返回，员工名、花型名字典编码
+            response_format = request.args.get('format', 'rows')
+            
+            # 携带 limit 或 cursor 参数时按 (record_date, id) 键集分页返回
+            if 'limit' in request.args or 'cursor' in request.args:
+                try:
+                    page = self.db.get_records_page(
+                        employee_id=employee_id,
+                        pattern_id=pattern_id,
+                        start_date=start_date,
+                        end_date=end_date,
+                        cursor=request.args.get('cursor'),
+                        limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+                        with_total=request.args.get('with_total', '').lower() in ('1', 'true')
+                    )
+                    return jsonify({
+                        'success': True,
+                        'data': format_rows(page['records'], response_format),
+                        'next_cursor': page['next_cursor'],
+                        'total': page['total']
+                    })
+                except ValueError as e:
+                    return jsonify({
+                        'success': False,
+                        'message': str(e)
+                    }), 400
+                except Exception as e:
+                    return jsonify({
+                        'success': False,
+                        'message': f'获取工资记录失败: {str(e)}'
+                    }), 500
             
             try:
                 records = self.db.get_records(
-                    employee_id=
\ No newline at end of file
+                    employee_id=employee_id,
+                    pattern_id=pattern_id,
+                    start_date=start_date,
+                    end_date=end_date,
+                    order_by=order_by
+                )
+                return jsonify({
+                    'success': True,
+                    'data': format_rows(records, response_format)
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'message': f'获取工资记录失败: {str(e)}'
+                }), 500
+    
+        @self.app.route('/api/records/bulk', methods=['POST'])
+        def add_records_bulk():
+            """批量添加工资记录"""
+            data = request.get_json()
+            rows = data.get('records') if isinstance(data, dict) else data
+            
+            if not isinstance(rows, list) or not rows:
+                return jsonify({
+                    'success': False,
+                    'message': '工资记录列表不能为空'
+                }), 400
+            
+            result = self.db.add_records_bulk(rows)
+            return jsonify(result)
+        
+        @self.app.route('/api/records/bulk', methods=['PUT'])
+        def update_records_bulk():
+            """按筛选条件批量修改工资记录"""
+            data = request.get_json()
+            
+            if not data or not data.get('filter') or not data.get('changes'):
+                return jsonify({
+                    'success': False,
+                    'message': '筛选条件和修改内容不能为空'
+                }), 400
+            
+            result = self.db.update_records_by_filter(data['filter'], data['changes'])
+            return jsonify(result)
+        
+        @self.app.route('/api/records/bulk', methods=['DELETE'])
+        def delete_records_bulk():
+            """按筛选条件批量删除工资记录"""
+            data = request.get_json()
+            
+            if not data or not data.get('filter'):
+                return jsonify({
+                    'success': False,
+                    'message': '筛选条件不能为空'
+                }), 400
+            
+            result = self.db.delete_records_by_filter(data['filter'])
+            return jsonify(result)
+        
+        @self.app.route('/api/records/stream', methods=['GET'])
+        def stream_records():
+            """以 JSON Lines 流式导出工资记录，每行一条记录"""
+            records = self.db.iter_records(
+                employee_id=request.args.get('employee_id', type=int),
+                pattern_id=request.args.get('pattern_id', type=int),
+                start_date=request.args.get('start_date'),
+                end_date=request.args.get('end_date')
+            )
+            
+            def generate():
+                for record in records:
+                    yield dumps(record) + b'\n'
+            
+            return Response(
+                stream_with_context(generate()),
+                mimetype='application/x-ndjson'
+            )
+    
+        # ==================== 统计报表API ====================
+        
+        def dashboard_date():
+            """工作台统计的日期，date 为空时为今天"""
+            return request.args.get('date') or datetime.now().strftime('%Y-%m-%d')
+        
+        # 省略 date 时响应取决于当天日期，日期写入 ETag，跨天后即使没有写入也不会返回 304
+        @self.app.route('/api/dashboard', methods=['GET'])
+        @self.conditional(lambda: [dashboard_date()[:7], 'employees', 'patterns'], tag=dashboard_date)
+        def get_dashboard_stats():
+            """获取工作台统计，date 为空时为今天"""
+            try:
+                stats = self.db.get_dashboard_stats(request.args.get('date'))
+                return jsonify({
+                    'success': True,
+                    'data': stats
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'message': f'获取工作台统计失败: {str(e)}'
+                }), 500
+        
+        @self.app.route('/api/reports/rollup', methods=['GET'])
+        @self.conditional(record_scopes)
+        def get_rollup_report():
+            """获取日期区间的多级汇总（日×员工×花型、员工、花型、日及总计）"""
+            try:
+                report = self.db.get_rollup_report(
+                    request.args.get('start_date'),
+                    request.args.get('end_date'),
+                    source=request.args.get('source', 'daily_totals')
+                )
+                return jsonify({
+                    'success': True,
+                    'data': format_report(report, request.args.get('format', 'rows'))
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'message': f'获取汇总报表失败: {str(e)}'
+                }), 500
+        
+        # ==================== 全文搜索API ====================
+        
+        @self.app.route('/api/search', methods=['GET'])
+        @self.conditional(lambda: ['records', 'employees', 'patterns'])
+        def search():
+            """在员工、花型、工资记录备注和特殊标记中搜索"""
+            scopes = request.args.get('scope')
+            
+            try:
+                results = self.db.search(
+                    request.args.get('q', ''),
+                    limit=request.args.get('limit', SEARCH_LIMIT, type=int),
+                    scopes=scopes.split(',') if scopes else SEARCH_SCOPES
+                )
+                return jsonify({
+                    'success': True,
+                    'data': results
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'message': f'搜索失败: {str(e)}'
+                }), 500
+        
+        # ==================== 变更日志API ====================
+        
+        @self.app.route('/api/changes', methods=['GET'])
+        def get_changes_since():
+            """获取变更ID之后的增量，since 为空时只返回当前变更ID"""
+            try:
+                changes = self.db.get_changes_since(
+                    request.args.get('since', type=int),
+                    request.args.get('limit', CHANGES_LIMIT, type=int)
+                )
+                return jsonify({
+                    'success': True,
+                    'data': changes
+                })
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'message': f'获取变更失败: {str(e)}'
+                }), 500
+        
+        # ==================== 备份管理API ====================
+        
+        @self.app.route('/api/admin/backups', methods=['GET'])
+        def list_backups():
+            """获取现有备份（按时间倒序）"""
+            return jsonify({
+                'success': True,
+                'data': self.db.list_backups()
+            })
+        
+        @self.app.route('/api/admin/backups', methods=['POST'])
+        def create_backup():
+            """立即在线备份主库及归档库"""
+            return jsonify(self.db.create_backup())
+        
+        @self.app.route('/api/admin/backups/<name>/verify', methods=['POST'])
+        def verify_backup(name):
+            """重新校验备份的完整性"""
+            return jsonify(self.db.verify_backup(name))
+        
+        @self.app.route('/api/admin/backups/<name>/restore', methods=['POST'])
+        def restore_backup(name):
+            """用备份恢复数据，恢复前自动备份当前数据"""
+            return jsonify(self.db.restore_backup(name))
+        
+        # ==================== 后台任务API ====================
+        
+        @self.app.route('/api/jobs', methods=['GET'])
+        def list_jobs():
+            """获取保留中的后台任务"""
+            return jsonify({
+                'success': True,
+                'data': self.jobs.list_jobs()
+            })
+        
+        @self.app.route('/api/jobs', methods=['POST'])
+        def start_job():
+            """提交后台任务，请求体为 {"kind": 任务类型, "params": 参数}"""
+            data = request.get_json(silent=True) or {}
+            try:
+                job = self.jobs.submit(data.get('kind'), data.get('params'))
+                return jsonify({
+                    'success': True,
+                    'data': job
+                }), 202
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            except RuntimeError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 503
+        
+        @self.app.route('/api/jobs/<job_id>', methods=['GET'])
+        def get_job_status(job_id):
+            """获取后台任务的状态、进度，结束后附带结果（不含文件内容，文件经 download 下载）"""
+            try:
+                return jsonify({
+                    'success': True,
+                    'data': self.jobs.get_status(job_id)
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 404
+        
+        @self.app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+        def cancel_job(job_id):
+            """取消后台任务，运行中的任务在下一个进度检查点停止"""
+            try:
+                return jsonify({
+                    'success': True,
+                    'data': self.jobs.cancel(job_id)
+                })
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 404
+        
+        @self.app.route('/api/jobs/<job_id>/download', methods=['GET'])
+        def download_job_result(job_id):
+            """下载已完成的导出任务生成的文件，文件只能下载一次，之后由任务释放"""
+            try:
+                job = self.jobs.get_status(job_id, take_file=True)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 404
+            
+            data = (job['result'] or {}).get('data') or {}
+            if data.get('file_released'):
+                return jsonify({
+                    'success': False,
+                    'message': '文件已下载'
+                }), 410
+            if 'file_content' not in data:
+                return jsonify({
+                    'success': False,
+                    'message': '任务未完成或没有生成文件'
+                }), 409
+            
+            response = make_response(base64.b64decode(data['file_content']))
+            response.mimetype = data['content_type']
+            response.headers['Content-Disposition'] = \
+                f"attachment; filename*=UTF-8''{quote(data['filename'])}"
+            return response
+        
+        # ==================== 监控API ====================
+        
+        @self.app.route('/api/stats/cache', methods=['GET'])
+        def get_cache_stats():
+            """获取报表缓存命中统计"""
+            return jsonify({
+                'success': True,
+                'data': self.db.cache_stats()
+            })
+    
+    def run(self, host: str = '0.0.0.0', port: int = 5000, debug: bool = False):
+        """启动API服务器，退出时关闭数据库连接池"""
+        try:
+            self.app.run(host=host, port=port, debug=debug, threaded=True)
+        finally:
+            self.close()
+    
+    def close(self):
+        """停止后台任务并关闭API服务器持有的数据库连接"""
+        self.jobs.shutdown()
+        self.db.close()
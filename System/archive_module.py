@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工资记录按月归档
+
+已结束月份的工资记录可以从主库 records 表移入按年份划分的归档库
+（主库同目录下 archive/<主库名>_<年份>.db），主库只保留近期记录：
+    - daily_totals 日汇总和 archived_months 月合计仍留在主库，
+      日报、月报、区间报表照常读取主库，不需要打开归档库
+    - 明细查询（get_records 等）跨越已归档月份时，按需 ATTACH 对应年份的归档库，
+      用 records_source() 生成的 UNION ALL 子查询代替 records 表
+    - 归档记录不再出现在全文搜索中，也不能按ID修改或删除，需要时先 restore_month 恢复
+    - 归档和恢复在变更日志中追加 'reset' 标记，客户端整表重新加载工资记录
+
+主库为WAL模式时，跨库事务只保证每个文件各自原子；
+归档和恢复都按主键 INSERT OR REPLACE，中途失败后重新执行即可收敛。
+
+用法：
+    python archive_module.py [数据库路径] [截止月份YYYY-MM]    # 归档截止月份之前的全部月份
+"""
+
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterator, List, Optional
+
+from journal_module import append_reset
+
+
+ARCHIVED_MONTHS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS archived_months (
+        month TEXT PRIMARY KEY,
+        year INTEGER NOT NULL,
+        record_count INTEGER NOT NULL DEFAULT 0,
+        total_count INTEGER NOT NULL DEFAULT 0,
+        total_amount REAL NOT NULL DEFAULT 0,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# 归档库的 records 表与主库列顺序相同，保留原记录ID
+ARCHIVE_RECORDS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS {alias}.records (
+        id INTEGER PRIMARY KEY,
+        employee_id INTEGER NOT NULL,
+        pattern_id INTEGER NOT NULL,
+        record_date DATE NOT NULL,
+        count INTEGER NOT NULL,
+        total REAL NOT NULL,
+        special TEXT DEFAULT '',
+        note TEXT DEFAULT '',
+        create_time TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS {alias}.idx_records_date
+    ON records (record_date)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS {alias}.idx_records_employee_date
+    ON records (employee_id, record_date)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS {alias}.idx_records_pattern_date
+    ON records (pattern_id, record_date)
+    ''',
+]
+
+RECORD_FIELDS = 'id, employee_id, pattern_id, record_date, count, total, special, note, create_time'
+
+ARCHIVE_DIR = 'archive'
+
+
+def archive_path(db_path: str, year: int) -> str:
+    """
+    某年份归档库的文件路径
+
+    Args:
+        db_path: 主库路径
+        year: 年份
+
+    Returns:
+        主库同目录下 archive/<主库名>_<年份>.db
+    """
+    directory, filename = os.path.split(os.path.abspath(db_path))
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, ARCHIVE_DIR, f"{stem}_{year}.db")
+
+
+def archive_alias(year: int) -> str:
+    """归档库 ATTACH 后的库名"""
+    return f"archive_{int(year)}"
+
+
+def validate_month(month: str) -> str:
+    """
+    校验月份格式
+
+    Args:
+        month: YYYY-MM
+
+    Returns:
+        规范化后的月份
+
+    Raises:
+        ValueError: 格式错误
+    """
+    try:
+        year, month_number = str(month).split('-')
+        return date(int(year), int(month_number), 1).strftime('%Y-%m')
+    except (TypeError, ValueError):
+        raise ValueError("月份格式错误，应为 YYYY-MM")
+
+
+def month_range(month: str) -> tuple:
+    """月份的 [开始日期, 下月第一天) 区间"""
+    year, month_number = int(month[:4]), int(month[5:7])
+    next_year, next_month = (year + 1, 1) if month_number == 12 else (year, month_number + 1)
+    return f"{year}-{month_number:02d}-01", f"{next_year}-{next_month:02d}-01"
+
+
+def archived_years(cursor: sqlite3.Cursor, start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> List[int]:
+    """
+    日期范围内有已归档月份的年份
+
+    Args:
+        cursor: 主库游标
+        start_date: 开始日期（含），为空时不限
+        end_date: 结束日期（含），为空时不限
+
+    Returns:
+        升序的年份列表
+    """
+    cursor.execute('''
+        SELECT DISTINCT year FROM archived_months
+        WHERE month >= substr(?, 1, 7) AND month <= substr(?, 1, 7)
+        ORDER BY year
+    ''', (start_date or '0000-00', end_date or '9999-99'))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def check_not_archived(cursor: sqlite3.Cursor, start_date: Optional[str] = None,
+                       end_date: Optional[str] = None):
+    """
+    按日期范围批量修改工资记录前，确认范围内没有已归档月份
+
+    归档记录不在主库 records 表中，范围跨越已归档月份时批量修改只会改到其中一部分，
+    因此整体拒绝，由用户先恢复相应月份。
+
+    Args:
+        cursor: 主库游标
+        start_date: 开始日期（含），为空时不限
+        end_date: 结束日期（含），为空时不限
+
+    Raises:
+        ValueError: 范围内有已归档月份
+    """
+    cursor.execute('''
+        SELECT month FROM archived_months
+        WHERE month >= substr(?, 1, 7) AND month <= substr(?, 1, 7)
+        ORDER BY month
+    ''', (start_date or '0000-00', end_date or '9999-99'))
+    months = [row[0] for row in cursor.fetchall()]
+    if months:
+        raise ValueError(f"{'、'.join(months)} 已归档，请先恢复")
+
+
+def records_source(years: List[int]) -> str:
+    """
+    查询语句中代替 records 表的数据源
+
+    Args:
+        years: 已 ATTACH 的归档年份
+
+    Returns:
+        没有归档年份时为 'records'，否则为主库与各归档库 records 的 UNION ALL 子查询
+    """
+    if not years:
+        return 'records'
+
+    parts = [f"SELECT {RECORD_FIELDS} FROM main.records"]
+    parts += [f"SELECT {RECORD_FIELDS} FROM {archive_alias(year)}.records" for year in years]
+    return '(' + ' UNION ALL '.join(parts) + ')'
+
+
+@contextmanager
+def attach_archives(conn: sqlite3.Connection, db_path: str, years: List[int]) -> Iterator[str]:
+    """
+    在连接上临时 ATTACH 归档库，退出时 DETACH
+
+    Args:
+        conn: 不在事务中的连接
+        db_path: 主库路径
+        years: 归档年份
+
+    Returns:
+        records_source(years)
+
+    Raises:
+        ValueError: 年份数超过 SQLite 可同时 ATTACH 的库数
+        FileNotFoundError: 归档库文件不存在
+    """
+    if len(years) > conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+        raise ValueError("查询跨越的归档年份过多，请缩小日期范围")
+
+    attached = []
+    try:
+        for year in years:
+            path = archive_path(db_path, year)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"归档库不存在: {path}")
+            conn.execute(f"ATTACH DATABASE ? AS {archive_alias(year)}", (path,))
+            attached.append(year)
+
+        yield records_source(years)
+
+    finally:
+        for year in attached:
+            conn.execute(f"DETACH DATABASE {archive_alias(year)}")
+
+
+def _snapshot_daily_totals(cursor: sqlite3.Cursor, start: str, end: str):
+    """保存月份内的日汇总，records 增删触发的增减在移动完成后用它还原"""
+    cursor.execute("DROP TABLE IF EXISTS temp.archive_daily_totals")
+    cursor.execute('''
+        CREATE TEMP TABLE archive_daily_totals AS
+        SELECT * FROM main.daily_totals WHERE record_date >= ? AND record_date < ?
+    ''', (start, end))
+
+
+def _restore_daily_totals(cursor: sqlite3.Cursor, start: str, end: str):
+    """用快照还原月份内的日汇总"""
+    cursor.execute("DELETE FROM main.daily_totals WHERE record_date >= ? AND record_date < ?",
+                   (start, end))
+    cursor.execute("INSERT INTO main.daily_totals SELECT * FROM temp.archive_daily_totals")
+    cursor.execute("DROP TABLE temp.archive_daily_totals")
+
+
+def archive_month(conn: sqlite3.Connection, db_path: str, month: str) -> Dict:
+    """
+    把一个已结束月份的工资记录移入对应年份的归档库
+
+    Args:
+        conn: 写连接，不在事务中
+        db_path: 主库路径
+        month: 月份（YYYY-MM）
+
+    Returns:
+        {'month', 'archived': 本次移动的记录数, 'archive_file'}
+
+    Raises:
+        ValueError: 月份格式错误或尚未结束
+    """
+    month = validate_month(month)
+    if month >= date.today().strftime('%Y-%m'):
+        raise ValueError("只能归档已结束的月份")
+
+    year = int(month[:4])
+    alias = archive_alias(year)
+    path = archive_path(db_path, year)
+    start, end = month_range(month)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+
+    try:
+        cursor = conn.cursor()
+        for sql in ARCHIVE_RECORDS_SCHEMA:
+            cursor.execute(sql.format(alias=alias))
+
+        cursor.execute("BEGIN IMMEDIATE")
+        _snapshot_daily_totals(cursor, start, end)
+
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO {alias}.records ({RECORD_FIELDS})
+            SELECT {RECORD_FIELDS} FROM main.records
+            WHERE record_date >= ? AND record_date < ?
+        ''', (start, end))
+        moved = cursor.rowcount
+
+        cursor.execute("DELETE FROM main.records WHERE record_date >= ? AND record_date < ?",
+                       (start, end))
+        _restore_daily_totals(cursor, start, end)
+        # 逐行的删除墓碑不代表记录被删除，通知客户端重新加载工资记录
+        append_reset(cursor, ('records',))
+
+        # 月合计按日汇总计算，包含此前已归档的部分
+        cursor.execute('''
+            INSERT INTO archived_months (month, year, record_count, total_count, total_amount)
+            SELECT ?, ?, COALESCE(SUM(record_count), 0), COALESCE(SUM(total_count), 0),
+                   COALESCE(SUM(total_amount), 0)
+            FROM daily_totals WHERE record_date >= ? AND record_date < ?
+            ON CONFLICT (month) DO UPDATE SET
+                record_count = excluded.record_count,
+                total_count = excluded.total_count,
+                total_amount = excluded.total_amount,
+                archived_at = CURRENT_TIMESTAMP
+        ''', (month, year, start, end))
+
+        conn.commit()
+        return {'month': month, 'archived': moved, 'archive_file': path}
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute(f"DETACH DATABASE {alias}")
+
+
+def restore_month(conn: sqlite3.Connection, db_path: str, month: str) -> Dict:
+    """
+    把已归档月份的工资记录移回主库
+
+    Args:
+        conn: 写连接，不在事务中
+        db_path: 主库路径
+        month: 月份（YYYY-MM）
+
+    Returns:
+        {'month', 'restored': 移回的记录数}
+
+    Raises:
+        ValueError: 月份格式错误或未归档
+    """
+    month = validate_month(month)
+    cursor = conn.cursor()
+    cursor.execute("SELECT year FROM archived_months WHERE month = ?", (month,))
+    if cursor.fetchone() is None:
+        raise ValueError("该月份未归档")
+
+    year = int(month[:4])
+    alias = archive_alias(year)
+    start, end = month_range(month)
+
+    with attach_archives(conn, db_path, [year]):
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            _snapshot_daily_totals(cursor, start, end)
+
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO main.records ({RECORD_FIELDS})
+                SELECT {RECORD_FIELDS} FROM {alias}.records
+                WHERE record_date >= ? AND record_date < ?
+            ''', (start, end))
+            restored = cursor.rowcount
+
+            cursor.execute(f"DELETE FROM {alias}.records WHERE record_date >= ? AND record_date < ?",
+                           (start, end))
+            _restore_daily_totals(cursor, start, end)
+            append_reset(cursor, ('records',))
+            cursor.execute("DELETE FROM archived_months WHERE month = ?", (month,))
+
+            conn.commit()
+            return {'month': month, 'restored': restored}
+
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def archivable_months(cursor: sqlite3.Cursor, before_month: str) -> List[str]:
+    """
+    主库中早于 before_month 且仍有记录的月份
+
+    Args:
+        cursor: 主库游标
+        before_month: 截止月份（不含）
+
+    Returns:
+        升序的月份列表
+    """
+    cursor.execute('''
+        SELECT DISTINCT substr(record_date, 1, 7) FROM main.records
+        WHERE record_date < ?
+        ORDER BY 1
+    ''', (month_range(validate_month(before_month))[0],))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def main():
+    """命令行入口"""
+    from database_module import Database
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'embroidery_system.db'
+    before_month = sys.argv[2] if len(sys.argv) > 2 else date.today().strftime('%Y-%m')
+
+    db = Database(db_path)
+    try:
+        result = db.archive_records(before_month)
+        print(result['message'])
+        for item in result.get('data', {}).get('months', []):
+            print(f"  {item['month']}: {item['archived']} 条 -> {item['archive_file']}")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在线备份与恢复
+
+用 sqlite3.Connection.backup 按页分步复制数据库，每步之间短暂让出，
+程序运行中也可以备份，录入不会被长时间阻塞：
+    - 每次备份是备份目录下的一个子目录 <主库名>_<时间>，
+      包含主库及 archive/ 下的全部归档库，以及记录备份信息的 manifest.json
+    - 复制完成后对每个文件执行 PRAGMA integrity_check，未通过的备份直接删除
+    - 只保留最近 keep 份备份
+    - BackupScheduler 在后台线程中按间隔定时备份
+恢复由 Database.restore_backup 在写线程上执行，期间暂停连接池，恢复前会先自动备份当前数据。
+
+用法：
+    python backup_module.py [数据库路径]    # 立即备份一次
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from archive_module import ARCHIVE_DIR
+
+
+BACKUP_DIR = 'backups'
+MANIFEST_FILE = 'manifest.json'
+
+# 每步复制的页数及步间停顿（秒），停顿期间写连接可以提交
+BACKUP_PAGES = 256
+BACKUP_STEP_PAUSE = 0.005
+
+# 默认保留份数和定时备份间隔（小时），可在设置中修改；间隔为0时不定时备份
+DEFAULT_BACKUP_KEEP = 7
+DEFAULT_BACKUP_INTERVAL_HOURS = 24
+BACKUP_KEEP_SETTING = 'backup_keep'
+BACKUP_INTERVAL_SETTING = 'backup_interval_hours'
+
+NAME_TIME_FORMAT = '%Y%m%d_%H%M%S'
+
+# 恢复时归档库先复制为带此后缀的临时文件，全部就绪后再替换
+RESTORE_SUFFIX = '.restoring'
+
+
+def copy_database(source_path: str, target_path: str, pages: int = BACKUP_PAGES,
+                  pause: float = BACKUP_STEP_PAUSE) -> int:
+    """
+    用 SQLite 备份接口把在用的数据库复制为独立文件
+
+    Args:
+        source_path: 源数据库路径
+        target_path: 目标文件路径，已存在时被覆盖
+        pages: 每步复制的页数
+        pause: 每步之间的停顿秒数
+
+    Returns:
+        复制的总页数
+    """
+    progress = {'pages': 0}
+
+    def on_step(status, remaining, total):
+        progress['pages'] = total
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target, pages=pages, progress=on_step)
+        # 备份文件单独存放，改为回滚日志模式，不依赖 -wal/-shm 文件即可只读打开
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+        source.close()
+
+    return progress['pages']
+
+
+def check_integrity(path: str) -> str:
+    """
+    以只读方式打开数据库并执行完整性检查
+
+    Args:
+        path: 数据库文件路径
+
+    Returns:
+        'ok' 或 integrity_check 报告的问题（多条以换行分隔）
+    """
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+        return '\n'.join(row[0] for row in rows)
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        conn.close()
+
+
+class BackupManager:
+    """主库及归档库的备份目录管理"""
+
+    def __init__(self, db_path: str, backup_dir: Optional[str] = None,
+                 keep: int = DEFAULT_BACKUP_KEEP):
+        """
+        初始化备份管理
+
+        Args:
+            db_path: 主库路径
+            backup_dir: 备份目录，默认为主库同目录下的 backups/
+            keep: 保留的备份份数
+        """
+        self.db_path = os.path.abspath(db_path)
+        directory, filename = os.path.split(self.db_path)
+        self.db_name = filename
+        self.archive_dir = os.path.join(directory, ARCHIVE_DIR)
+        self.backup_dir = backup_dir or os.path.join(directory, BACKUP_DIR)
+        self.keep = keep
+
+        self._lock = threading.Lock()
+
+    def _archive_files(self, directory: str) -> List[str]:
+        """目录下的归档库文件名"""
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if name.endswith('.db'))
+
+    def backup(self, reason: str = 'manual', prune: bool = True) -> Dict:
+        """
+        备份主库及全部归档库并校验
+
+        Args:
+            reason: 备份原因，记录在 manifest 中（manual、scheduled、pre-restore）
+            prune: 完成后是否删除超出保留份数的旧备份
+
+        Returns:
+            备份信息，见 list_backups
+
+        Raises:
+            RuntimeError: 完整性检查未通过
+        """
+        with self._lock:
+            created = datetime.now()
+            stem = os.path.splitext(self.db_name)[0]
+            name = f"{stem}_{created.strftime(NAME_TIME_FORMAT)}"
+            path = os.path.join(self.backup_dir, name)
+            # 同一秒内的多次备份加序号区分
+            suffix = 1
+            while os.path.exists(path):
+                suffix += 1
+                path = os.path.join(self.backup_dir, f"{name}_{suffix}")
+            name = os.path.basename(path)
+            os.makedirs(os.path.join(path, ARCHIVE_DIR))
+
+            started = time.perf_counter()
+            files = [(self.db_path, self.db_name)]
+            files += [(os.path.join(self.archive_dir, filename), os.path.join(ARCHIVE_DIR, filename))
+                      for filename in self._archive_files(self.archive_dir)]
+
+            try:
+                pages = 0
+                for source, relative in files:
+                    target = os.path.join(path, relative)
+                    pages += copy_database(source, target)
+                    result = check_integrity(target)
+                    if result != 'ok':
+                        raise RuntimeError(f"{relative} 完整性检查未通过: {result}")
+            except Exception:
+                shutil.rmtree(path, ignore_errors=True)
+                raise
+
+            manifest = {
+                'name': name,
+                'created_at': created.strftime('%Y-%m-%d %H:%M:%S'),
+                'reason': reason,
+                'files': [relative for _, relative in files],
+                'pages': pages,
+                'size': sum(os.path.getsize(os.path.join(path, relative)) for _, relative in files),
+                'seconds': round(time.perf_counter() - started, 3),
+                'integrity': 'ok'
+            }
+            with open(os.path.join(path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+            if prune:
+                self._prune()
+            return manifest
+
+    def list_backups(self) -> List[Dict]:
+        """
+        列出现有备份
+
+        Returns:
+            按时间倒序的 manifest 列表
+            [{'name', 'created_at', 'reason', 'files', 'pages', 'size', 'seconds', 'integrity'}]
+        """
+        if not os.path.isdir(self.backup_dir):
+            return []
+
+        backups = []
+        for name in os.listdir(self.backup_dir):
+            manifest_path = os.path.join(self.backup_dir, name, MANIFEST_FILE)
+            if not os.path.isfile(manifest_path):
+                continue
+            try:
+                with open(manifest_path, encoding='utf-8') as f:
+                    backups.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+        backups.sort(key=lambda item: (item['created_at'], item['name']), reverse=True)
+        return backups
+
+    def last_backup_time(self) -> Optional[datetime]:
+        """最近一次备份的时间，没有备份时为 None"""
+        backups = self.list_backups()
+        if not backups:
+            return None
+        return datetime.strptime(backups[0]['created_at'], '%Y-%m-%d %H:%M:%S')
+
+    def _prune(self):
+        """删除超出保留份数的旧备份"""
+        for manifest in self.list_backups()[self.keep:]:
+            shutil.rmtree(os.path.join(self.backup_dir, manifest['name']), ignore_errors=True)
+
+    def get_backup(self, name: str) -> Dict:
+        """
+        按名称查找备份
+
+        Args:
+            name: 备份名称
+
+        Returns:
+            manifest
+
+        Raises:
+            ValueError: 备份不存在
+        """
+        for manifest in self.list_backups():
+            if manifest['name'] == name:
+                return manifest
+        raise ValueError(f"备份不存在: {name}")
+
+    def verify(self, name: str) -> Dict:
+        """
+        重新校验备份中每个文件的完整性
+
+        Args:
+            name: 备份名称
+
+        Returns:
+            {'name', 'ok': 是否全部通过, 'files': {文件: 检查结果}}
+
+        Raises:
+            ValueError: 备份不存在
+        """
+        manifest = self.get_backup(name)
+        path = os.path.join(self.backup_dir, name)
+
+        results = {}
+        for relative in manifest['files']:
+            target = os.path.join(path, relative)
+            results[relative] = check_integrity(target) if os.path.isfile(target) else '文件缺失'
+
+        return {
+            'name': name,
+            'ok': all(result == 'ok' for result in results.values()),
+            'files': results
+        }
+
+    def restore(self, conn: sqlite3.Connection, name: str) -> Dict:
+        """
+        用备份覆盖主库及归档库
+
+        调用方须保证期间没有其他连接打开归档库（Windows 下被打开的文件不能删除或替换），
+        见 ConnectionPool.paused。归档库先复制为同目录下的临时文件，主库写入成功后
+        再逐个替换，任一步失败时归档库保持原样。
+
+        Args:
+            conn: 主库写连接，不在事务中且未附加归档库；主库内容通过备份接口整体写入该连接
+            name: 备份名称
+
+        Returns:
+            恢复的 manifest
+
+        Raises:
+            ValueError: 备份不存在或未通过完整性检查
+        """
+        manifest = self.get_backup(name)
+        verification = self.verify(name)
+        if not verification['ok']:
+            raise ValueError(f"备份 {name} 未通过完整性检查，不能恢复")
+
+        path = os.path.join(self.backup_dir, name)
+        archives = [relative for relative in manifest['files'] if relative != self.db_name]
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        staged = []
+        try:
+            for relative in archives:
+                target = os.path.join(os.path.dirname(self.db_path), relative)
+                staged.append((target + RESTORE_SUFFIX, target))
+                copy_database(os.path.join(path, relative), target + RESTORE_SUFFIX, pages=-1)
+
+            source = sqlite3.connect(f"file:{os.path.join(path, self.db_name)}?mode=ro", uri=True)
+            try:
+                source.backup(conn)
+            finally:
+                source.close()
+        except BaseException:
+            for temp, _ in staged:
+                if os.path.exists(temp):
+                    os.remove(temp)
+            raise
+
+        for temp, target in staged:
+            # 残留的 -wal/-shm 属于被替换的文件，不能应用到恢复的文件上
+            for suffix in ('-wal', '-shm', '-journal'):
+                if os.path.exists(target + suffix):
+                    os.remove(target + suffix)
+            os.replace(temp, target)
+
+        # 备份中没有的归档库属于备份之后的归档，恢复前的自动备份中保留了它们
+        for filename in self._archive_files(self.archive_dir):
+            if os.path.join(ARCHIVE_DIR, filename) not in archives:
+                os.remove(os.path.join(self.archive_dir, filename))
+
+        return manifest
+
+
+class BackupScheduler:
+    """后台定时备份线程"""
+
+    def __init__(self, manager: BackupManager,
+                 interval_hours: float = DEFAULT_BACKUP_INTERVAL_HOURS):
+        """
+        初始化定时备份
+
+        Args:
+            manager: 备份管理
+            interval_hours: 备份间隔（小时），不大于0时不启动
+        """
+        self.manager = manager
+        self.interval = interval_hours * 3600
+        self.last_error: Optional[str] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _delay(self) -> float:
+        """距下一次备份的秒数，按最近一次备份的时间计算，程序重启不会重复备份"""
+        last = self.manager.last_backup_time()
+        if last is None:
+            return 0
+        return max(0.0, self.interval - (datetime.now() - last).total_seconds())
+
+    def _run(self):
+        """定时备份线程主循环"""
+        while not self._stop.wait(self._delay()):
+            try:
+                self.manager.backup('scheduled')
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                # 失败后等一个间隔再试，不连续重试
+                if self._stop.wait(self.interval):
+                    break
+
+    def start(self):
+        """启动定时备份线程"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='sqlite-backup', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """停止定时备份线程，正在进行的备份会先完成"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def main():
+    """命令行入口"""
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'embroidery_system.db'
+
+    manifest = BackupManager(db_path).backup()
+    print(f"备份完成: {manifest['name']}，{len(manifest['files'])} 个文件，"
+          f"{manifest['size']} 字节，耗时 {manifest['seconds']} 秒")
+
+
+if __name__ == '__main__':
+    main()
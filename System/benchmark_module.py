@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+刺绣工资管理系统 - 性能基准测试
+
+用法：
+    python benchmark_module.py pool [次数]
+    python benchmark_module.py report [记录数]
+    python benchmark_module.py serialize [记录数]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Dict
+
+import numpy as np
+
+from database_module import MAX_PAGE_SIZE, Database
+from report_module import RangeReport
+import serialization_module
+
+
+def _timeit(func, iterations: int) -> float:
+    """执行 iterations 次，返回单次平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bench_connection_pool(iterations: int = 5000) -> Dict:
+    """
+    对比每次调用新建连接与连接池复用连接的单次开销
+
+    Args:
+        iterations: 每种方式的调用次数
+
+    Returns:
+        两种方式的平均耗时（微秒）
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, 'bench.db'))
+        db.set_setting('bench', '1')
+
+        def connect_per_call():
+            conn = sqlite3.connect(db.db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                conn.execute("SELECT value FROM settings WHERE key = ?", ('bench',)).fetchone()
+            finally:
+                conn.close()
+
+        per_call = _timeit(connect_per_call, iterations)
+        pooled = _timeit(lambda: db.get_setting('bench'), iterations)
+        db.close()
+
+    return {
+        'iterations': iterations,
+        'connect_per_call_us': per_call,
+        'pooled_us': pooled,
+        'speedup': per_call / pooled if pooled else 0
+    }
+
+
+def _generate_records(db: Database, rows: int, employees: int = 50, patterns: int = 30,
+                      days: int = 1095):
+    """
+    向基准数据库写入随机工资记录
+
+    每名员工只做3种花型，接近实际车间的分布。
+    为加快生成，先删除 records 上的触发器，之后由调用方重建日汇总表；
+    仅用于临时的基准数据库。
+    """
+    conn = db.get_connection()
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'records'")
+        for (name,) in cursor.fetchall():
+            cursor.execute(f"DROP TRIGGER {name}")
+
+        cursor.executemany("INSERT INTO employees (name) VALUES (?)",
+                           [(f"员工{i:03d}",) for i in range(employees)])
+        cursor.executemany("INSERT INTO patterns (name, price) VALUES (?, ?)",
+                           [(f"花型{i:03d}", round(0.01 + i * 0.005, 3)) for i in range(patterns)])
+        cursor.execute("SELECT id FROM employees ORDER BY id")
+        employee_ids = np.array([row[0] for row in cursor.fetchall()])
+        cursor.execute("SELECT id, price FROM patterns ORDER BY id")
+        pattern_rows = cursor.fetchall()
+        pattern_ids = np.array([row[0] for row in pattern_rows])
+        prices = np.array([row[1] for row in pattern_rows])
+
+        rng = np.random.default_rng(0)
+        employee_rank = rng.integers(0, employees, rows)
+        pattern_rank = (employee_rank * 7 + rng.integers(0, 3, rows)) % patterns
+        dates = (np.datetime64('2022-01-01') + rng.integers(0, days, rows)).astype(str)
+        counts = rng.integers(100, 5100, rows)
+        totals = counts * prices[pattern_rank]
+
+        cursor.executemany(
+            "INSERT INTO records (employee_id, pattern_id, record_date, count, total) "
+            "VALUES (?, ?, ?, ?, ?)",
+            zip(employee_ids[employee_rank].tolist(), pattern_ids[pattern_rank].tolist(),
+                dates.tolist(), counts.tolist(), totals.tolist())
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def bench_range_report(rows: int = 1_000_000) -> Dict:
+    """
+    对比区间报表的三种计算方式：
+        - SQL：records 上的 GROUP BY 透视和按月 GROUP BY
+        - RangeReport 读取 records
+        - RangeReport 读取 daily_totals（Database.get_range_report 的默认方式）
+
+    Args:
+        rows: 生成的工资记录数
+
+    Returns:
+        各方式的耗时（毫秒）及合计是否一致
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, 'bench.db'))
+        _generate_records(db, rows)
+        db.rebuild_daily_totals()
+
+        start_date, end_date = '2022-01-01', '2024-12-31'
+        conn = db.get_connection()
+
+        try:
+            cursor = conn.cursor()
+
+            def sql_group_by():
+                cursor.execute('''
+                    SELECT e.name, p.name, SUM(r.count), SUM(r.total)
+                    FROM records r
+                    JOIN employees e ON r.employee_id = e.id
+                    JOIN patterns p ON r.pattern_id = p.id
+                    WHERE r.record_date >= ? AND r.record_date <= ?
+                    GROUP BY r.employee_id, r.pattern_id
+                ''', (start_date, end_date))
+                cells = cursor.fetchall()
+                cursor.execute('''
+                    SELECT substr(record_date, 1, 7), SUM(count), SUM(total), COUNT(*)
+                    FROM records
+                    WHERE record_date >= ? AND record_date <= ?
+                    GROUP BY substr(record_date, 1, 7)
+                ''', (start_date, end_date))
+                months = cursor.fetchall()
+                return sum(cell[2] for cell in cells), sum(month[3] for month in months)
+
+            def vectorized(source):
+                report = RangeReport.load(cursor, start_date, end_date, source)
+                report.matrix()
+                report.buckets('month')
+                totals = report.totals()
+                return totals['count'], totals['records']
+
+            timings = {}
+            results = {}
+            for name, func in (('sql_group_by', sql_group_by),
+                               ('numpy_records', lambda: vectorized('records')),
+                               ('numpy_daily_totals', lambda: vectorized('daily_totals'))):
+                started = time.perf_counter()
+                results[name] = func()
+                timings[name] = (time.perf_counter() - started) * 1000
+
+            cursor.execute("SELECT COUNT(*) FROM daily_totals")
+            daily_rows = cursor.fetchone()[0]
+        finally:
+            conn.close()
+            db.close()
+
+    return {
+        'rows': rows,
+        'daily_totals_rows': daily_rows,
+        'sql_group_by_ms': timings['sql_group_by'],
+        'numpy_records_ms': timings['numpy_records'],
+        'numpy_daily_totals_ms': timings['numpy_daily_totals'],
+        'speedup': timings['sql_group_by'] / timings['numpy_daily_totals'],
+        'totals_match': len(set(results.values())) == 1
+    }
+
+
+def bench_serialization(rows: int = 100_000) -> Dict:
+    """
+    对比 API 响应的序列化耗时和传输字节数
+
+    响应体取自基准数据库上 Database.get_records() 的实际结果，
+    与 /api/records（不分页）返回的结构相同。列式格式另外对比
+    get_records()、get_records_page() 一页和 get_rollup_report() 的实际结果。
+
+    Args:
+        rows: 生成的工资记录数，即响应中的记录数
+
+    Returns:
+        Flask 默认设置（ASCII转义、排序键）、标准库回退实现、orjson 各自的
+        序列化耗时（毫秒）和字节数，gzip/deflate 压缩后的字节数和耗时，
+        以及各端点按行、按列的字节数（含 gzip 后）和列式转换加序列化的耗时
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, 'bench.db'))
+        try:
+            _generate_records(db, rows)
+            db.rebuild_daily_totals()
+            records = db.get_records()
+            page = db.get_records_page(limit=MAX_PAGE_SIZE)['records']
+            rollup = db.get_rollup_report('2022-01-01', '2024-12-31')
+        finally:
+            db.close()
+
+    payload = {'success': True, 'data': records}
+
+    serializers = {
+        'flask_default': lambda obj: json.dumps(obj, ensure_ascii=True, sort_keys=True,
+                                                separators=(',', ':')).encode('utf-8'),
+        'stdlib': lambda obj: json.dumps(obj, ensure_ascii=False,
+                                         separators=(',', ':')).encode('utf-8'),
+    }
+    if serialization_module.orjson is not None:
+        serializers['orjson'] = serialization_module.dumps
+
+    result = {'rows': rows, 'serializer': serialization_module.SERIALIZER}
+    for name, dumps in serializers.items():
+        start = time.perf_counter()
+        data = dumps(payload)
+        result[f'{name}_ms'] = (time.perf_counter() - start) * 1000
+        result[f'{name}_bytes'] = len(data)
+
+    data = serialization_module.dumps(payload)
+    for encoding in serialization_module.ENCODINGS:
+        start = time.perf_counter()
+        compressed = serialization_module.compress(data, encoding)
+        result[f'{encoding}_ms'] = (time.perf_counter() - start) * 1000
+        result[f'{encoding}_bytes'] = len(compressed)
+    result['gzip_ratio'] = len(data) / result['gzip_bytes']
+
+    # 列式格式：与 API/桥接方法相同的转换，耗时包含转换
+    for name, rows_data, convert in (('records', records, serialization_module.format_rows),
+                                     ('page', page, serialization_module.format_rows),
+                                     ('rollup', rollup, serialization_module.format_report)):
+        row_bytes = serialization_module.dumps({'success': True, 'data': rows_data})
+        start = time.perf_counter()
+        columnar = serialization_module.dumps({'success': True,
+                                               'data': convert(rows_data, 'columnar')})
+        result[f'{name}_columnar_ms'] = (time.perf_counter() - start) * 1000
+        result[f'{name}_rows_bytes'] = len(row_bytes)
+        result[f'{name}_columnar_bytes'] = len(columnar)
+        result[f'{name}_rows_gzip_bytes'] = len(serialization_module.compress(row_bytes, 'gzip'))
+        result[f'{name}_columnar_gzip_bytes'] = len(serialization_module.compress(columnar, 'gzip'))
+
+    return result
+
+
+BENCHMARKS = {
+    'pool': bench_connection_pool,
+    'report': bench_range_report,
+    'serialize': bench_serialization,
+}
+
+
+def main():
+    """命令行入口"""
+    name = sys.argv[1] if len(sys.argv) > 1 else 'pool'
+    args = [int(arg) for arg in sys.argv[2:]]
+
+    if name not in BENCHMARKS:
+        print(f"未知的基准测试: {name}，可选: {', '.join(BENCHMARKS)}")
+        sys.exit(1)
+
+    result = BENCHMARKS[name](*args)
+    for key, value in result.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
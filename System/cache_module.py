@@ -0,0 +1,269 @@
+"""
+报表结果缓存
+
+data_versions 表按范围记录数据版本号，由触发器在每次写入时递增：
+    - 'YYYY-MM'    该月工资记录发生变化
+    - 'records'    任意工资记录发生变化
+    - 'employees'  员工表发生变化（报表中的员工姓名）
+    - 'patterns'   花型表或单价历史发生变化（报表中的花型名称、录入时的单价）
+版本号保存在数据库中，因此桌面端和API端任一进程写入后，另一进程的缓存也会失效。
+
+ReportCache 是进程内的LRU缓存，缓存项记录计算时依赖范围的版本号，
+读取时版本号不一致即视为失效。
+"""
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+DATA_VERSIONS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS data_versions (
+        scope TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_records_insert_version
+    AFTER INSERT ON records
+    BEGIN
+        INSERT INTO data_versions (scope, version)
+        VALUES (substr(NEW.record_date, 1, 7), 1), ('records', 1)
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_records_update_version
+    AFTER UPDATE ON records
+    BEGIN
+        INSERT INTO data_versions (scope, version)
+        VALUES (substr(OLD.record_date, 1, 7), 1), ('records', 1)
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+
+        INSERT INTO data_versions (scope, version)
+        SELECT substr(NEW.record_date, 1, 7), 1
+        WHERE substr(NEW.record_date, 1, 7) <> substr(OLD.record_date, 1, 7)
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_records_delete_version
+    AFTER DELETE ON records
+    BEGIN
+        INSERT INTO data_versions (scope, version)
+        VALUES (substr(OLD.record_date, 1, 7), 1), ('records', 1)
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+    END
+    ''',
+]
+
+# 员工表、花型表的增删改各自递增对应范围的版本号
+for _table in ('employees', 'patterns'):
+    for _event in ('INSERT', 'UPDATE', 'DELETE'):
+        DATA_VERSIONS_SCHEMA.append(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{_table}_{_event.lower()}_version
+    AFTER {_event} ON {_table}
+    BEGIN
+        INSERT INTO data_versions (scope, version) VALUES ('{_table}', 1)
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+    END
+    ''')
+
+# 单价历史变化（例如设置以后生效的单价，花型表本身不变）同样递增 'patterns' 范围
+PATTERN_PRICES_VERSIONS_SCHEMA = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_pattern_prices_{_event.lower()}_version
+    AFTER {_event} ON pattern_prices
+    BEGIN
+        INSERT INTO data_versions (scope, version) VALUES ('patterns', 1)
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+    END
+    '''
+    for _event in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+# 日期范围跨越的月份超过该值时，改为依赖整个 'records' 范围
+MAX_MONTH_SCOPES = 24
+
+
+def create_data_versions(cursor: sqlite3.Cursor):
+    """
+    创建数据版本表及维护触发器（迁移步骤）
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+    """
+    for sql in DATA_VERSIONS_SCHEMA:
+        cursor.execute(sql)
+
+
+def create_pattern_prices_versions(cursor: sqlite3.Cursor):
+    """
+    创建单价历史表的数据版本触发器（迁移步骤）
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+    """
+    for sql in PATTERN_PRICES_VERSIONS_SCHEMA:
+        cursor.execute(sql)
+
+
+def version_etag(key: str, versions: Sequence[int]) -> str:
+    """
+    由请求标识和数据版本号生成强 ETag 值（不含引号）
+
+    Args:
+        key: 请求标识（路径及查询参数）
+        versions: 响应依赖范围的版本号
+
+    Returns:
+        版本号不变时保持不变的摘要
+    """
+    payload = key + '|' + ','.join(str(version) for version in versions)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def bump_data_versions(cursor: sqlite3.Cursor, floor: Dict[str, int]):
+    """
+    把各范围的版本号调整到不低于 floor 并再递增一次
+
+    数据库从备份恢复后版本号会回退，之后的写入可能重新产生恢复前用过的版本号，
+    按版本号判断的缓存和 ETag 会把不同的数据当作未变化；恢复后调用本函数即可避免。
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+        floor: 范围 -> 恢复前的版本号
+    """
+    cursor.executemany('''
+        INSERT INTO data_versions (scope, version) VALUES (?, ? + 1)
+        ON CONFLICT (scope) DO UPDATE SET version = MAX(version, excluded.version - 1) + 1
+    ''', list(floor.items()))
+
+
+def read_data_versions(cursor: sqlite3.Cursor, scopes: Sequence[str]) -> Tuple[int, ...]:
+    """
+    读取若干范围的当前版本号
+
+    Args:
+        cursor: 数据库游标
+        scopes: 范围列表
+
+    Returns:
+        与 scopes 顺序一致的版本号，没有记录的范围为0
+    """
+    placeholders = ', '.join('?' for _ in scopes)
+    cursor.execute(f"SELECT scope, version FROM data_versions WHERE scope IN ({placeholders})",
+                   list(scopes))
+    versions = {row[0]: row[1] for row in cursor.fetchall()}
+    return tuple(versions.get(scope, 0) for scope in scopes)
+
+
+def month_scopes(start_date: Optional[str], end_date: Optional[str]) -> List[str]:
+    """
+    计算日期范围依赖的工资记录版本范围
+
+    Args:
+        start_date: 开始日期（YYYY-MM-DD），可为空
+        end_date: 结束日期（YYYY-MM-DD），可为空
+
+    Returns:
+        'YYYY-MM' 列表；范围不封闭或过长时返回 ['records']
+    """
+    if not start_date or not end_date:
+        return ['records']
+
+    try:
+        year, month = int(start_date[:4]), int(start_date[5:7])
+        end_year, end_month = int(end_date[:4]), int(end_date[5:7])
+    except ValueError:
+        return ['records']
+
+    scopes = []
+    while (year, month) <= (end_year, end_month):
+        if len(scopes) >= MAX_MONTH_SCOPES:
+            return ['records']
+        scopes.append(f"{year}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    return scopes
+
+
+class ReportCache:
+    """
+    按数据版本失效的LRU结果缓存
+
+    缓存的结果对象会被多个调用方共享，调用方不得修改。
+    """
+
+    def __init__(self, max_entries: int = 128):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多缓存的结果数
+        """
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, Tuple[Tuple[int, ...], Any]]' = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_or_compute(self, key: Hashable, versions: Tuple[int, ...],
+                       compute: Callable[[], Any]) -> Any:
+        """
+        命中且版本一致时返回缓存结果，否则计算并缓存
+
+        Args:
+            key: 缓存键（方法名及参数）
+            versions: 结果依赖范围的当前版本号
+            compute: 计算结果的函数
+
+        Returns:
+            查询结果
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        return value
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            命中、未命中、淘汰次数及当前缓存项数
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': self._hits / total if total else 0.0
+            }
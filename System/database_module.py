@@ -1,24 +1,510 @@
 import sqlite3
 import os
-from datetime import datetime
-from typing import List, Dict, Optional, Any
+import json
+import base64
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import List, Dict, Optional, Any, Iterable, Iterator
+from archive_module import (archivable_months, archive_month, archived_years, attach_archives,
+                            check_not_archived, restore_month)
+from backup_module import BackupManager
+from journal_module import (CHANGES_LIMIT, JOURNAL_RETENTION_DAYS, append_reset, changes_since,
+                            prune_change_log)
+from cache_module import ReportCache, bump_data_versions, month_scopes, read_data_versions
+from migration_module import run_migrations
+from pool_module import STORAGE_PROFILE, ConnectionPool, PooledConnection, WriteQueue
+from price_module import PRICE_AS_OF_SQL, set_pattern_price, sync_current_prices
+from query_module import name_filter, order_clause, record_filter, statement
+from reference_module import ReferenceCache, ReferenceData
+from report_module import PERIODS, REPORT_SOURCES, RangeReport
+from search_module import fts_phrase, use_trigram
+from rollup_module import rebuild_daily_totals
+
+# 工资记录分页大小
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# 流式查询每批从游标读取的行数
+STREAM_BATCH_SIZE = 500
+
+# 全文搜索范围及每类默认返回条数
+SEARCH_SCOPES = ('employees', 'patterns', 'records')
+SEARCH_LIMIT = 20
+
+
+def encode_cursor(record_date: str, record_id: int) -> str:
+    """
+    把分页位置编码为不透明游标
+    
+    Args:
+        record_date: 当前页最后一条记录的日期
+        record_id: 当前页最后一条记录的ID
+        
+    Returns:
+        游标字符串
+    """
+    raw = json.dumps([record_date, record_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    解析分页游标
+    
+    Args:
+        cursor: encode_cursor 生成的游标
+        
+    Returns:
+        (record_date, record_id)
+        
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        record_date, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(record_date), int(record_id)
+    except Exception:
+        raise ValueError("分页游标无效")
+
+
+def validate_record_date(record_date: Any) -> str:
+    """
+    校验并规范化记录日期
+    
+    Args:
+        record_date: 日期字符串（YYYY-MM-DD）
+        
+    Returns:
+        规范化后的日期字符串
+        
+    Raises:
+        ValueError: 日期格式错误
+    """
+    try:
+        return datetime.strptime(str(record_date).strip()[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError("日期格式错误")
+
+
+def insert_records_bulk(conn: sqlite3.Connection, rows: List[Dict],
+                        reference_cache: ReferenceCache = None) -> Dict:
+    """
+    在一个事务内校验、按记录日期生效单价计价并批量插入工资记录
+    
+    有效的行全部插入，无效的行跳过并返回错误信息，调用方需在写线程上执行。
+    
+    Args:
+        conn: 写连接
+        rows: 记录列表，每项包含 employee_id、pattern_id、record_date、count，
+              可选 special、note
+        reference_cache: 参考数据缓存，为空时从数据库加载
+        
+    Returns:
+        {'inserted': 插入条数, 'errors': [{'index': 行序号, 'message': 错误信息}]}
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    
+    try:
+        # 员工、花型及单价历史一次取得，逐行在内存中校验并按记录日期二分查找单价
+        if reference_cache is not None:
+            reference = reference_cache.get(cursor)
+        else:
+            reference = ReferenceData.load(cursor)
+        
+        params = []
+        errors = []
+        
+        for index, row in enumerate(rows):
+            try:
+                employee_id = int(row['employee_id'])
+                pattern_id = int(row['pattern_id'])
+                count = int(row['count'])
+                record_date = validate_record_date(row['record_date'])
+            except KeyError as e:
+                errors.append({'index': index, 'message': f"缺少字段 {e.args[0]}"})
+                continue
+            except (TypeError, ValueError) as e:
+                errors.append({'index': index, 'message': str(e) or "字段格式错误"})
+                continue
+            
+            if employee_id not in reference.employees:
+                errors.append({'index': index, 'message': "员工不存在"})
+                continue
+            
+            if pattern_id not in reference.patterns:
+                errors.append({'index': index, 'message': "花型不存在"})
+                continue
+            
+            if count <= 0:
+                errors.append({'index': index, 'message': "针数必须大于0"})
+                continue
+            
+            price = reference.price_as_of(pattern_id, record_date)
+            
+            params.append((
+                employee_id, pattern_id, record_date, count, count * price,
+                str(row.get('special') or ''), str(row.get('note') or '')
+            ))
+        
+        cursor.executemany(statement('insert_record'), params)
+        
+        conn.commit()
+        return {'inserted': len(params), 'errors': errors}
+        
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def build_record_filter(filters: Dict) -> tuple:
+    """
+    根据筛选条件生成 records 表的 WHERE 子句
+    
+    Args:
+        filters: 可包含 employee_id、pattern_id、start_date、end_date、ids（记录ID列表）
+        
+    Returns:
+        (where 子句, 参数列表)
+        
+    Raises:
+        ValueError: 没有任何筛选条件或条件格式错误
+    """
+    conditions = []
+    params = []
+    
+    if filters.get('employee_id'):
+        conditions.append("employee_id = ?")
+        params.append(int(filters['employee_id']))
+    
+    if filters.get('pattern_id'):
+        conditions.append("pattern_id = ?")
+        params.append(int(filters['pattern_id']))
+    
+    if filters.get('start_date'):
+        conditions.append("record_date >= ?")
+        params.append(validate_record_date(filters['start_date']))
+    
+    if filters.get('end_date'):
+        conditions.append("record_date <= ?")
+        params.append(validate_record_date(filters['end_date']))
+    
+    if filters.get('ids'):
+        # 以单个JSON参数传入ID列表，不受SQL变量个数限制
+        conditions.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps([int(record_id) for record_id in filters['ids']]))
+    
+    if not conditions:
+        raise ValueError("批量操作至少需要一个筛选条件")
+    
+    return " AND ".join(conditions), params
+
+
+def check_filter_not_archived(cursor: sqlite3.Cursor, filters: Dict):
+    """
+    批量修改、删除前检查筛选的日期范围不含已归档月份
+    
+    按 ids 筛选时只涉及主库中的指定记录（与按ID修改单条记录一致），不做检查。
+    
+    Args:
+        cursor: 写连接的游标，在事务中
+        filters: 筛选条件，见 build_record_filter
+        
+    Raises:
+        ValueError: 日期范围涉及已归档月份
+    """
+    if filters.get('ids'):
+        return
+    check_not_archived(cursor,
+                       filters.get('start_date') and validate_record_date(filters['start_date']),
+                       filters.get('end_date') and validate_record_date(filters['end_date']))
+
+
+def update_records_where(conn: sqlite3.Connection, filters: Dict, changes: Dict) -> int:
+    """
+    按筛选条件用一条 UPDATE 批量修改工资记录，并在SQL中按记录日期生效的单价重算金额
+    
+    Args:
+        conn: 写连接
+        filters: 筛选条件，见 build_record_filter
+        changes: 要修改的字段，可包含 employee_id、pattern_id、record_date
+        
+    Returns:
+        修改的记录条数
+        
+    Raises:
+        ValueError: 条件或修改内容无效，或日期范围、新记录日期涉及已归档月份
+    """
+    where, params = build_record_filter(filters)
+    
+    assignments = []
+    values = []
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    
+    try:
+        check_filter_not_archived(cursor, filters)
+        if changes.get('record_date'):
+            new_date = validate_record_date(changes['record_date'])
+            check_not_archived(cursor, new_date, new_date)
+        
+        if changes.get('employee_id'):
+            cursor.execute(statement('employee_exists'), (int(changes['employee_id']),))
+            if not cursor.fetchone():
+                raise ValueError("员工不存在")
+            assignments.append("employee_id = ?")
+            values.append(int(changes['employee_id']))
+        
+        if changes.get('pattern_id'):
+            cursor.execute(statement('pattern_exists'), (int(changes['pattern_id']),))
+            if not cursor.fetchone():
+                raise ValueError("花型不存在")
+            assignments.append("pattern_id = ?")
+            values.append(int(changes['pattern_id']))
+        
+        if changes.get('record_date'):
+            assignments.append("record_date = ?")
+            values.append(validate_record_date(changes['record_date']))
+        
+        if not assignments:
+            raise ValueError("没有需要修改的字段")
+        
+        # SET 子句中的列引用取修改前的值，因此单价按新的记录日期和花型ID查询
+        price_params = []
+        if changes.get('record_date'):
+            price_date = "?"
+            price_params.append(validate_record_date(changes['record_date']))
+        else:
+            price_date = "records.record_date"
+        if changes.get('pattern_id'):
+            price_pattern = "?"
+            price_params.append(int(changes['pattern_id']))
+        else:
+            price_pattern = "records.pattern_id"
+        
+        price_sql = PRICE_AS_OF_SQL.format(record_date=price_date, pattern=price_pattern)
+        cursor.execute(f'''
+            UPDATE records
+            SET {", ".join(assignments)},
+                total = count * {price_sql}
+            WHERE {where}
+        ''', values + price_params + params)
+        
+        affected = cursor.rowcount
+        conn.commit()
+        return affected
+        
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def delete_records_where(conn: sqlite3.Connection, filters: Dict) -> int:
+    """
+    按筛选条件用一条 DELETE 批量删除工资记录
+    
+    Args:
+        conn: 写连接
+        filters: 筛选条件，见 build_record_filter
+        
+    Returns:
+        删除的记录条数
+        
+    Raises:
+        ValueError: 条件无效或日期范围涉及已归档月份
+    """
+    where, params = build_record_filter(filters)
+    
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    
+    try:
+        check_filter_not_archived(cursor, filters)
+        cursor.execute(f"DELETE FROM records WHERE {where}", params)
+        affected = cursor.rowcount
+        conn.commit()
+        return affected
+        
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def reprice_records_where(conn: sqlite3.Connection, pattern_id: int, start_date: str = None,
+                          end_date: str = None, dry_run: bool = False, price: float = None,
+                          effective_from: str = None) -> Dict:
+    """
+    按记录日期生效的花型单价用一条 UPDATE 重算历史记录金额
+    
+    Args:
+        conn: 写连接
+        pattern_id: 花型ID
+        start_date: 开始日期，可为空；给出 effective_from 时默认为该日期
+        end_date: 结束日期，可为空
+        dry_run: 为 True 时只统计受影响条数和金额变化，不修改数据
+        price: 新单价，与 effective_from 一起给出时先在同一事务中设置自该日起生效的单价
+        effective_from: 新单价的生效日期
+        
+    Returns:
+        {'affected': 受影响条数, 'delta': 金额变化合计}
+        
+    Raises:
+        ValueError: 花型不存在、日期格式错误、单价与生效日期没有同时给出或日期范围涉及已归档月份
+    """
+    if (price is None) != (effective_from is None):
+        raise ValueError("单价和生效日期需要同时给出")
+    if effective_from is not None:
+        effective_from = validate_record_date(effective_from)
+        start_date = start_date or effective_from
+    
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    
+    try:
+        cursor.execute(statement('pattern_exists'), (pattern_id,))
+        if not cursor.fetchone():
+            raise ValueError("花型不存在")
+        
+        check_not_archived(cursor, start_date and validate_record_date(start_date),
+                           end_date and validate_record_date(end_date))
+        
+        # 预览时与重算一起回滚
+        if price is not None:
+            set_pattern_price(cursor, pattern_id, price, effective_from)
+        
+        price_sql = PRICE_AS_OF_SQL.format(record_date="records.record_date",
+                                           pattern="records.pattern_id")
+        where = f"pattern_id = ? AND total <> count * {price_sql}"
+        params = [pattern_id]
+        
+        if start_date:
+            where += " AND record_date >= ?"
+            params.append(validate_record_date(start_date))
+        
+        if end_date:
+            where += " AND record_date <= ?"
+            params.append(validate_record_date(end_date))
+        
+        cursor.execute(f'''
+            SELECT COUNT(*), COALESCE(SUM(count * {price_sql} - total), 0)
+            FROM records
+            WHERE {where}
+        ''', params)
+        affected, delta = cursor.fetchone()
+        
+        if not dry_run and affected:
+            cursor.execute(f"UPDATE records SET total = count * {price_sql} WHERE {where}", params)
+            conn.commit()
+        else:
+            conn.rollback()
+        
+        return {'affected': affected, 'delta': round(delta, 2)}
+        
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def build_report_matrix(rows: Iterable) -> Dict:
+    """
+    把 (员工, 花型, 针数, 金额) 汇总行转换为稠密矩阵，界面和各Excel导出直接按下标渲染
+    
+    Args:
+        rows: 包含 employee_name、pattern_name、total_count、total_amount 的行，
+              每个 (员工, 花型) 至多一行
+        
+    Returns:
+        {
+            'employees': 按名称排序的员工列表（行）,
+            'patterns': 按名称排序的花型列表（列）,
+            'counts': 针数矩阵 [行][列],
+            'amounts': 金额矩阵 [行][列],
+            'row_totals': {'counts': [...], 'amounts': [...]},
+            'column_totals': {'counts': [...], 'amounts': [...]},
+            'grand_total': {'count': 总针数, 'amount': 总金额}
+        }
+    """
+    cells = [(row['employee_name'], row['pattern_name'], row['total_count'] or 0,
+              row['total_amount'] or 0) for row in rows]
+    
+    employees = sorted({cell[0] for cell in cells})
+    patterns = sorted({cell[1] for cell in cells})
+    employee_index = {name: index for index, name in enumerate(employees)}
+    pattern_index = {name: index for index, name in enumerate(patterns)}
+    
+    counts = [[0] * len(patterns) for _ in employees]
+    amounts = [[0.0] * len(patterns) for _ in employees]
+    row_counts = [0] * len(employees)
+    row_amounts = [0.0] * len(employees)
+    column_counts = [0] * len(patterns)
+    column_amounts = [0.0] * len(patterns)
+    
+    for employee, pattern, count, amount in cells:
+        i = employee_index[employee]
+        j = pattern_index[pattern]
+        counts[i][j] += count
+        amounts[i][j] += amount
+        row_counts[i] += count
+        row_amounts[i] += amount
+        column_counts[j] += count
+        column_amounts[j] += amount
+    
+    return {
+        'employees': employees,
+        'patterns': patterns,
+        'counts': counts,
+        'amounts': amounts,
+        'row_totals': {'counts': row_counts, 'amounts': row_amounts},
+        'column_totals': {'counts': column_counts, 'amounts': column_amounts},
+        'grand_total': {'count': sum(row_counts), 'amount': sum(row_amounts)}
+    }
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """把请求的分页大小限制在 1..MAX_PAGE_SIZE 之间"""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
 
 class Database:
-    def __init__(self, db_path: str = "embroidery_system.db"):
+    def __init__(self, db_path: str = "embroidery_system.db", pool_size: int = 5,
+                 pool_timeout: float = 10.0, cache_size: int = 128):
         """
         初始化数据库连接
         
         Args:
             db_path: 数据库文件路径
+            pool_size: 连接池最大连接数
+            pool_timeout: 等待空闲连接的最长秒数
+            cache_size: 报表结果缓存的最大条目数
         """
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path, max_size=pool_size, timeout=pool_timeout)
+        self.report_cache = ReportCache(cache_size)
+        # 员工、花型及单价历史缓存，供录入和导入路径校验与计价
+        self.reference_cache = ReferenceCache()
+        # 最近一次同步当前单价的日期，为空时尚未同步（启动同步在写线程创建后进行）
+        self._prices_synced_on: Optional[str] = None
         self.init_database()
+        # 运行期间的全部写操作（员工、花型、单价、设置及工资记录）统一交给单写线程串行执行，
+        # 读连接在WAL模式下并发运行；建表和迁移在启动时直接执行
+        self.writer = WriteQueue(db_path)
+        self.sync_current_prices()
+        # 主库及归档库的在线备份
+        self.backups = BackupManager(db_path)
+    
+    def get_connection(self) -> PooledConnection:
+        """从连接池获取数据库连接，close() 即归还；日期变化后先同步当前单价"""
+        if (self._prices_synced_on is not None and self._prices_synced_on != date.today().isoformat()
+                and not self.writer.on_writer_thread()):
+            self.sync_current_prices()
+        return self.pool.acquire()
     
-    def get_connection(self) -> sqlite3.Connection:
-        """获取数据库连接"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # 启用字典访问
-        return conn
+    def close(self):
+        """停止写线程并关闭连接池"""
+        self.writer.close()
+        self.pool.close_all()
     
     def init_database(self):
         """初始化数据库表结构"""
@@ -73,8 +559,11 @@ class Database:
             
             conn.commit()
             
-            # 初始化默认数据
-            self._init_default_data()
+            # 执行尚未应用的结构迁移（索引等）
+            run_migrations(conn)
+            
+            # 初始化默认数据（沿用当前连接，单连接的连接池下不会等待自身）
+            self._init_default_data(conn)
             
         except Exception as e:
             conn.rollback()
@@ -82,8 +571,12 @@ class Database:
         finally:
             conn.close()
     
-    def _init_default_data(self):
-        """初始化默认花型数据"""
+    def _init_default_data(self, conn):
+        """初始化默认花型数据
+        
+        Args:
+            conn: init_database 正在使用的连接，不在此处归还
+        """
         default_patterns = [
             ("盖布", 5.5),
             ("浮花", 5.5),
@@ -99,50 +592,41 @@ class Database:
             ("盖网", 5.0)
         ]
         
-        conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
             for name, price in default_patterns:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO patterns (name, price) 
-                    VALUES (?, ?)
-                ''', (name, price))
+                cursor.execute(statement('insert_default_pattern'), (name, price))
             
             conn.commit()
         except Exception as e:
             conn.rollback()
             print(f"初始化默认数据失败: {e}")
-        finally:
-            conn.close()
     
     # ==================== 员工管理 ====================
     
-    def get_employees(self, search: str = "", order_by: str = "create_date DESC") -> List[Dict]:
+    def get_employees(self, search: str = "", order_by: str = "-create_date") -> List[Dict]:
         """
         获取员工列表
         
         Args:
             search: 搜索关键词
-            order_by: 排序方式
+            order_by: 排序键，见 query_module.SORT_KEYS['employees']
             
         Returns:
             员工列表
+            
+        Raises:
+            ValueError: 排序键不在白名单中
         """
+        order = order_clause('employees', order_by)
+        where, params = name_filter('employees', search)
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            sql = "SELECT * FROM employees WHERE 1=1"
-            params = []
-            
-            if search:
-                sql += " AND name LIKE ?"
-                params.append(f"%{search}%")
-            
-            sql += f" ORDER BY {order_by}"
-            
-            cursor.execute(sql, params)
+            cursor.execute(statement('select_employees', where, order), params)
             rows = cursor.fetchall()
             
             return [dict(row) for row in rows]
@@ -152,7 +636,7 @@ class Database:
     
     def add_employee(self, name: str, status: str = "active") -> Dict:
         """
-        添加员工
+        添加员工（在写线程上执行）
         
         Args:
             name: 员工姓名
@@ -161,17 +645,18 @@ class Database:
         Returns:
             操作结果
         """
-        conn = self.get_connection()
+        return self.writer.submit(self._add_employee, name, status)
+    
+    def _add_employee(self, conn: sqlite3.Connection, name: str, status: str = "active") -> Dict:
+        """添加员工的写线程实现"""
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                INSERT INTO employees (name, status) 
-                VALUES (?, ?)
-            ''', (name, status))
+            cursor.execute(statement('insert_employee'), (name, status))
             
             employee_id = cursor.lastrowid
             conn.commit()
+            self.reference_cache.invalidate()
             
             return {
                 "success": True,
@@ -185,12 +670,10 @@ class Database:
         except Exception as e:
             conn.rollback()
             return {"success": False, "message": f"添加失败: {str(e)}"}
-        finally:
-            conn.close()
     
     def update_employee(self, employee_id: int, name: str, status: str) -> Dict:
         """
-        更新员工信息
+        更新员工信息（在写线程上执行）
         
         Args:
             employee_id: 员工ID
@@ -200,20 +683,21 @@ class Database:
         Returns:
             操作结果
         """
-        conn = self.get_connection()
+        return self.writer.submit(self._update_employee, employee_id, name, status)
+    
+    def _update_employee(self, conn: sqlite3.Connection, employee_id: int, name: str,
+                         status: str) -> Dict:
+        """更新员工信息的写线程实现"""
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                UPDATE employees 
-                SET name = ?, status = ? 
-                WHERE id = ?
-            ''', (name, status, employee_id))
+            cursor.execute(statement('update_employee'), (name, status, employee_id))
             
             if cursor.rowcount == 0:
                 return {"success": False, "message": "员工不存在"}
             
             conn.commit()
+            self.reference_cache.invalidate()
             return {"success": True, "message": "员工信息更新成功"}
             
         except sqlite3.IntegrityError:
@@ -222,12 +706,10 @@ class Database:
         except Exception as e:
             conn.rollback()
             return {"success": False, "message": f"更新失败: {str(e)}"}
-        finally:
-            conn.close()
     
     def delete_employee(self, employee_id: int) -> Dict:
         """
-        删除员工
+        删除员工（在写线程上执行）
         
         Args:
             employee_id: 员工ID
@@ -235,58 +717,57 @@ class Database:
         Returns:
             操作结果
         """
-        conn = self.get_connection()
+        return self.writer.submit(self._delete_employee, employee_id)
+    
+    def _delete_employee(self, conn: sqlite3.Connection, employee_id: int) -> Dict:
+        """删除员工的写线程实现"""
         cursor = conn.cursor()
         
         try:
             # 检查是否有相关工资记录
-            cursor.execute("SELECT COUNT(*) FROM records WHERE employee_id = ?", (employee_id,))
+            cursor.execute(statement('count_employee_records'), (employee_id,))
             record_count = cursor.fetchone()[0]
             
             if record_count > 0:
                 return {"success": False, "message": f"无法删除，该员工有 {record_count} 条工资记录"}
             
-            cursor.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
+            cursor.execute(statement('delete_employee'), (employee_id,))
             
             if cursor.rowcount == 0:
                 return {"success": False, "message": "员工不存在"}
             
             conn.commit()
+            self.reference_cache.invalidate()
             return {"success": True, "message": "员工删除成功"}
             
         except Exception as e:
             conn.rollback()
             return {"success": False, "message": f"删除失败: {str(e)}"}
-        finally:
-            conn.close()
     
     # ==================== 花型管理 ====================
     
-    def get_patterns(self, search: str = "", order_by: str = "create_date DESC") -> List[Dict]:
+    def get_patterns(self, search: str = "", order_by: str = "-create_date") -> List[Dict]:
         """
         获取花型列表
         
         Args:
             search: 搜索关键词
-            order_by: 排序方式
+            order_by: 排序键，见 query_module.SORT_KEYS['patterns']
             
         Returns:
             花型列表
+            
+        Raises:
+            ValueError: 排序键不在白名单中
         """
+        order = order_clause('patterns', order_by)
+        where, params = name_filter('patterns', search)
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            sql = "SELECT * FROM patterns WHERE 1=1"
-            params = []
-            
-            if search:
-                sql += " AND name LIKE ?"
-                params.append(f"%{search}%")
-            
-            sql += f" ORDER BY {order_by}"
-            
-            cursor.execute(sql, params)
+            cursor.execute(statement('select_patterns', where, order), params)
             rows = cursor.fetchall()
             
             return [dict(row) for row in rows]
@@ -296,7 +777,7 @@ class Database:
     
     def add_pattern(self, name: str, price: float) -> Dict:
         """
-        添加花型
+        添加花型（在写线程上执行）
         
         Args:
             name: 花型名称
@@ -305,17 +786,18 @@ class Database:
         Returns:
             操作结果
         """
-        conn = self.get_connection()
+        return self.writer.submit(self._add_pattern, name, price)
+    
+    def _add_pattern(self, conn: sqlite3.Connection, name: str, price: float) -> Dict:
+        """添加花型的写线程实现"""
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                INSERT INTO patterns (name, price) 
-                VALUES (?, ?)
-            ''', (name, price))
+            cursor.execute(statement('insert_pattern'), (name, price))
             
             pattern_id = cursor.lastrowid
             conn.commit()
+            self.reference_cache.invalidate()
             
             return {
                 "success": True,
@@ -329,35 +811,54 @@ class Database:
         except Exception as e:
             conn.rollback()
             return {"success": False, "message": f"添加失败: {str(e)}"}
-        finally:
-            conn.close()
     
-    def update_pattern(self, pattern_id: int, name: str, price: float) -> Dict:
+    def update_pattern(self, pattern_id: int, name: str, price: float,
+                       effective_from: str = None) -> Dict:
         """
-        更新花型信息
+        更新花型信息（在写线程上执行）
+        
+        未给出 effective_from 时新单价自今天起生效，今天之前的记录仍按原单价计价，
+        reprice_pattern_records 也不会改变它们；调整过去的单价需要给出生效日期。
         
         Args:
             pattern_id: 花型ID
             name: 花型名称
             price: 花型单价
+            effective_from: 新单价的生效日期，为空时为今天
             
         Returns:
             操作结果
         """
-        conn = self.get_connection()
+        if effective_from:
+            try:
+                effective_from = validate_record_date(effective_from)
+            except ValueError as e:
+                return {"success": False, "message": str(e)}
+        
+        return self.writer.submit(self._update_pattern, pattern_id, name, price, effective_from)
+    
+    def _update_pattern(self, conn: sqlite3.Connection, pattern_id: int, name: str,
+                        price: float, effective_from: str = None) -> Dict:
+        """更新花型信息的写线程实现"""
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                UPDATE patterns 
-                SET name = ?, price = ? 
-                WHERE id = ?
-            ''', (name, price, pattern_id))
+            if effective_from:
+                cursor.execute(statement('update_pattern_name'), (name, pattern_id))
+            else:
+                cursor.execute(statement('update_pattern'), (name, price, pattern_id))
             
             if cursor.rowcount == 0:
                 return {"success": False, "message": "花型不存在"}
             
+            if effective_from:
+                # 单价写入历史，当前单价同步为今天生效的单价
+                set_pattern_price(cursor, pattern_id, price, effective_from)
+            
             conn.commit()
+            self.reference_cache.invalidate()
+            if effective_from:
+                return {"success": True, "message": f"花型信息更新成功，新单价自 {effective_from} 起生效"}
             return {"success": True, "message": "花型信息更新成功"}
             
         except sqlite3.IntegrityError:
@@ -366,12 +867,158 @@ class Database:
         except Exception as e:
             conn.rollback()
             return {"success": False, "message": f"更新失败: {str(e)}"}
+    
+    def get_reference_data(self) -> ReferenceData:
+        """
+        获取员工、花型参考数据快照（缓存，员工或花型变化后自动刷新）
+        
+        Returns:
+            参考数据快照，调用方不得修改
+        """
+        conn = self.get_connection()
+        
+        try:
+            return self.reference_cache.get(conn.cursor())
+        finally:
+            conn.close()
+    
+    def get_pattern_prices(self, pattern_id: int) -> List[Dict]:
+        """
+        获取花型单价历史
+        
+        Args:
+            pattern_id: 花型ID
+            
+        Returns:
+            单价历史，按生效日期倒序
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(statement('select_pattern_prices'), (pattern_id,))
+            rows = cursor.fetchall()
+            
+            return [dict(row) for row in rows]
+            
         finally:
             conn.close()
     
+    def set_pattern_price(self, pattern_id: int, price: float, effective_from: str) -> Dict:
+        """
+        设置花型自某日起生效的单价，当前单价同步为当天生效的单价（在写线程上执行）
+        
+        Args:
+            pattern_id: 花型ID
+            price: 单价
+            effective_from: 生效日期
+            
+        Returns:
+            操作结果
+        """
+        try:
+            effective_from = validate_record_date(effective_from)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        
+        return self.writer.submit(self._set_pattern_price, pattern_id, price, effective_from)
+    
+    def _set_pattern_price(self, conn: sqlite3.Connection, pattern_id: int, price: float,
+                           effective_from: str) -> Dict:
+        """设置花型单价的写线程实现"""
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(statement('pattern_exists'), (pattern_id,))
+            if not cursor.fetchone():
+                return {"success": False, "message": "花型不存在"}
+            
+            set_pattern_price(cursor, pattern_id, price, effective_from)
+            conn.commit()
+            self.reference_cache.invalidate()
+            return {"success": True, "message": f"单价已设置，自 {effective_from} 起生效"}
+            
+        except Exception as e:
+            conn.rollback()
+            return {"success": False, "message": f"设置失败: {str(e)}"}
+    
+    def sync_current_prices(self) -> int:
+        """
+        把花型当前单价同步为今天生效的单价（在写线程上执行）
+        
+        以后生效的单价到期后 patterns.price 不会自行变化，启动时及日期变化后的首次读取前调用。
+        
+        Returns:
+            单价发生变化的花型数
+        """
+        return self.writer.submit(self._sync_current_prices)
+    
+    def _sync_current_prices(self, conn: sqlite3.Connection) -> int:
+        """同步当前单价的写线程实现"""
+        today = date.today().isoformat()
+        cursor = conn.cursor()
+        
+        try:
+            changed = sync_current_prices(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        self._prices_synced_on = today
+        if changed:
+            self.reference_cache.invalidate()
+        return changed
+    
+    def reprice_pattern_records(self, pattern_id: int, start_date: str = None,
+                                end_date: str = None, dry_run: bool = False,
+                                price: float = None, effective_from: str = None) -> Dict:
+        """
+        按记录日期生效的花型单价重算历史工资记录金额（单条SQL，在写线程上执行）
+        
+        重算使用每条记录日期当天生效的单价，而不是花型的当前单价：修改花型单价只从当天起生效，
+        调整过去某段时间的单价需要给出 price 和 effective_from（或先调用 set_pattern_price）。
+        
+        Args:
+            pattern_id: 花型ID
+            start_date: 开始日期，为空表示不限（给出 effective_from 时默认为该日期）
+            end_date: 结束日期，为空表示不限
+            dry_run: 只预览受影响条数和金额变化，不修改数据（包括 price 指定的单价）
+            price: 新单价，与 effective_from 一起给出时在同一事务中先设置单价再重算
+            effective_from: 新单价的生效日期
+            
+        Returns:
+            操作结果，data 包含 affected、delta
+        """
+        try:
+            result = self.writer.submit(reprice_records_where, pattern_id, start_date, end_date,
+                                        dry_run, price, effective_from)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            return {"success": False, "message": f"重算失败: {str(e)}"}
+        
+        if price is not None and not dry_run:
+            self.reference_cache.invalidate()
+        
+        if not result['affected']:
+            return {
+                "success": True,
+                "message": "没有需要重算的记录：各记录日期生效的单价与已记金额一致，"
+                           "调整过去的单价请同时给出新单价和生效日期",
+                "data": result
+            }
+        
+        action = "预计重算" if dry_run else "已重算"
+        return {
+            "success": True,
+            "message": f"{action} {result['affected']} 条记录，金额变化 {result['delta']:.2f}",
+            "data": result
+        }
+    
     def delete_pattern(self, pattern_id: int) -> Dict:
         """
-        删除花型
+        删除花型（在写线程上执行）
         
         Args:
             pattern_id: 花型ID
@@ -379,36 +1026,38 @@ class Database:
         Returns:
             操作结果
         """
-        conn = self.get_connection()
+        return self.writer.submit(self._delete_pattern, pattern_id)
+    
+    def _delete_pattern(self, conn: sqlite3.Connection, pattern_id: int) -> Dict:
+        """删除花型的写线程实现"""
         cursor = conn.cursor()
         
         try:
             # 检查是否有相关工资记录
-            cursor.execute("SELECT COUNT(*) FROM records WHERE pattern_id = ?", (pattern_id,))
+            cursor.execute(statement('count_pattern_records'), (pattern_id,))
             record_count = cursor.fetchone()[0]
             
             if record_count > 0:
                 return {"success": False, "message": f"无法删除，该花型有 {record_count} 条工资记录"}
             
-            cursor.execute("DELETE FROM patterns WHERE id = ?", (pattern_id,))
+            cursor.execute(statement('delete_pattern'), (pattern_id,))
             
             if cursor.rowcount == 0:
                 return {"success": False, "message": "花型不存在"}
             
             conn.commit()
+            self.reference_cache.invalidate()
             return {"success": True, "message": "花型删除成功"}
             
         except Exception as e:
             conn.rollback()
             return {"success": False, "message": f"删除失败: {str(e)}"}
-        finally:
-            conn.close()
     
     # ==================== 工资记录管理 ====================
     
     def get_records(self, employee_id: int = None, pattern_id: int = None, 
                    start_date: str = None, end_date: str = None, 
-                   order_by: str = "record_date DESC") -> List[Dict]:
+                   order_by: str = "-record_date") -> List[Dict]:
         """
         获取工资记录列表
         
@@ -417,83 +1066,180 @@ class Database:
             pattern_id: 花型ID
             start_date: 开始日期
             end_date: 结束日期
-            order_by: 排序方式
+            order_by: 排序键，见 query_module.SORT_KEYS['records']
             
         Returns:
             工资记录列表
+            
+        Raises:
+            ValueError: 排序键不在白名单中
         """
+        order = order_clause('records', order_by)
+        where, params = record_filter(employee_id, pattern_id, start_date, end_date)
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            sql = '''
-                SELECT r.*, e.name as employee_name, p.name as pattern_name, p.price
-                FROM records r
-                JOIN employees e ON r.employee_id = e.id
-                JOIN patterns p ON r.pattern_id = p.id
-                WHERE 1=1
-            '''
-            params = []
-            
-            if employee_id:
-                sql += " AND r.employee_id = ?"
-                params.append(employee_id)
-            
-            if pattern_id:
-                sql += " AND r.pattern_id = ?"
-                params.append(pattern_id)
-            
-            if start_date:
-                sql += " AND r.record_date >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                sql += " AND r.record_date <= ?"
-                params.append(end_date)
-            
-            sql += f" ORDER BY {order_by}"
-            
-            cursor.execute(sql, params)
-            rows = cursor.fetchall()
+            with self._records_source(conn, start_date, end_date) as records:
+                cursor.execute(statement('select_records', where, order, records), params)
+                rows = cursor.fetchall()
             
             return [dict(row) for row in rows]
             
         finally:
             conn.close()
     
-    def add_record(self, employee_id: int, pattern_id: int, record_date: str, 
-                  count: int, special: str = "", note: str = "") -> Dict:
+    def get_records_page(self, employee_id: int = None, pattern_id: int = None,
+                         start_date: str = None, end_date: str = None,
+                         cursor: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                         with_total: bool = False) -> Dict:
         """
-        添加工资记录
+        按 (record_date, id) 倒序分页获取工资记录（键集分页）
         
         Args:
             employee_id: 员工ID
             pattern_id: 花型ID
-            record_date: 记录日期
-            count: 针数
-            special: 特殊标记
-            note: 备注
+            start_date: 开始日期
+            end_date: 结束日期
+            cursor: 上一页返回的 next_cursor，为空时取第一页
+            limit: 每页条数，最大 MAX_PAGE_SIZE
+            with_total: 是否另外统计符合条件的总条数
             
         Returns:
-            操作结果
+            {'records': 本页记录, 'next_cursor': 下一页游标或None, 'total': 总数或None}
+            
+        Raises:
+            ValueError: 游标格式无效
         """
+        limit = clamp_page_size(limit)
+        before = decode_cursor(cursor) if cursor else None
+        
+        page_where, page_params = record_filter(employee_id, pattern_id, start_date, end_date,
+                                                before)
+        
         conn = self.get_connection()
-        cursor = conn.cursor()
+        db_cursor = conn.cursor()
         
         try:
-            # 获取花型单价
-            cursor.execute("SELECT price FROM patterns WHERE id = ?", (pattern_id,))
-            pattern = cursor.fetchone()
-            if not pattern:
-                return {"success": False, "message": "花型不存在"}
+            with self._records_source(conn, start_date, end_date) as source:
+                # 多取一条用于判断是否还有下一页
+                db_cursor.execute(statement('select_records_page', page_where, records=source),
+                                  page_params + [limit + 1])
+                rows = db_cursor.fetchall()
+                
+                total = None
+                if with_total:
+                    where, params = record_filter(employee_id, pattern_id, start_date, end_date)
+                    db_cursor.execute(statement('count_records', where, records=source), params)
+                    total = db_cursor.fetchone()[0]
+            
+            records = [dict(row) for row in rows[:limit]]
+            next_cursor = None
+            if len(rows) > limit:
+                last = records[-1]
+                next_cursor = encode_cursor(last['record_date'], last['id'])
             
-            price = pattern[0]
-            total = count * price
+            return {
+                'records': records,
+                'next_cursor': next_cursor,
+                'total': total
+            }
             
-            cursor.execute('''
-                INSERT INTO records (employee_id, pattern_id, record_date, count, total, special, note)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (employee_id, pattern_id, record_date, count, total, special, note))
+        finally:
+            conn.close()
+    
+    def _iter_query(self, name: str, where: str, params: List, batch_size: int,
+                    order_by: str = '', archive_range: Optional[tuple] = None) -> Iterator[Dict]:
+        """
+        分批读取查询结果，迭代期间占用一个连接，迭代结束或生成器关闭时归还
+        
+        Args:
+            name: 语句名称
+            where: 查询条件
+            params: 查询参数
+            batch_size: 每批读取的行数
+            order_by: 排序子句
+            archive_range: 工资记录查询的 (开始日期, 结束日期)，用于确定需要读取的归档库
+            
+        Returns:
+            逐行产出的字典
+        """
+        conn = self.get_connection()
+        
+        try:
+            years = archived_years(conn.cursor(), *archive_range) if archive_range else []
+            with attach_archives(conn, self.db_path, years) as records:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(statement(name, where, order_by, records), params)
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        for row in rows:
+                            yield dict(row)
+                finally:
+                    # 先结束语句，才能 DETACH 归档库
+                    cursor.close()
+        finally:
+            conn.close()
+    
+    def iter_records(self, employee_id: int = None, pattern_id: int = None,
+                     start_date: str = None, end_date: str = None,
+                     batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Dict]:
+        """
+        流式获取工资记录，按 (record_date, id) 倒序，内存占用与结果集大小无关
+        
+        Args:
+            employee_id: 员工ID
+            pattern_id: 花型ID
+            start_date: 开始日期
+            end_date: 结束日期
+            batch_size: 每批读取的行数
+            
+        Returns:
+            工资记录迭代器
+        """
+        where, params = record_filter(employee_id, pattern_id, start_date, end_date)
+        
+        return self._iter_query('select_records', where, params, batch_size,
+                                order_clause('records', '-record_date'), (start_date, end_date))
+    
+    def add_record(self, employee_id: int, pattern_id: int, record_date: str, 
+                  count: int, special: str = "", note: str = "") -> Dict:
+        """
+        添加工资记录（在写线程上执行）
+        
+        Args:
+            employee_id: 员工ID
+            pattern_id: 花型ID
+            record_date: 记录日期
+            count: 针数
+            special: 特殊标记
+            note: 备注
+            
+        Returns:
+            操作结果
+        """
+        return self.writer.submit(self._add_record, employee_id, pattern_id,
+                                  record_date, count, special, note)
+    
+    def _add_record(self, conn: sqlite3.Connection, employee_id: int, pattern_id: int,
+                    record_date: str, count: int, special: str = "", note: str = "") -> Dict:
+        """添加工资记录的写线程实现"""
+        cursor = conn.cursor()
+        
+        try:
+            # 获取记录日期当天生效的花型单价
+            price = self.reference_cache.get(cursor).price_as_of(pattern_id, record_date)
+            if price is None:
+                return {"success": False, "message": "花型不存在"}
+            
+            total = count * price
+            
+            cursor.execute(statement('insert_record'),
+                           (employee_id, pattern_id, record_date, count, total, special, note))
             
             record_id = cursor.lastrowid
             conn.commit()
@@ -516,13 +1262,33 @@ class Database:
         except Exception as e:
             conn.rollback()
             return {"success": False, "message": f"添加失败: {str(e)}"}
-        finally:
-            conn.close()
+    
+    def add_records_bulk(self, rows: List[Dict]) -> Dict:
+        """
+        批量添加工资记录（单个事务，在写线程上执行）
+        
+        Args:
+            rows: 记录列表，每项包含 employee_id、pattern_id、record_date、count，
+                  可选 special、note
+            
+        Returns:
+            操作结果，data 中包含插入条数和逐行错误
+        """
+        try:
+            result = self.writer.submit(insert_records_bulk, rows, self.reference_cache)
+        except Exception as e:
+            return {"success": False, "message": f"批量添加失败: {str(e)}"}
+        
+        return {
+            "success": True,
+            "message": f"批量添加完成: 成功{result['inserted']}条，失败{len(result['errors'])}条",
+            "data": result
+        }
     
     def update_record(self, record_id: int, employee_id: int, pattern_id: int, 
                      record_date: str, count: int, special: str = "", note: str = "") -> Dict:
         """
-        更新工资记录
+        更新工资记录（在写线程上执行）
         
         Args:
             record_id: 记录ID
@@ -536,24 +1302,26 @@ class Database:
         Returns:
             操作结果
         """
-        conn = self.get_connection()
+        return self.writer.submit(self._update_record, record_id, employee_id, pattern_id,
+                                  record_date, count, special, note)
+    
+    def _update_record(self, conn: sqlite3.Connection, record_id: int, employee_id: int,
+                       pattern_id: int, record_date: str, count: int,
+                       special: str = "", note: str = "") -> Dict:
+        """更新工资记录的写线程实现"""
         cursor = conn.cursor()
         
         try:
-            # 获取花型单价
-            cursor.execute("SELECT price FROM patterns WHERE id = ?", (pattern_id,))
-            pattern = cursor.fetchone()
-            if not pattern:
+            # 获取记录日期当天生效的花型单价
+            price = self.reference_cache.get(cursor).price_as_of(pattern_id, record_date)
+            if price is None:
                 return {"success": False, "message": "花型不存在"}
             
-            price = pattern[0]
             total = count * price
             
-            cursor.execute('''
-                UPDATE records 
-                SET employee_id = ?, pattern_id = ?, record_date = ?, count = ?, total = ?, special = ?, note = ?
-                WHERE id = ?
-            ''', (employee_id, pattern_id, record_date, count, total, special, note, record_id))
+            cursor.execute(statement('update_record'),
+                           (employee_id, pattern_id, record_date, count, total, special, note,
+                            record_id))
             
             if cursor.rowcount == 0:
                 return {"success": False, "message": "记录不存在"}
@@ -564,12 +1332,10 @@ class Database:
         except Exception as e:
             conn.rollback()
             return {"success": False, "message": f"更新失败: {str(e)}"}
-        finally:
-            conn.close()
     
     def delete_record(self, record_id: int) -> Dict:
         """
-        删除工资记录
+        删除工资记录（在写线程上执行）
         
         Args:
             record_id: 记录ID
@@ -577,11 +1343,14 @@ class Database:
         Returns:
             操作结果
         """
-        conn = self.get_connection()
+        return self.writer.submit(self._delete_record, record_id)
+    
+    def _delete_record(self, conn: sqlite3.Connection, record_id: int) -> Dict:
+        """删除工资记录的写线程实现"""
         cursor = conn.cursor()
         
         try:
-            cursor.execute("DELETE FROM records WHERE id = ?", (record_id,))
+            cursor.execute(statement('delete_record'), (record_id,))
             
             if cursor.rowcount == 0:
                 return {"success": False, "message": "记录不存在"}
@@ -592,51 +1361,162 @@ class Database:
         except Exception as e:
             conn.rollback()
             return {"success": False, "message": f"删除失败: {str(e)}"}
+    
+    def update_records_by_filter(self, filters: Dict, changes: Dict) -> Dict:
+        """
+        按筛选条件批量修改工资记录（单条SQL，在写线程上执行）
+        
+        Args:
+            filters: 可包含 employee_id、pattern_id、start_date、end_date、ids
+            changes: 可包含 employee_id、pattern_id、record_date，金额按新花型单价重算
+            
+        Returns:
+            操作结果，data.affected 为修改条数
+        """
+        try:
+            affected = self.writer.submit(update_records_where, filters, changes)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            return {"success": False, "message": f"批量更新失败: {str(e)}"}
+        
+        return {
+            "success": True,
+            "message": f"批量更新成功，共 {affected} 条记录",
+            "data": {"affected": affected}
+        }
+    
+    def delete_records_by_filter(self, filters: Dict) -> Dict:
+        """
+        按筛选条件批量删除工资记录（单条SQL，在写线程上执行）
+        
+        Args:
+            filters: 可包含 employee_id、pattern_id、start_date、end_date、ids
+            
+        Returns:
+            操作结果，data.affected 为删除条数
+        """
+        try:
+            affected = self.writer.submit(delete_records_where, filters)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            return {"success": False, "message": f"批量删除失败: {str(e)}"}
+        
+        return {
+            "success": True,
+            "message": f"批量删除成功，共 {affected} 条记录",
+            "data": {"affected": affected}
+        }
+    
+    # ==================== 全文搜索 ====================
+    
+    def search(self, keyword: str, limit: int = SEARCH_LIMIT,
+               scopes: List[str] = SEARCH_SCOPES) -> Dict[str, List[Dict]]:
+        """
+        在员工姓名、花型名称、工资记录备注和特殊标记中搜索
+        
+        关键词不少于三个字符时使用 trigram 全文索引并按相关度排序，
+        否则退回 LIKE 查询，工资记录按日期倒序。
+        
+        Args:
+            keyword: 搜索关键词
+            limit: 每类结果最多返回的条数，最大 MAX_PAGE_SIZE
+            scopes: 搜索范围，'employees'、'patterns'、'records' 的子集
+            
+        Returns:
+            {范围: 命中列表}，工资记录附带 snippet 高亮片段（LIKE 查询时为 None）
+            
+        Raises:
+            ValueError: 关键词为空或搜索范围无效
+        """
+        keyword = (keyword or '').strip()
+        if not keyword:
+            raise ValueError("搜索关键词不能为空")
+        
+        invalid = [scope for scope in scopes if scope not in SEARCH_SCOPES]
+        if invalid:
+            raise ValueError(f"不支持的搜索范围: {', '.join(invalid)}")
+        
+        limit = clamp_page_size(limit)
+        trigram = use_trigram(keyword)
+        pattern = f"%{keyword}%"
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            results = {}
+            
+            for scope in scopes:
+                if trigram:
+                    cursor.execute(statement(f'search_{scope}'), (fts_phrase(keyword), limit))
+                elif scope == 'records':
+                    cursor.execute(statement('search_records_like'), (pattern, pattern, limit))
+                else:
+                    cursor.execute(statement(f'search_{scope}_like'), (pattern, limit))
+                
+                results[scope] = [dict(row) for row in cursor.fetchall()]
+            
+            return results
+            
         finally:
             conn.close()
     
     # ==================== 统计报表 ====================
     
+    def get_data_versions(self, scopes: List[str]) -> tuple:
+        """
+        获取数据版本号，任一进程写入相应数据后版本号递增
+        
+        Args:
+            scopes: 版本范围，如 'YYYY-MM'、'records'、'employees'、'patterns'
+            
+        Returns:
+            与 scopes 顺序一致的版本号
+        """
+        conn = self.get_connection()
+        
+        try:
+            return read_data_versions(conn.cursor(), scopes)
+        finally:
+            conn.close()
+    
+    def cache_stats(self) -> Dict:
+        """
+        获取报表缓存命中统计
+        
+        Returns:
+            缓存统计信息
+        """
+        return self.report_cache.stats()
+    
     def get_daily_summary(self, start_date: str = None, end_date: str = None) -> List[Dict]:
         """
-        获取日工资汇总
+        获取日工资汇总（读取 daily_totals 日汇总表，结果按数据版本缓存）
         
         Args:
             start_date: 开始日期
             end_date: 结束日期
             
         Returns:
-            日汇总数据
+            日汇总数据，与缓存共享，调用方不得修改
         """
+        scopes = month_scopes(start_date, end_date) + ['employees', 'patterns']
+        return self.report_cache.get_or_compute(
+            ('get_daily_summary', start_date, end_date),
+            self.get_data_versions(scopes),
+            lambda: self._get_daily_summary(start_date, end_date)
+        )
+    
+    def _get_daily_summary(self, start_date: str = None, end_date: str = None) -> List[Dict]:
+        """查询日工资汇总（不经过缓存）"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            sql = '''
-                SELECT 
-                    r.record_date,
-                    e.name as employee_name,
-                    p.name as pattern_name,
-                    SUM(r.count) as total_count,
-                    SUM(r.total) as total_amount
-                FROM records r
-                JOIN employees e ON r.employee_id = e.id
-                JOIN patterns p ON r.pattern_id = p.id
-                WHERE 1=1
-            '''
-            params = []
-            
-            if start_date:
-                sql += " AND r.record_date >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                sql += " AND r.record_date <= ?"
-                params.append(end_date)
-            
-            sql += " GROUP BY r.record_date, r.employee_id, r.pattern_id ORDER BY r.record_date DESC"
-            
-            cursor.execute(sql, params)
+            where, params = record_filter(start_date=start_date, end_date=end_date)
+            cursor.execute(statement('select_daily_summary', where), params)
             rows = cursor.fetchall()
             
             return [dict(row) for row in rows]
@@ -644,17 +1524,43 @@ class Database:
         finally:
             conn.close()
     
+    def iter_daily_summary(self, start_date: str = None, end_date: str = None,
+                           batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Dict]:
+        """
+        流式获取日工资汇总，字段与 get_daily_summary 相同
+        
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            batch_size: 每批读取的行数
+            
+        Returns:
+            日汇总数据迭代器
+        """
+        where, params = record_filter(start_date=start_date, end_date=end_date)
+        
+        return self._iter_query('select_daily_summary', where, params, batch_size)
+    
     def get_monthly_summary(self, year: int, month: int) -> Dict:
         """
-        获取月工资汇总
+        获取月工资汇总矩阵（读取 daily_totals 日汇总表，结果按数据版本缓存）
         
         Args:
             year: 年份
             month: 月份
             
         Returns:
-            月汇总数据
+            build_report_matrix 生成的矩阵，另含 year、month，与缓存共享，调用方不得修改
         """
+        scopes = [f"{year}-{month:02d}", 'employees', 'patterns']
+        return self.report_cache.get_or_compute(
+            ('get_monthly_summary', year, month),
+            self.get_data_versions(scopes),
+            lambda: self._get_monthly_summary(year, month)
+        )
+    
+    def _get_monthly_summary(self, year: int, month: int) -> Dict:
+        """查询月工资汇总矩阵（不经过缓存）"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -666,52 +1572,445 @@ class Database:
             else:
                 end_date = f"{year}-{month+1:02d}-01"
             
-            sql = '''
-                SELECT 
-                    e.name as employee_name,
-                    p.name as pattern_name,
-                    SUM(r.count) as total_count,
-                    SUM(r.total) as total_amount
-                FROM records r
-                JOIN employees e ON r.employee_id = e.id
-                JOIN patterns p ON r.pattern_id = p.id
-                WHERE r.record_date >= ? AND r.record_date < ?
-                GROUP BY r.employee_id, r.pattern_id
-                ORDER BY e.name, p.name
-            '''
-            
-            cursor.execute(sql, (start_date, end_date))
-            rows = cursor.fetchall()
+            cursor.execute(statement('select_monthly_summary'), (start_date, end_date))
             
-            # 组织数据格式
-            data = {}
-            patterns = set()
+            matrix = build_report_matrix(cursor.fetchall())
+            matrix['year'] = year
+            matrix['month'] = month
+            return matrix
             
-            for row in rows:
-                employee = row['employee_name']
-                pattern = row['pattern_name']
-                count = row['total_count']
-                amount = row['total_amount']
-                
-                if employee not in data:
-                    data[employee] = {}
-                
-                data[employee][pattern] = {
-                    'count': count,
-                    'amount': amount
-                }
-                patterns.add(pattern)
+        finally:
+            conn.close()
+    
+    def get_dashboard_stats(self, date: str = None) -> Dict:
+        """
+        获取工作台统计：员工数、花型数及指定日期的记录条数、针数和工资（结果按数据版本缓存）
+        
+        Args:
+            date: 统计日期，为空时为今天
             
-            return {
-                'data': data,
-                'patterns': sorted(list(patterns)),
-                'year': year,
-                'month': month
-            }
+        Returns:
+            统计数据，与缓存共享，调用方不得修改
+            
+        Raises:
+            ValueError: 日期格式无效
+        """
+        date = validate_record_date(date) if date else datetime.now().strftime('%Y-%m-%d')
+        
+        return self.report_cache.get_or_compute(
+            ('get_dashboard_stats', date),
+            self.get_data_versions([date[:7], 'employees', 'patterns']),
+            lambda: self._get_dashboard_stats(date)
+        )
+    
+    def _get_dashboard_stats(self, date: str) -> Dict:
+        """查询工作台统计（不经过缓存，当日数据读取 daily_totals 日汇总表）"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(statement('select_dashboard_stats'), (date,))
+            stats = dict(cursor.fetchone())
+            stats['date'] = date
+            return stats
+            
+        finally:
+            conn.close()
+    
+    def get_range_report(self, start_date: str, end_date: str, period: str = 'month',
+                         source: str = 'daily_totals') -> Dict:
+        """
+        获取任意日期区间的报表：员工×花型矩阵、按日/周/月分桶及合计（向量化计算，按数据版本缓存）
+        
+        Args:
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            period: 分桶周期，'day'、'week' 或 'month'
+            source: 数据源，'daily_totals' 或 'records'
+            
+        Returns:
+            {'start_date', 'end_date', 'period', 'matrix', 'buckets', 'totals'}，
+            与缓存共享，调用方不得修改
+            
+        Raises:
+            ValueError: 日期、周期或数据源无效
+        """
+        start_date, end_date = self._validate_report_range(start_date, end_date, source)
+        if period not in PERIODS:
+            raise ValueError(f"不支持的统计周期: {period}")
+        
+        scopes = month_scopes(start_date, end_date) + ['employees', 'patterns']
+        return self.report_cache.get_or_compute(
+            ('get_range_report', start_date, end_date, period, source),
+            self.get_data_versions(scopes),
+            lambda: self._get_range_report(start_date, end_date, period, source)
+        )
+    
+    def _get_range_report(self, start_date: str, end_date: str, period: str,
+                          source: str) -> Dict:
+        """计算区间报表（不经过缓存）"""
+        report = self._load_range_report(start_date, end_date, source)
+        
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'period': period,
+            'matrix': report.matrix(),
+            'buckets': report.buckets(period),
+            'totals': report.totals()
+        }
+    
+    def get_rollup_report(self, start_date: str, end_date: str,
+                          source: str = 'daily_totals') -> Dict:
+        """
+        获取任意日期区间的多级汇总：一次读取，同时得到
+        日×员工×花型、员工、花型、日及总计各级合计（按数据版本缓存）
+        
+        Args:
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            source: 数据源，'daily_totals' 或 'records'
+            
+        Returns:
+            {'start_date', 'end_date', 'details', 'employees', 'patterns', 'days', 'grand_total'}，
+            与缓存共享，调用方不得修改
+            
+        Raises:
+            ValueError: 日期或数据源无效
+        """
+        start_date, end_date = self._validate_report_range(start_date, end_date, source)
+        
+        scopes = month_scopes(start_date, end_date) + ['employees', 'patterns']
+        return self.report_cache.get_or_compute(
+            ('get_rollup_report', start_date, end_date, source),
+            self.get_data_versions(scopes),
+            lambda: self._get_rollup_report(start_date, end_date, source)
+        )
+    
+    def _get_rollup_report(self, start_date: str, end_date: str, source: str) -> Dict:
+        """计算多级汇总（不经过缓存）"""
+        report = self._load_range_report(start_date, end_date, source)
+        
+        return {'start_date': start_date, 'end_date': end_date, **report.rollup()}
+    
+    def _load_range_report(self, start_date: str, end_date: str, source: str) -> RangeReport:
+        """读取区间报表数据，数据源为 records 时包含已归档的记录"""
+        conn = self.get_connection()
+        
+        try:
+            if source != 'records':
+                return RangeReport.load(conn.cursor(), start_date, end_date, source)
+            with self._records_source(conn, start_date, end_date) as records:
+                return RangeReport.load(conn.cursor(), start_date, end_date, source, records)
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _validate_report_range(start_date: str, end_date: str, source: str):
+        """校验报表日期区间和数据源，返回规范化后的 (开始日期, 结束日期)"""
+        start_date = validate_record_date(start_date)
+        end_date = validate_record_date(end_date)
+        if start_date > end_date:
+            raise ValueError("开始日期不能晚于结束日期")
+        if source not in REPORT_SOURCES:
+            raise ValueError(f"不支持的数据源: {source}")
+        return start_date, end_date
+    
+    def rebuild_daily_totals(self) -> Dict:
+        """
+        从工资记录全量重建日汇总表（在写线程上执行）
+        
+        Returns:
+            操作结果
+        """
+        return self.writer.submit(self._rebuild_daily_totals)
+    
+    def _rebuild_daily_totals(self, conn: sqlite3.Connection) -> Dict:
+        """重建日汇总表的写线程实现，已归档的记录一并计入"""
+        cursor = conn.cursor()
+        
+        try:
+            with self._records_source(conn) as records:
+                cursor.execute("BEGIN IMMEDIATE")
+                count = rebuild_daily_totals(cursor, records)
+                conn.commit()
+            return {"success": True, "message": "日汇总表重建成功", "data": {"rows": count}}
+            
+        except Exception as e:
+            conn.rollback()
+            return {"success": False, "message": f"重建失败: {str(e)}"}
+    
+    # ==================== 归档 ====================
+    
+    @contextmanager
+    def _records_source(self, conn: sqlite3.Connection, start_date: str = None,
+                        end_date: str = None) -> Iterator[str]:
+        """
+        在连接上 ATTACH 日期范围涉及的归档库
+        
+        Args:
+            conn: 不在事务中的连接
+            start_date: 开始日期，为空时不限
+            end_date: 结束日期，为空时不限
+            
+        Returns:
+            代替 records 表的数据源，退出时 DETACH
+        """
+        years = archived_years(conn.cursor(), start_date, end_date)
+        with attach_archives(conn, self.db_path, years) as records:
+            yield records
+    
+    def get_archived_months(self) -> List[Dict]:
+        """
+        获取已归档月份及其月合计
+        
+        Returns:
+            按月份升序的 [{'month', 'year', 'record_count', 'total_count', 'total_amount', 'archived_at'}]
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(statement('select_archived_months'))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def archive_month(self, month: str) -> Dict:
+        """
+        把一个已结束月份的工资记录移入归档库（在写线程上执行）
+        
+        Args:
+            month: 月份（YYYY-MM）
+            
+        Returns:
+            操作结果
+        """
+        try:
+            result = self.writer.submit(archive_month, self.db_path, month)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            return {"success": False, "message": f"归档失败: {str(e)}"}
+        
+        return {"success": True, "message": f"{result['month']} 已归档 {result['archived']} 条记录",
+                "data": result}
+    
+    def archive_records(self, before_month: str) -> Dict:
+        """
+        归档 before_month 之前仍在主库中的全部月份，每个月份一个事务
+        
+        Args:
+            before_month: 截止月份（YYYY-MM，不含），不得晚于当前月份
+            
+        Returns:
+            操作结果，data['months'] 为各月份的归档结果
+        """
+        conn = self.get_connection()
+        
+        try:
+            months = archivable_months(conn.cursor(), before_month)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        finally:
+            conn.close()
+        
+        archived = []
+        for month in months:
+            result = self.archive_month(month)
+            if not result['success']:
+                return {"success": False, "message": result['message'], "data": {"months": archived}}
+            archived.append(result['data'])
+        
+        total = sum(item['archived'] for item in archived)
+        return {"success": True, "message": f"已归档 {len(archived)} 个月份，共 {total} 条记录",
+                "data": {"months": archived}}
+    
+    def restore_month(self, month: str) -> Dict:
+        """
+        把已归档月份的工资记录移回主库（在写线程上执行）
+        
+        Args:
+            month: 月份（YYYY-MM）
+            
+        Returns:
+            操作结果
+        """
+        try:
+            result = self.writer.submit(restore_month, self.db_path, month)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            return {"success": False, "message": f"恢复失败: {str(e)}"}
+        
+        return {"success": True, "message": f"{result['month']} 已恢复 {result['restored']} 条记录",
+                "data": result}
+    
+    # ==================== 变更日志 ====================
+    
+    def get_changes_since(self, change_id: Optional[int], limit: int = CHANGES_LIMIT) -> Dict:
+        """
+        获取变更ID之后的增量，客户端据此更新界面而不必重新加载整表
+        
+        Args:
+            change_id: 客户端最后处理的变更ID，为空时只返回当前变更ID
+            limit: 最多返回的变更数，最大 CHANGES_LIMIT
             
+        Returns:
+            {'last_change_id', 'has_more', 'reset', 'changes'}，见 journal_module.changes_since
+        """
+        limit = max(1, min(int(limit or CHANGES_LIMIT), CHANGES_LIMIT))
+        
+        conn = self.get_connection()
+        
+        try:
+            return changes_since(conn.cursor(), None if change_id is None else int(change_id), limit)
         finally:
             conn.close()
     
+    def prune_change_log(self, days: int = JOURNAL_RETENTION_DAYS) -> Dict:
+        """
+        清理早于保留天数的变更日志（在写线程上执行）
+        
+        Args:
+            days: 保留天数
+            
+        Returns:
+            操作结果
+        """
+        return self.writer.submit(self._prune_change_log, days)
+    
+    def _prune_change_log(self, conn: sqlite3.Connection, days: int) -> Dict:
+        """清理变更日志的写线程实现"""
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            count = prune_change_log(cursor, days)
+            conn.commit()
+            return {"success": True, "message": f"已清理 {count} 条变更日志", "data": {"deleted": count}}
+            
+        except Exception as e:
+            conn.rollback()
+            return {"success": False, "message": f"清理失败: {str(e)}"}
+    
+    # ==================== 备份与恢复 ====================
+    
+    def create_backup(self, reason: str = 'manual') -> Dict:
+        """
+        在线备份主库及归档库，按页分步复制，完成后校验完整性
+        
+        Args:
+            reason: 备份原因（manual、scheduled、pre-restore）
+            
+        Returns:
+            操作结果，data 为备份信息
+        """
+        try:
+            manifest = self.backups.backup(reason)
+        except Exception as e:
+            return {"success": False, "message": f"备份失败: {str(e)}"}
+        
+        return {"success": True, "message": f"备份成功: {manifest['name']}", "data": manifest}
+    
+    def list_backups(self) -> List[Dict]:
+        """
+        获取现有备份
+        
+        Returns:
+            按时间倒序的备份信息列表
+        """
+        return self.backups.list_backups()
+    
+    def verify_backup(self, name: str) -> Dict:
+        """
+        重新校验备份的完整性
+        
+        Args:
+            name: 备份名称
+            
+        Returns:
+            操作结果，data 为各文件的检查结果
+        """
+        try:
+            result = self.backups.verify(name)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        
+        message = "备份完整性检查通过" if result['ok'] else "备份完整性检查未通过"
+        return {"success": result['ok'], "message": message, "data": result}
+    
+    def restore_backup(self, name: str) -> Dict:
+        """
+        用备份恢复主库及归档库（在写线程上执行），恢复前先自动备份当前数据
+
+        恢复期间暂停连接池：等待进行中的读取结束并关闭全部读连接，
+        替换数据库文件时本进程没有其他连接打开主库或归档库。
+        
+        Args:
+            name: 备份名称
+            
+        Returns:
+            操作结果，data 包含恢复前自动备份的名称
+        """
+        try:
+            self.backups.get_backup(name)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        
+        try:
+            with self.pool.paused():
+                return self.writer.submit(self._restore_backup, name)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            return {"success": False, "message": f"恢复失败: {str(e)}"}
+        finally:
+            # 恢复期间读到的结果不应留在缓存中
+            self.report_cache.clear()
+            self.reference_cache.invalidate()
+    
+    def _restore_backup(self, conn: sqlite3.Connection, name: str) -> Dict:
+        """恢复备份的写线程实现，自动备份与恢复之间不会插入其他写入"""
+        # 不清理旧备份，以免要恢复的备份正好超出保留份数
+        try:
+            safety = self.backups.backup('pre-restore', prune=False)
+        except Exception as e:
+            return {"success": False, "message": f"恢复前备份当前数据失败，已取消恢复: {str(e)}"}
+        
+        cursor = conn.cursor()
+        # 写连接上遗留的附加库会占用归档库文件
+        cursor.execute("PRAGMA database_list")
+        for schema in [row[1] for row in cursor.fetchall() if row[1] not in ('main', 'temp')]:
+            cursor.execute(f'DETACH DATABASE "{schema}"')
+        
+        cursor.execute(statement('select_change_log_bounds'))
+        last_change_id = cursor.fetchone()[1] or 0
+        cursor.execute(statement('select_data_versions'))
+        versions = {row[0]: row[1] for row in cursor.fetchall()}
+        
+        self.backups.restore(conn, name)
+        # 备份文件为回滚日志模式，恢复后切回WAL，并把较旧的备份迁移到当前结构版本
+        conn.execute(f"PRAGMA journal_mode = {STORAGE_PROFILE['journal_mode']}")
+        run_migrations(conn)
+        
+        # 变更ID和数据版本号不回退，并通知客户端全部重新加载
+        cursor.execute("BEGIN IMMEDIATE")
+        bump_data_versions(cursor, versions)
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'change_log'",
+                       (last_change_id,))
+        if cursor.rowcount == 0:
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('change_log', ?)",
+                           (last_change_id,))
+        append_reset(cursor)
+        conn.commit()
+        
+        return {
+            "success": True,
+            "message": f"已从备份 {name} 恢复",
+            "data": {"restored": name, "pre_restore_backup": safety['name']}
+        }
+    
     # ==================== 设置管理 ====================
     
     def get_setting(self, key: str) -> Optional[str]:
@@ -728,7 +2027,7 @@ class Database:
         cursor = conn.cursor()
         
         try:
-            cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+            cursor.execute(statement('get_setting'), (key,))
             row = cursor.fetchone()
             return row[0] if row else None
             
@@ -737,7 +2036,7 @@ class Database:
     
     def set_setting(self, key: str, value: str) -> bool:
         """
-        设置值
+        设置值（在写线程上执行）
         
         Args:
             key: 设置键
@@ -746,14 +2045,14 @@ class Database:
         Returns:
             是否成功
         """
-        conn = self.get_connection()
+        return self.writer.submit(self._set_setting, key, value)
+    
+    def _set_setting(self, conn: sqlite3.Connection, key: str, value: str) -> bool:
+        """保存设置的写线程实现"""
         cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO settings (key, value) 
-                VALUES (?, ?)
-            ''', (key, value))
+            cursor.execute(statement('set_setting'), (key, value))
             
             conn.commit()
             return True
@@ -762,5 +2061,3 @@ class Database:
             conn.rollback()
             print(f"设置失败: {e}")
             return False
-        finally:
-            conn.close()
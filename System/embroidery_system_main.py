@@ -18,6 +18,11 @@ from openpyxl.styles import Font, Border, Side, Alignment, PatternFill
 from openpyxl.utils import get_column_letter
 import pandas as pd
 from io import BytesIO
+from backup_module import (BACKUP_INTERVAL_SETTING, BACKUP_KEEP_SETTING,
+                           DEFAULT_BACKUP_INTERVAL_HOURS, BackupScheduler)
+from database_module import DEFAULT_PAGE_SIZE, SEARCH_LIMIT, Database
+from job_module import PROGRESS_INTERVAL_ROWS, JobRunner, no_progress
+from serialization_module import format_report, format_rows, validate_format
 
 class EmbroiderySystem:
     """刺绣工资管理系统核心类"""
@@ -25,192 +30,63 @@ class EmbroiderySystem:
     def __init__(self):
         """初始化系统"""
         self.db_path = 'embroidery_system.db'
-        self.init_database()
-        self.init_default_patterns()
+        # 与API端共用 Database 数据访问层（语句目录、连接池、写线程及各类缓存）；
+        # js_api 的读取串行使用同一个长连接，写操作在写线程自己的连接上执行
+        self._db = Database(self.db_path, pool_size=1)
+        self._backup_scheduler = self._create_backup_scheduler()
+        self._backup_scheduler.start()
+        self._db.prune_change_log()
+        # 导出、导入在后台线程执行，界面通过 start_job / get_job_status 轮询
+        self._jobs = JobRunner({
+            'export_monthly_excel': self.export_monthly_excel,
+            'import_excel_data': self.import_excel_data
+        })
     
-    def init_database(self):
-        """初始化数据库表结构"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 创建员工表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                status TEXT DEFAULT 'active',
-                create_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 创建花型表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                price REAL NOT NULL,
-                create_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 创建工资记录表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER NOT NULL,
-                pattern_id INTEGER NOT NULL,
-                record_date DATE NOT NULL,
-                count INTEGER NOT NULL,
-                total REAL NOT NULL,
-                special TEXT DEFAULT '',
-                note TEXT DEFAULT '',
-                create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees(id),
-                FOREIGN KEY (pattern_id) REFERENCES patterns(id)
-            )
-        ''')
-        
-        # 创建设置表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    def init_default_patterns(self):
-        """初始化默认花型数据"""
-        default_patterns = [
-            ('盖布', 5.5), ('浮花', 5.5), ('棉盖', 5.5), ('棉', 5.0),
-            ('藏网', 5.5), ('雕孔', 6.5), ('棉网', 5.5), ('水溶', 4.4),
-            ('牛奶丝打孔', 6.5), ('网布', 5.5), ('玻璃纱', 5.2), ('盖网', 5.0)
-        ]
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        for name, price in default_patterns:
-            cursor.execute('''
-                INSERT OR IGNORE INTO patterns (name, price)
-                VALUES (?, ?)
-            ''', (name, price))
+    def _create_backup_scheduler(self):
+        """按设置中的保留份数和备份间隔创建定时备份"""
+        try:
+            keep = int(self._db.get_setting(BACKUP_KEEP_SETTING) or 0)
+            interval = float(self._db.get_setting(BACKUP_INTERVAL_SETTING)
+                             or DEFAULT_BACKUP_INTERVAL_HOURS)
+        except ValueError:
+            keep, interval = 0, DEFAULT_BACKUP_INTERVAL_HOURS
         
-        conn.commit()
-        conn.close()
+        if keep > 0:
+            self._db.backups.keep = keep
+        return BackupScheduler(self._db.backups, interval)
+    
+    def _shutdown(self):
+        """停止后台任务、定时备份、写线程并关闭数据库连接"""
+        self._jobs.shutdown()
+        self._backup_scheduler.stop()
+        self._db.close()
     
     # ==================== 员工管理 API ====================
     
     def get_employees(self):
         """获取所有员工列表"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, name, status, create_date 
-            FROM employees 
-            ORDER BY create_date DESC
-        ''')
-        
-        employees = []
-        for row in cursor.fetchall():
-            employees.append({
-                'id': row[0],
-                'name': row[1],
-                'status': row[2],
-                'create_date': row[3]
-            })
-        
-        conn.close()
-        return {'success': True, 'data': employees}
+        return {'success': True, 'data': self._db.get_employees()}
     
     def add_employee(self, name):
         """添加员工"""
         if not name or name.strip() == '':
             return {'success': False, 'message': '员工姓名不能为空'}
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('INSERT INTO employees (name) VALUES (?)', (name.strip(),))
-            conn.commit()
-            return {'success': True, 'message': '员工添加成功'}
-        except sqlite3.IntegrityError:
-            return {'success': False, 'message': '员工姓名已存在'}
-        finally:
-            conn.close()
+        return self._db.add_employee(name.strip())
     
     def update_employee(self, emp_id, name, status):
         """更新员工信息"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-                UPDATE employees 
-                SET name = ?, status = ? 
-                WHERE id = ?
-            ''', (name, status, emp_id))
-            
-            if cursor.rowcount > 0:
-                conn.commit()
-                return {'success': True, 'message': '员工信息更新成功'}
-            else:
-                return {'success': False, 'message': '员工不存在'}
-        except sqlite3.IntegrityError:
-            return {'success': False, 'message': '员工姓名已存在'}
-        finally:
-            conn.close()
+        return self._db.update_employee(emp_id, name, status)
     
     def delete_employee(self, emp_id):
         """删除员工"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 检查是否有相关工资记录
-        cursor.execute('SELECT COUNT(*) FROM records WHERE employee_id = ?', (emp_id,))
-        record_count = cursor.fetchone()[0]
-        
-        if record_count > 0:
-            conn.close()
-            return {'success': False, 'message': '该员工有工资记录，无法删除'}
-        
-        cursor.execute('DELETE FROM employees WHERE id = ?', (emp_id,))
-        if cursor.rowcount > 0:
-            conn.commit()
-            conn.close()
-            return {'success': True, 'message': '员工删除成功'}
-        else:
-            conn.close()
-            return {'success': False, 'message': '员工不存在'}
+        return self._db.delete_employee(emp_id)
     
     # ==================== 花型管理 API ====================
     
     def get_patterns(self):
         """获取所有花型列表"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, name, price, create_date 
-            FROM patterns 
-            ORDER BY create_date DESC
-        ''')
-        
-        patterns = []
-        for row in cursor.fetchall():
-            patterns.append({
-                'id': row[0],
-                'name': row[1],
-                'price': row[2],
-                'create_date': row[3]
-            })
-        
-        conn.close()
-        return {'success': True, 'data': patterns}
+        return {'success': True, 'data': self._db.get_patterns()}
     
     def add_pattern(self, name, price):
         """添加花型"""
@@ -224,21 +100,10 @@ class EmbroiderySystem:
         except ValueError:
             return {'success': False, 'message': '单价格式错误'}
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('INSERT INTO patterns (name, price) VALUES (?, ?)', 
-                         (name.strip(), price))
-            conn.commit()
-            return {'success': True, 'message': '花型添加成功'}
-        except sqlite3.IntegrityError:
-            return {'success': False, 'message': '花型名称已存在'}
-        finally:
-            conn.close()
-    
-    def update_pattern(self, pattern_id, name, price):
-        """更新花型信息"""
+        return self._db.add_pattern(name.strip(), price)
+    
+    def update_pattern(self, pattern_id, name, price, effective_from=None):
+        """更新花型信息，effective_from 为新单价的生效日期，为空时自今天起生效"""
         try:
             price = float(price)
             if price <= 0:
@@ -246,109 +111,70 @@ class EmbroiderySystem:
         except ValueError:
             return {'success': False, 'message': '单价格式错误'}
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        return self._db.update_pattern(pattern_id, name, price, effective_from)
+    
+    def get_pattern_prices(self, pattern_id):
+        """获取花型单价历史，按生效日期倒序"""
+        return {'success': True, 'data': self._db.get_pattern_prices(pattern_id)}
+    
+    def set_pattern_price(self, pattern_id, price, effective_from):
+        """设置花型自某日起生效的单价，当前单价同步为当天生效的单价"""
         try:
-            cursor.execute('''
-                UPDATE patterns 
-                SET name = ?, price = ? 
-                WHERE id = ?
-            ''', (name, price, pattern_id))
-            
-            if cursor.rowcount > 0:
-                conn.commit()
-                return {'success': True, 'message': '花型信息更新成功'}
-            else:
-                return {'success': False, 'message': '花型不存在'}
-        except sqlite3.IntegrityError:
-            return {'success': False, 'message': '花型名称已存在'}
-        finally:
-            conn.close()
+            price = float(price)
+        except (TypeError, ValueError):
+            return {'success': False, 'message': '单价格式错误'}
+        if price <= 0:
+            return {'success': False, 'message': '单价必须大于0'}
+        
+        return self._db.set_pattern_price(pattern_id, price, effective_from)
+    
+    def reprice_pattern_records(self, pattern_id, start_date=None, end_date=None, dry_run=False,
+                                price=None, effective_from=None):
+        """
+        按记录日期生效的花型单价重算历史记录金额，dry_run 为真时只预览受影响条数和金额变化；
+        同时给出 price 和 effective_from 时先设置自该日起生效的单价再重算
+        """
+        if price is not None:
+            try:
+                price = float(price)
+            except (TypeError, ValueError):
+                return {'success': False, 'message': '单价格式错误'}
+            if price <= 0:
+                return {'success': False, 'message': '单价必须大于0'}
+        
+        return self._db.reprice_pattern_records(pattern_id, start_date, end_date, bool(dry_run),
+                                                price, effective_from)
     
     def delete_pattern(self, pattern_id):
         """删除花型"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 检查是否有相关工资记录
-        cursor.execute('SELECT COUNT(*) FROM records WHERE pattern_id = ?', (pattern_id,))
-        record_count = cursor.fetchone()[0]
-        
-        if record_count > 0:
-            conn.close()
-            return {'success': False, 'message': '该花型有工资记录，无法删除'}
-        
-        cursor.execute('DELETE FROM patterns WHERE id = ?', (pattern_id,))
-        if cursor.rowcount > 0:
-            conn.commit()
-            conn.close()
-            return {'success': True, 'message': '花型删除成功'}
-        else:
-            conn.close()
-            return {'success': False, 'message': '花型不存在'}
+        return self._db.delete_pattern(pattern_id)
     
     # ==================== 工资记录管理 API ====================
     
-    def get_records(self, employee_id=None, pattern_id=None, start_date=None, end_date=None):
-        """获取工资记录列表"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 构建查询条件
-        conditions = []
-        params = []
-        
-        if employee_id:
-            conditions.append('r.employee_id = ?')
-            params.append(employee_id)
-        
-        if pattern_id:
-            conditions.append('r.pattern_id = ?')
-            params.append(pattern_id)
-        
-        if start_date:
-            conditions.append('r.record_date >= ?')
-            params.append(start_date)
-        
-        if end_date:
-            conditions.append('r.record_date <= ?')
-            params.append(end_date)
-        
-        where_clause = ' AND '.join(conditions) if conditions else '1=1'
-        
-        query = f'''
-            SELECT r.id, r.employee_id, r.pattern_id, r.record_date, 
-                   r.count, r.total, r.special, r.note, r.create_time,
-                   e.name as employee_name, p.name as pattern_name, p.price
-            FROM records r
-            JOIN employees e ON r.employee_id = e.id
-            JOIN patterns p ON r.pattern_id = p.id
-            WHERE {where_clause}
-            ORDER BY r.record_date DESC, r.create_time DESC
-        '''
-        
-        cursor.execute(query, params)
-        
-        records = []
-        for row in cursor.fetchall():
-            records.append({
-                'id': row[0],
-                'employee_id': row[1],
-                'pattern_id': row[2],
-                'record_date': row[3],
-                'count': row[4],
-                'total': row[5],
-                'special': row[6],
-                'note': row[7],
-                'create_time': row[8],
-                'employee_name': row[9],
-                'pattern_name': row[10],
-                'price': row[11]
-            })
+    def get_records(self, employee_id=None, pattern_id=None, start_date=None, end_date=None,
+                    response_format='rows'):
+        """获取工资记录列表，response_format 为 'columnar' 时按列返回"""
+        try:
+            validate_format(response_format)
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
         
-        conn.close()
-        return {'success': True, 'data': records}
+        records = self._db.get_records(employee_id, pattern_id, start_date, end_date)
+        return {'success': True, 'data': format_rows(records, response_format)}
+    
+    def get_records_page(self, employee_id=None, pattern_id=None, start_date=None, end_date=None,
+                         cursor=None, limit=DEFAULT_PAGE_SIZE, with_total=False,
+                         response_format='rows'):
+        """按 (record_date, id) 倒序分页获取工资记录，cursor 为上一页返回的 next_cursor"""
+        try:
+            validate_format(response_format)
+            page = self._db.get_records_page(employee_id, pattern_id, start_date, end_date,
+                                             cursor, limit, with_total)
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+        
+        return {'success': True, 'data': format_rows(page['records'], response_format),
+                'next_cursor': page['next_cursor'], 'total': page['total']}
     
     def add_record(self, employee_id, pattern_id, record_date, count, special='', note=''):
         """添加工资记录"""
@@ -359,31 +185,14 @@ class EmbroiderySystem:
         except ValueError:
             return {'success': False, 'message': '针数格式错误'}
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 获取花型单价
-        cursor.execute('SELECT price FROM patterns WHERE id = ?', (pattern_id,))
-        pattern_result = cursor.fetchone()
-        if not pattern_result:
-            conn.close()
-            return {'success': False, 'message': '花型不存在'}
-        
-        price = pattern_result[0]
-        total = count * price
+        return self._db.add_record(employee_id, pattern_id, record_date, count, special, note)
+    
+    def add_records_bulk(self, rows):
+        """批量添加工资记录（单个事务），返回逐行错误"""
+        if not isinstance(rows, list) or not rows:
+            return {'success': False, 'message': '工资记录列表不能为空'}
         
-        try:
-            cursor.execute('''
-                INSERT INTO records (employee_id, pattern_id, record_date, count, total, special, note)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (employee_id, pattern_id, record_date, count, total, special, note))
-            
-            conn.commit()
-            return {'success': True, 'message': '工资记录添加成功'}
-        except Exception as e:
-            return {'success': False, 'message': f'添加失败: {str(e)}'}
-        finally:
-            conn.close()
+        return self._db.add_records_bulk(rows)
     
     def update_record(self, record_id, employee_id, pattern_id, record_date, count, special='', note=''):
         """更新工资记录"""
@@ -394,142 +203,86 @@ class EmbroiderySystem:
         except ValueError:
             return {'success': False, 'message': '针数格式错误'}
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 获取花型单价
-        cursor.execute('SELECT price FROM patterns WHERE id = ?', (pattern_id,))
-        pattern_result = cursor.fetchone()
-        if not pattern_result:
-            conn.close()
-            return {'success': False, 'message': '花型不存在'}
-        
-        price = pattern_result[0]
-        total = count * price
-        
-        try:
-            cursor.execute('''
-                UPDATE records 
-                SET employee_id = ?, pattern_id = ?, record_date = ?, 
-                    count = ?, total = ?, special = ?, note = ?
-                WHERE id = ?
-            ''', (employee_id, pattern_id, record_date, count, total, special, note, record_id))
-            
-            if cursor.rowcount > 0:
-                conn.commit()
-                return {'success': True, 'message': '工资记录更新成功'}
-            else:
-                return {'success': False, 'message': '记录不存在'}
-        except Exception as e:
-            return {'success': False, 'message': f'更新失败: {str(e)}'}
-        finally:
-            conn.close()
+        return self._db.update_record(record_id, employee_id, pattern_id, record_date,
+                                      count, special, note)
     
     def delete_record(self, record_id):
         """删除工资记录"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM records WHERE id = ?', (record_id,))
-        if cursor.rowcount > 0:
-            conn.commit()
-            conn.close()
-            return {'success': True, 'message': '工资记录删除成功'}
-        else:
-            conn.close()
-            return {'success': False, 'message': '记录不存在'}
+        return self._db.delete_record(record_id)
+    
+    def update_records_by_filter(self, filters, changes):
+        """按筛选条件（员工、花型、日期范围、ID列表）批量修改记录，金额按新花型单价重算"""
+        return self._db.update_records_by_filter(filters or {}, changes or {})
+    
+    def delete_records_by_filter(self, filters):
+        """按筛选条件（员工、花型、日期范围、ID列表）批量删除记录"""
+        return self._db.delete_records_by_filter(filters or {})
+    
+    # ==================== 全文搜索 API ====================
+    
+    def search(self, keyword, limit=SEARCH_LIMIT):
+        """在员工、花型、工资记录备注和特殊标记中搜索，结果按相关度排序"""
+        try:
+            return {'success': True, 'data': self._db.search(keyword, limit)}
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
     
     # ==================== 统计报表 API ====================
     
-    def get_daily_summary(self, date):
-        """获取日工资汇总"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT e.name as employee_name, p.name as pattern_name, 
-                   SUM(r.count) as total_count, SUM(r.total) as total_wage
-            FROM records r
-            JOIN employees e ON r.employee_id = e.id
-            JOIN patterns p ON r.pattern_id = p.id
-            WHERE r.record_date = ?
-            GROUP BY e.name, p.name
-            ORDER BY e.name, p.name
-        ''', (date,))
-        
-        summary = []
-        for row in cursor.fetchall():
-            summary.append({
-                'employee_name': row[0],
-                'pattern_name': row[1],
-                'total_count': row[2],
-                'total_wage': row[3]
-            })
-        
-        conn.close()
-        return {'success': True, 'data': summary}
+    def get_cache_stats(self):
+        """获取报表缓存命中统计"""
+        return {'success': True, 'data': self._db.cache_stats()}
+    
+    def get_dashboard_stats(self, date=None):
+        """获取工作台统计（员工数、花型数及当日记录条数和工资），date 为空时为今天"""
+        try:
+            return {'success': True, 'data': self._db.get_dashboard_stats(date)}
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+    
+    def get_daily_summary(self, date, response_format='rows'):
+        """获取日工资汇总，response_format 为 'columnar' 时按列返回"""
+        try:
+            validate_format(response_format)
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+        
+        summary = [{
+            'employee_name': row['employee_name'],
+            'pattern_name': row['pattern_name'],
+            'total_count': row['total_count'],
+            'total_wage': row['total_amount']
+        } for row in self._db.get_daily_summary(date, date)]
+        
+        return {'success': True, 'data': format_rows(summary, response_format)}
     
     def get_monthly_summary(self, year, month):
-        """获取月工资汇总"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 获取指定月份的数据
-        start_date = f'{year}-{month:02d}-01'
-        if month == 12:
-            end_date = f'{year+1}-01-01'
-        else:
-            end_date = f'{year}-{month+1:02d}-01'
-        
-        cursor.execute('''
-            SELECT e.name as employee_name, p.name as pattern_name, 
-                   SUM(r.count) as total_count, SUM(r.total) as total_wage
-            FROM records r
-            JOIN employees e ON r.employee_id = e.id
-            JOIN patterns p ON r.pattern_id = p.id
-            WHERE r.record_date >= ? AND r.record_date < ?
-            GROUP BY e.name, p.name
-            ORDER BY e.name, p.name
-        ''', (start_date, end_date))
-        
-        # 构建汇总数据结构
-        summary_data = {}
-        patterns = set()
-        
-        for row in cursor.fetchall():
-            employee_name = row[0]
-            pattern_name = row[1]
-            total_count = row[2]
-            total_wage = row[3]
-            
-            if employee_name not in summary_data:
-                summary_data[employee_name] = {}
-            
-            summary_data[employee_name][pattern_name] = {
-                'count': total_count,
-                'wage': total_wage
-            }
-            patterns.add(pattern_name)
-        
-        conn.close()
-        return {
-            'success': True, 
-            'data': {
-                'summary': summary_data,
-                'patterns': sorted(list(patterns))
-            }
-        }
+        """获取月工资汇总矩阵（员工×花型的针数、金额及行、列、总合计）"""
+        return {'success': True, 'data': self._db.get_monthly_summary(year, month)}
+    
+    def get_rollup_report(self, start_date, end_date, response_format='rows'):
+        """获取日期区间的多级汇总（日×员工×花型、员工、花型、日及总计），一次查询返回"""
+        try:
+            validate_format(response_format)
+            report = self._db.get_rollup_report(start_date, end_date)
+            return {'success': True, 'data': format_report(report, response_format)}
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+    
+    def rebuild_daily_totals(self):
+        """从工资记录全量重建日汇总表"""
+        return self._db.rebuild_daily_totals()
     
-    def export_monthly_excel(self, year, month):
-        """导出月工资汇总Excel"""
+    def export_monthly_excel(self, year, month, progress=no_progress):
+        """导出月工资汇总Excel，progress 为后台任务的进度回调"""
         try:
             # 获取月汇总数据
             result = self.get_monthly_summary(year, month)
             if not result['success']:
                 return {'success': False, 'message': '获取数据失败'}
             
-            summary_data = result['data']['summary']
-            patterns = result['data']['patterns']
+            matrix = result['data']
+            patterns = matrix['patterns']
             
             # 创建Excel工作簿
             wb = Workbook()
@@ -553,34 +306,22 @@ class EmbroiderySystem:
             
             # 填充数据
             row_num = 2
-            total_by_pattern = {pattern: {'count': 0, 'wage': 0} for pattern in patterns}
+            row_totals = matrix['row_totals']
             
-            for employee_name, employee_data in summary_data.items():
-                ws.cell(row=row_num, column=1, value=employee_name)
+            for i, employee_name in enumerate(matrix['employees']):
+                if i % PROGRESS_INTERVAL_ROWS == 0:
+                    progress(0.8 * i / len(matrix['employees']), f'写入第 {i + 1} 行')
                 
-                row_total_count = 0
-                row_total_wage = 0
+                ws.cell(row=row_num, column=1, value=employee_name)
                 
-                for col_num, pattern in enumerate(patterns, 2):
-                    if pattern in employee_data:
-                        count = employee_data[pattern]['count']
-                        wage = employee_data[pattern]['wage']
-                        cell_value = f'{count}/{wage:.2f}'
-                        
-                        row_total_count += count
-                        row_total_wage += wage
-                        total_by_pattern[pattern]['count'] += count
-                        total_by_pattern[pattern]['wage'] += wage
-                    else:
-                        cell_value = '0/0.00'
-                    
-                    cell = ws.cell(row=row_num, column=col_num, value=cell_value)
+                for col_num, (count, wage) in enumerate(zip(matrix['counts'][i], matrix['amounts'][i]), 2):
+                    cell = ws.cell(row=row_num, column=col_num, value=f'{count}/{wage:.2f}')
                     cell.border = border
                     cell.alignment = center_alignment
                 
                 # 行合计
                 total_cell = ws.cell(row=row_num, column=len(patterns) + 2, 
-                                   value=f'{row_total_count}/{row_total_wage:.2f}')
+                                   value=f'{row_totals["counts"][i]}/{row_totals["amounts"][i]:.2f}')
                 total_cell.border = border
                 total_cell.alignment = center_alignment
                 
@@ -593,24 +334,20 @@ class EmbroiderySystem:
             
             # 添加合计行
             ws.cell(row=row_num, column=1, value='合计')
-            total_count = 0
-            total_wage = 0
+            column_totals = matrix['column_totals']
             
-            for col_num, pattern in enumerate(patterns, 2):
-                pattern_total = total_by_pattern[pattern]
-                cell_value = f'{pattern_total["count"]}/{pattern_total["wage"]:.2f}'
-                cell = ws.cell(row=row_num, column=col_num, value=cell_value)
+            for col_num, (count, wage) in enumerate(zip(column_totals['counts'],
+                                                        column_totals['amounts']), 2):
+                cell = ws.cell(row=row_num, column=col_num, value=f'{count}/{wage:.2f}')
                 cell.border = border
                 cell.alignment = center_alignment
                 cell.fill = total_fill
                 cell.font = header_font
-                
-                total_count += pattern_total["count"]
-                total_wage += pattern_total["wage"]
             
             # 总合计
+            grand_total = matrix['grand_total']
             total_cell = ws.cell(row=row_num, column=len(patterns) + 2, 
-                               value=f'{total_count}/{total_wage:.2f}')
+                               value=f'{grand_total["count"]}/{grand_total["amount"]:.2f}')
             total_cell.border = border
             total_cell.alignment = center_alignment
             total_cell.fill = total_fill
@@ -628,6 +365,8 @@ class EmbroiderySystem:
                 column_letter = get_column_letter(col_num)
                 ws.column_dimensions[column_letter].width = 15
             
+            progress(0.9, '生成文件')
+            
             # 保存到内存
             excel_buffer = BytesIO()
             wb.save(excel_buffer)
@@ -648,8 +387,8 @@ class EmbroiderySystem:
         except Exception as e:
             return {'success': False, 'message': f'导出失败: {str(e)}'}
     
-    def import_excel_data(self, file_content):
-        """导入Excel数据"""
+    def import_excel_data(self, file_content, progress=no_progress):
+        """导入Excel数据（缺少的员工自动创建，工资记录单个事务批量写入），progress 为后台任务的进度回调"""
         try:
             # 解码base64文件内容
             file_data = base64.b64decode(file_content)
@@ -664,14 +403,19 @@ class EmbroiderySystem:
             if missing_columns:
                 return {'success': False, 'message': f'缺少必要的列: {", ".join(missing_columns)}'}
             
-            # 开始导入数据
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # 员工、花型名称映射取自参考数据缓存
+            reference = self._db.get_reference_data()
+            employee_ids = dict(reference.employee_ids_by_name)
             
             success_count = 0
             error_records = []
+            rows = []
+            row_numbers = []  # rows 中每条记录对应的Excel行号
             
             for index, row in df.iterrows():
+                if index % PROGRESS_INTERVAL_ROWS == 0:
+                    progress(0.8 * index / len(df), f'校验第 {index + 1}/{len(df)} 行')
+                
                 try:
                     employee_name = str(row['员工姓名']).strip()
                     pattern_name = str(row['花型']).strip()
@@ -680,41 +424,47 @@ class EmbroiderySystem:
                     special = str(row.get('特殊说明', '')).strip()
                     note = str(row.get('备注', '')).strip()
                     
-                    # 查找员工ID
-                    cursor.execute('SELECT id FROM employees WHERE name = ?', (employee_name,))
-                    employee_result = cursor.fetchone()
-                    if not employee_result:
-                        # 自动创建员工
-                        cursor.execute('INSERT INTO employees (name) VALUES (?)', (employee_name,))
-                        employee_id = cursor.lastrowid
-                    else:
-                        employee_id = employee_result[0]
-                    
                     # 查找花型ID
-                    cursor.execute('SELECT id, price FROM patterns WHERE name = ?', (pattern_name,))
-                    pattern_result = cursor.fetchone()
-                    if not pattern_result:
+                    pattern_id = reference.pattern_ids_by_name.get(pattern_name)
+                    if pattern_id is None:
                         error_records.append(f'第{index+2}行: 花型"{pattern_name}"不存在')
                         continue
                     
-                    pattern_id = pattern_result[0]
-                    price = pattern_result[1]
-                    total = count * price
-                    
-                    # 插入记录
-                    cursor.execute('''
-                        INSERT INTO records (employee_id, pattern_id, record_date, count, total, special, note)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (employee_id, pattern_id, record_date, count, total, special, note))
+                    # 查找员工ID
+                    employee_id = employee_ids.get(employee_name)
+                    if employee_id is None:
+                        # 自动创建员工
+                        result = self._db.add_employee(employee_name)
+                        if not result['success']:
+                            error_records.append(f'第{index+2}行: {result["message"]}')
+                            continue
+                        employee_id = result['data']['id']
+                        employee_ids[employee_name] = employee_id
                     
-                    success_count += 1
+                    rows.append({
+                        'employee_id': employee_id,
+                        'pattern_id': pattern_id,
+                        'record_date': record_date,
+                        'count': count,
+                        'special': special,
+                        'note': note
+                    })
+                    row_numbers.append(index + 2)
                     
                 except Exception as e:
                     error_records.append(f'第{index+2}行: {str(e)}')
                     continue
             
-            conn.commit()
-            conn.close()
+            # 单个事务批量插入，按记录日期生效的单价计价，开始写入后不再响应取消
+            if rows:
+                progress(0.8, f'写入 {len(rows)} 条记录')
+                result = self._db.add_records_bulk(rows)
+                if not result['success']:
+                    return result
+                
+                success_count = result['data']['inserted']
+                for error in result['data']['errors']:
+                    error_records.append(f'第{row_numbers[error["index"]]}行: {error["message"]}')
             
             message = f'成功导入 {success_count} 条记录'
             if error_records:
@@ -729,31 +479,74 @@ class EmbroiderySystem:
         except Exception as e:
             return {'success': False, 'message': f'导入失败: {str(e)}'}
     
+    # ==================== 后台任务 API ====================
+    
+    def start_job(self, kind, params=None):
+        """提交后台任务（export_monthly_excel、import_excel_data），params 为对应方法的参数，立即返回任务ID"""
+        try:
+            return {'success': True, 'data': self._jobs.submit(kind, params)}
+        except (ValueError, RuntimeError) as e:
+            return {'success': False, 'message': str(e)}
+    
+    def get_job_status(self, job_id):
+        """查询后台任务的状态、进度，结束后附带结果；导出文件随结束后的首次查询返回，之后释放"""
+        try:
+            return {'success': True, 'data': self._jobs.get_status(job_id, take_file=True)}
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+    
+    def cancel_job(self, job_id):
+        """取消后台任务，运行中的任务在下一个进度检查点停止"""
+        try:
+            return {'success': True, 'data': self._jobs.cancel(job_id)}
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+    
+    def list_jobs(self):
+        """列出保留中的后台任务"""
+        return {'success': True, 'data': self._jobs.list_jobs()}
+    
+    # ==================== 变更日志 API ====================
+    
+    def get_changes_since(self, change_id=None, limit=None):
+        """获取变更ID之后的增量（新增、修改行的当前内容及删除墓碑），change_id 为空时只返回当前变更ID"""
+        try:
+            return {'success': True, 'data': self._db.get_changes_since(change_id, limit)}
+        except (TypeError, ValueError):
+            return {'success': False, 'message': '变更ID格式错误'}
+    
+    # ==================== 备份与恢复 API ====================
+    
+    def create_backup(self):
+        """立即在线备份主库及归档库"""
+        return self._db.create_backup()
+    
+    def list_backups(self):
+        """获取现有备份（按时间倒序）及定时备份的最近一次错误"""
+        return {
+            'success': True,
+            'data': self._db.list_backups(),
+            'last_error': self._backup_scheduler.last_error
+        }
+    
+    def verify_backup(self, name):
+        """重新校验备份的完整性"""
+        return self._db.verify_backup(name)
+    
+    def restore_backup(self, name):
+        """用备份恢复数据，恢复前自动备份当前数据"""
+        return self._db.restore_backup(name)
+    
     # ==================== 设置管理 API ====================
     
     def get_setting(self, key):
         """获取设置"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
-        result = cursor.fetchone()
-        
-        conn.close()
-        return result[0] if result else None
+        return self._db.get_setting(key)
     
     def set_setting(self, key, value):
         """设置配置"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO settings (key, value)
-            VALUES (?, ?)
-        ''', (key, value))
-        
-        conn.commit()
-        conn.close()
+        if not self._db.set_setting(key, value):
+            return {'success': False, 'message': '设置保存失败'}
         return {'success': True, 'message': '设置保存成功'}
 
 
@@ -785,7 +578,10 @@ def main():
     )
     
     # 启动应用
-    webview.start(debug=False)
+    try:
+        webview.start(debug=False)
+    finally:
+        system._shutdown()
 
 
 if __name__ == '__main__':
@@ -1,13 +1,17 @@
 import io
 import base64
+import itertools
 import pandas as pd
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
 from datetime import datetime
 import calendar
 from typing import Dict, List, Any
 
+from job_module import PROGRESS_INTERVAL_ROWS, ProgressCallback, no_progress
+
 class ExcelHandler:
     def __init__(self, db):
         """
@@ -18,12 +22,14 @@ class ExcelHandler:
         """
         self.db = db
     
-    def import_records(self, file_data: bytes) -> Dict[str, Any]:
+    def import_records(self, file_data: bytes,
+                       progress: ProgressCallback = no_progress) -> Dict[str, Any]:
         """
         从Excel文件导入工资记录
         
         Args:
             file_data: Excel文件二进制数据
+            progress: 进度回调，在后台任务中执行时用于报告进度和响应取消
             
         Returns:
             导入结果
@@ -42,19 +48,22 @@ class ExcelHandler:
                     'message': f'Excel文件缺少必要列: {", ".join(missing_columns)}'
                 }
             
-            # 获取员工和花型映射
-            employees = self.db.get_employees()
-            patterns = self.db.get_patterns()
-            
-            employee_map = {emp['name']: emp['id'] for emp in employees}
-            pattern_map = {pat['name']: pat['id'] for pat in patterns}
+            # 员工和花型名称映射取自参考数据缓存
+            reference = self.db.get_reference_data()
+            employee_map = reference.employee_ids_by_name
+            pattern_map = reference.pattern_ids_by_name
             
             success_count = 0
             error_count = 0
             error_messages = []
+            rows = []
+            row_numbers = []  # rows 中每条记录对应的Excel行号
             
             # 处理每一行数据
             for index, row in df.iterrows():
+                if index % PROGRESS_INTERVAL_ROWS == 0:
+                    progress(0.8 * index / len(df), f'校验第 {index + 1}/{len(df)} 行')
+                
                 try:
                     employee_name = str(row['员工姓名']).strip()
                     pattern_name = str(row['花型名称']).strip()
@@ -94,26 +103,33 @@ class ExcelHandler:
                     special = str(row.get('特殊标记', '')).strip()
                     note = str(row.get('备注', '')).strip()
                     
-                    # 添加记录
-                    result = self.db.add_record(
-                        employee_id=employee_map[employee_name],
-                        pattern_id=pattern_map[pattern_name],
-                        record_date=record_date,
-                        count=count,
-                        special=special,
-                        note=note
-                    )
-                    
-                    if result['success']:
-                        success_count += 1
-                    else:
-                        error_messages.append(f'第{index+2}行: {result["message"]}')
-                        error_count += 1
+                    # 暂存记录，全部校验后一次性批量写入
+                    rows.append({
+                        'employee_id': employee_map[employee_name],
+                        'pattern_id': pattern_map[pattern_name],
+                        'record_date': record_date,
+                        'count': count,
+                        'special': special,
+                        'note': note
+                    })
+                    row_numbers.append(index + 2)
                 
                 except Exception as e:
                     error_messages.append(f'第{index+2}行: 处理失败 - {str(e)}')
                     error_count += 1
             
+            # 单个事务批量插入，开始写入后不再响应取消
+            if rows:
+                progress(0.8, f'写入 {len(rows)} 条记录')
+                result = self.db.add_records_bulk(rows)
+                if not result['success']:
+                    return result
+                
+                success_count = result['data']['inserted']
+                for error in result['data']['errors']:
+                    error_messages.append(f'第{row_numbers[error["index"]]}行: {error["message"]}')
+                    error_count += 1
+            
             return {
                 'success': True,
                 'message': f'导入完成: 成功{success_count}条，失败{error_count}条',
@@ -130,22 +146,24 @@ class ExcelHandler:
                 'message': f'导入失败: {str(e)}'
             }
     
-    def export_monthly_summary(self, year: int, month: int) -> Dict[str, Any]:
+    def export_monthly_summary(self, year: int, month: int,
+                               progress: ProgressCallback = no_progress) -> Dict[str, Any]:
         """
         导出月度工资汇总Excel
         
         Args:
             year: 年份
             month: 月份
+            progress: 进度回调，在后台任务中执行时用于报告进度和响应取消
             
         Returns:
             导出结果
         """
         try:
-            # 获取月度汇总数据
-            summary_data = self.db.get_monthly_summary(year, month)
+            # 获取月度汇总矩阵
+            matrix = self.db.get_monthly_summary(year, month)
             
-            if not summary_data['data']:
+            if not matrix['employees']:
                 return {
                     'success': False,
                     'message': '该月份没有工资记录'
@@ -172,9 +190,7 @@ class ExcelHandler:
             center_alignment = Alignment(horizontal='center', vertical='center')
             
             # 准备数据
-            data = summary_data['data']
-            patterns = summary_data['patterns']
-            employees = sorted(data.keys())
+            patterns = matrix['patterns']
             
             # 创建表头
             headers = ['员工姓名'] + patterns + ['合计']
@@ -189,31 +205,20 @@ class ExcelHandler:
             
             # 写入数据行
             row_num = 2
-            pattern_totals = {pattern: {'count': 0, 'amount': 0} for pattern in patterns}
             
-            for employee in employees:
-                ws.cell(row=row_num, column=1, value=employee).border = border
+            for i, employee in enumerate(matrix['employees']):
+                if i % PROGRESS_INTERVAL_ROWS == 0:
+                    progress(0.8 * i / len(matrix['employees']), f'写入第 {i + 1} 行')
                 
-                employee_total = 0
+                ws.cell(row=row_num, column=1, value=employee).border = border
                 
-                for col, pattern in enumerate(patterns, 2):
-                    if pattern in data[employee]:
-                        count = data[employee][pattern]['count']
-                        amount = data[employee][pattern]['amount']
-                        value = f"{count}/{amount:.2f}"
-                        
-                        # 累计花型总计
-                        pattern_totals[pattern]['count'] += count
-                        pattern_totals[pattern]['amount'] += amount
-                        employee_total += amount
-                    else:
-                        value = "0/0.00"
-                    
-                    cell = ws.cell(row=row_num, column=col, value=value)
+                for col, (count, amount) in enumerate(zip(matrix['counts'][i], matrix['amounts'][i]), 2):
+                    cell = ws.cell(row=row_num, column=col, value=f"{count}/{amount:.2f}")
                     cell.alignment = center_alignment
                     cell.border = border
                 
                 # 写入员工合计
+                employee_total = matrix['row_totals']['amounts'][i]
                 cell = ws.cell(row=row_num, column=len(headers), value=f"{employee_total:.2f}")
                 cell.alignment = center_alignment
                 cell.border = border
@@ -225,19 +230,16 @@ class ExcelHandler:
             ws.cell(row=row_num, column=1).fill = total_fill
             ws.cell(row=row_num, column=1).border = border
             
-            grand_total = 0
-            for col, pattern in enumerate(patterns, 2):
-                total_count = pattern_totals[pattern]['count']
-                total_amount = pattern_totals[pattern]['amount']
-                value = f"{total_count}/{total_amount:.2f}"
-                
-                cell = ws.cell(row=row_num, column=col, value=value)
+            column_totals = matrix['column_totals']
+            for col, (total_count, total_amount) in enumerate(zip(column_totals['counts'],
+                                                                  column_totals['amounts']), 2):
+                cell = ws.cell(row=row_num, column=col, value=f"{total_count}/{total_amount:.2f}")
                 cell.font = total_font
                 cell.fill = total_fill
                 cell.alignment = center_alignment
                 cell.border = border
-                
-                grand_total += total_amount
+            
+            grand_total = matrix['grand_total']['amount']
             
             # 写入总合计
             cell = ws.cell(row=row_num, column=len(headers), value=f"{grand_total:.2f}")
@@ -251,6 +253,8 @@ class ExcelHandler:
             for col in range(2, len(headers) + 1):
                 ws.column_dimensions[chr(64 + col)].width = 15
             
+            progress(0.9, '生成文件')
+            
             # 保存到内存
             output = io.BytesIO()
             wb.save(output)
@@ -278,31 +282,33 @@ class ExcelHandler:
                 'message': f'导出失败: {str(e)}'
             }
     
-    def export_daily_summary(self, start_date: str = None, end_date: str = None) -> Dict[str, Any]:
+    def export_daily_summary(self, start_date: str = None, end_date: str = None,
+                             progress: ProgressCallback = no_progress) -> Dict[str, Any]:
         """
         导出日工资汇总Excel
         
         Args:
             start_date: 开始日期
             end_date: 结束日期
+            progress: 进度回调，在后台任务中执行时用于报告进度和响应取消（总行数未知，只报告已写入行数）
             
         Returns:
             导出结果
         """
         try:
-            # 获取日汇总数据
-            records = self.db.get_daily_summary(start_date, end_date)
+            # 流式获取日汇总数据，逐行写入，内存占用与日期范围无关
+            records = self.db.iter_daily_summary(start_date, end_date)
+            first_record = next(records, None)
             
-            if not records:
+            if first_record is None:
                 return {
                     'success': False,
                     'message': '没有找到相关记录'
                 }
             
-            # 创建工作簿
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "日工资汇总"
+            # 创建只写工作簿，已写入的行不会保留在内存中
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("日工资汇总")
             
             # 设置样式
             header_font = Font(bold=True, color="FFFFFF")
@@ -317,38 +323,41 @@ class ExcelHandler:
             
             center_alignment = Alignment(horizontal='center', vertical='center')
             
-            # 创建表头
-            headers = ['记录日期', '员工姓名', '花型名称', '针数', '工资金额']
+            # 调整列宽（只写模式下必须在写入数据前设置）
+            column_widths = [12, 12, 12, 10, 12]
+            for i, width in enumerate(column_widths, 1):
+                ws.column_dimensions[chr(64 + i)].width = width
             
-            # 写入表头
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = center_alignment
+            def styled_cell(value, font=None, fill=None, alignment=None):
+                cell = WriteOnlyCell(ws, value=value)
                 cell.border = border
+                if font:
+                    cell.font = font
+                if fill:
+                    cell.fill = fill
+                if alignment:
+                    cell.alignment = alignment
+                return cell
+            
+            # 写入表头
+            headers = ['记录日期', '员工姓名', '花型名称', '针数', '工资金额']
+            ws.append([styled_cell(header, header_font, header_fill, center_alignment)
+                       for header in headers])
             
             # 写入数据行
-            row_num = 2
-            for record in records:
-                ws.cell(row=row_num, column=1, value=record['record_date']).border = border
-                ws.cell(row=row_num, column=2, value=record['employee_name']).border = border
-                ws.cell(row=row_num, column=3, value=record['pattern_name']).border = border
-                
-                cell = ws.cell(row=row_num, column=4, value=record['total_count'])
-                cell.alignment = center_alignment
-                cell.border = border
-                
-                cell = ws.cell(row=row_num, column=5, value=f"{record['total_amount']:.2f}")
-                cell.alignment = center_alignment
-                cell.border = border
+            for i, record in enumerate(itertools.chain([first_record], records)):
+                if i % PROGRESS_INTERVAL_ROWS == 0:
+                    progress(None, f'已写入 {i} 行')
                 
-                row_num += 1
-            
-            # 调整列宽
-            column_widths = [12, 12, 12, 10, 12]
-            for i, width in enumerate(column_widths, 1):
-                ws.column_dimensions[chr(64 + i)].width = width
+                ws.append([
+                    styled_cell(record['record_date']),
+                    styled_cell(record['employee_name']),
+                    styled_cell(record['pattern_name']),
+                    styled_cell(record['total_count'], alignment=center_alignment),
+                    styled_cell(f"{record['total_amount']:.2f}", alignment=center_alignment)
+                ])
+            
+            progress(0.9, '生成文件')
             
             # 保存到内存
             output = io.BytesIO()
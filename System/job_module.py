@@ -0,0 +1,355 @@
+"""
+后台任务
+
+导出Excel、导入Excel等耗时操作提交到 JobRunner 后立即返回任务ID，
+由后台线程池执行，调用方（桌面端界面或API客户端）轮询任务状态：
+    - 排队中的任务数有上限，队列已满时拒绝提交
+    - 任务函数通过 progress(进度, 说明) 报告进度（0~1，未知总量时为 None），
+      该调用同时是取消检查点：任务已被取消时抛出 JobCancelled，任务停止
+    - 排队中的任务取消后直接跳过；运行中的任务在下一个检查点停止，
+      已越过最后一个检查点（如导入已开始写库）的任务会正常完成
+    - 已结束的任务保留 JOB_RETENTION_SECONDS 秒供查询结果
+    - 导出任务结果中的文件内容（Base64）只交付一次：列表不含结果，按ID查询默认不含文件内容，
+      get_status(take_file=True) 返回文件后任务即释放文件内容
+
+任务函数返回 {'success', 'message', 'data'} 形式的结果，success 为假时任务记为失败。
+"""
+
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+# 工作线程数和排队任务上限
+JOB_WORKERS = 2
+JOB_QUEUE_SIZE = 16
+
+# 已结束任务的保留时间（秒）
+JOB_RETENTION_SECONDS = 3600
+
+# 逐行处理的任务每隔多少行报告一次进度（同时检查取消）
+PROGRESS_INTERVAL_ROWS = 500
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+JOB_FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+# 任务结果 data 中的文件内容键（ExcelHandler 导出为 file_content，桌面端导出为 content）
+FILE_CONTENT_KEYS = ('file_content', 'content')
+
+ProgressCallback = Callable[[Optional[float], str], None]
+
+
+def no_progress(fraction: Optional[float], message: str = ''):
+    """不在后台任务中执行时使用的空进度回调"""
+
+
+def _without_file(result: Optional[Dict]) -> Optional[Dict]:
+    """去掉任务结果中文件内容的副本，其余字段（文件名等）保留"""
+    data = (result or {}).get('data')
+    if not isinstance(data, dict) or not any(key in data for key in FILE_CONTENT_KEYS):
+        return result
+    return dict(result, data={key: value for key, value in data.items()
+                              if key not in FILE_CONTENT_KEYS})
+
+
+class JobCancelled(Exception):
+    """任务已被取消，由进度检查点抛出"""
+
+
+class Job:
+    """单个后台任务的状态"""
+
+    def __init__(self, kind: str, params: Dict):
+        """
+        初始化任务
+
+        Args:
+            kind: 任务类型
+            params: 传给任务函数的关键字参数
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.state = JOB_QUEUED
+        self.progress = 0.0
+        self.message = '排队中'
+        self.result: Optional[Dict] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+        self._cancel = threading.Event()
+        self._interrupted = False
+        self._finished_monotonic: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        """任务是否已结束"""
+        return self.state in JOB_FINISHED_STATES
+
+    def report(self, fraction: Optional[float], message: str = ''):
+        """
+        报告进度（任务函数的 progress 回调）
+
+        Args:
+            fraction: 完成比例 0~1，为 None 时保持原进度
+            message: 当前进度说明
+
+        Raises:
+            JobCancelled: 任务已被取消
+        """
+        if self._cancel.is_set():
+            self._interrupted = True
+            raise JobCancelled()
+        if fraction is not None:
+            self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message:
+            self.message = message
+
+    def _finish(self, state: str, message: str, result: Optional[Dict] = None):
+        """记录任务结束，状态最后设置，其他线程看到已结束时结果已就绪"""
+        self.result = result
+        self.message = message
+        if state == JOB_SUCCEEDED:
+            self.progress = 1.0
+        self.finished_at = datetime.now()
+        self._finished_monotonic = time.monotonic()
+        self.state = state
+
+    def _release_file(self):
+        """释放结果中的文件内容，之后的查询以 file_released 标明文件已交付"""
+        released = _without_file(self.result)
+        if released is not self.result:
+            released['data']['file_released'] = True
+            self.result = released
+
+    def to_dict(self, include_result: bool = True, include_file: bool = False) -> Dict:
+        """
+        任务状态
+
+        Args:
+            include_result: 是否包含任务函数的结果
+            include_file: 结果中是否保留文件内容
+
+        Returns:
+            {'id', 'kind', 'state', 'progress', 'message', 'result': 结束后为任务函数的结果,
+             'created_at', 'started_at', 'finished_at'}，不含结果时无 'result'
+        """
+        def timestamp(value):
+            return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+        status = {
+            'id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'progress': round(self.progress, 4),
+            'message': self.message,
+            'created_at': timestamp(self.created_at),
+            'started_at': timestamp(self.started_at),
+            'finished_at': timestamp(self.finished_at)
+        }
+        if include_result:
+            status['result'] = self.result if include_file else _without_file(self.result)
+        return status
+
+
+class JobRunner:
+    """有界队列 + 固定线程池的后台任务执行器"""
+
+    def __init__(self, handlers: Dict[str, Callable[..., Dict]], workers: int = JOB_WORKERS,
+                 queue_size: int = JOB_QUEUE_SIZE):
+        """
+        初始化并启动工作线程
+
+        Args:
+            handlers: 任务类型 -> 任务函数，任务函数以 params 为关键字参数调用，
+                      另外传入 progress 回调
+            workers: 工作线程数
+            queue_size: 排队任务上限
+        """
+        self.handlers = handlers
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, kind: str, params: Optional[Dict] = None) -> Dict:
+        """
+        提交任务
+
+        Args:
+            kind: 任务类型
+            params: 任务参数
+
+        Returns:
+            任务状态，见 Job.to_dict
+
+        Raises:
+            ValueError: 未知的任务类型或参数不是对象
+            RuntimeError: 队列已满或执行器已关闭
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"未知的任务类型: {kind}，可选: {', '.join(self.handlers)}")
+        if params is not None and not isinstance(params, dict):
+            raise ValueError("任务参数必须是对象")
+        if self._closed:
+            raise RuntimeError("任务执行器已关闭")
+
+        job = Job(kind, params or {})
+        with self._lock:
+            self._prune()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise RuntimeError(f"任务队列已满（最多 {self._queue.maxsize} 个排队任务），请稍后再试")
+            self._jobs[job.id] = job
+
+        return job.to_dict()
+
+    def _get(self, job_id: str) -> Job:
+        """按ID查找任务"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"任务不存在: {job_id}")
+        return job
+
+    def get_status(self, job_id: str, take_file: bool = False) -> Dict:
+        """
+        查询任务状态
+
+        Args:
+            job_id: 任务ID
+            take_file: 为真时结果中附带文件内容，随后任务释放文件内容（只交付一次）；
+                       为假时结果不含文件内容
+
+        Returns:
+            任务状态，见 Job.to_dict
+
+        Raises:
+            ValueError: 任务不存在或已过保留时间
+        """
+        job = self._get(job_id)
+        with self._lock:
+            status = job.to_dict(include_file=take_file)
+            if take_file and job.finished:
+                job._release_file()
+        return status
+
+    def cancel(self, job_id: str) -> Dict:
+        """
+        取消任务，已结束的任务不受影响
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务状态；运行中的任务在下一个进度检查点停止
+
+        Raises:
+            ValueError: 任务不存在
+        """
+        job = self._get(job_id)
+        with self._lock:
+            if not job.finished:
+                job._cancel.set()
+                if job.state == JOB_QUEUED:
+                    job._finish(JOB_CANCELLED, '已取消')
+                else:
+                    job.message = '正在取消'
+        return job.to_dict()
+
+    def list_jobs(self) -> List[Dict]:
+        """
+        列出保留中的任务
+
+        Returns:
+            按提交时间倒序的任务状态列表，不含任务结果（结果按ID查询）
+        """
+        with self._lock:
+            self._prune()
+            jobs = sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+        return [job.to_dict(include_result=False) for job in jobs]
+
+    def _prune(self):
+        """删除超过保留时间的已结束任务，调用方持有锁"""
+        deadline = time.monotonic() - JOB_RETENTION_SECONDS
+        for job_id in [job.id for job in self._jobs.values()
+                       if job._finished_monotonic is not None and job._finished_monotonic < deadline]:
+            del self._jobs[job_id]
+
+    def _worker(self):
+        """工作线程主循环"""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job):
+        """执行单个任务"""
+        with self._lock:
+            # 排队期间已被取消
+            if job.finished:
+                return
+            job.state = JOB_RUNNING
+            job.message = '执行中'
+            job.started_at = datetime.now()
+
+        try:
+            result = self.handlers[job.kind](**job.params, progress=job.report)
+        except JobCancelled:
+            job._finish(JOB_CANCELLED, '已取消')
+            return
+        except Exception as e:
+            job._finish(JOB_FAILED, f'任务失败: {str(e)}')
+            return
+
+        # 任务函数自行捕获异常时，取消表现为失败结果，按检查点是否已触发区分
+        if job._interrupted:
+            job._finish(JOB_CANCELLED, '已取消')
+        elif not isinstance(result, dict):
+            # 不是结果字典时按失败结束，避免工作线程退出、任务停在执行中
+            job._finish(JOB_FAILED, f'任务失败: 任务函数返回了 {type(result).__name__}，应为结果字典')
+        elif result.get('success'):
+            job._finish(JOB_SUCCEEDED, result.get('message') or '已完成', result)
+        else:
+            job._finish(JOB_FAILED, result.get('message') or '任务失败', result)
+
+    def shutdown(self, timeout: float = 10.0):
+        """
+        停止接收任务，取消排队中的任务，等待运行中的任务结束
+
+        Args:
+            timeout: 每个工作线程的等待秒数
+        """
+        self._closed = True
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.finished:
+                    job._cancel.set()
+                    if job.state == JOB_QUEUED:
+                        job._finish(JOB_CANCELLED, '已取消')
+
+        for _ in self._threads:
+            # 队列可能已满，阻塞等待工作线程取走排队任务
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
@@ -0,0 +1,159 @@
+"""
+变更日志
+
+change_log 是只追加的变更日志，employees、patterns、records 上的触发器
+为每一行的增删改追加一条 (自增变更ID, 表, 行ID, 操作)，删除留下 'delete' 墓碑。
+所有写入路径（桌面端、API端、批量导入、按条件批量修改）都会自动记录。
+
+客户端保存最后处理的变更ID，之后用 changes_since() 只取增量：
+    - 同一行的多次变更只返回最后一次，'insert'/'update' 附带该行当前内容
+    - 归档、恢复等整表级操作追加 op='reset' 标记，客户端应整表重新加载；
+      日志已被清理到客户端变更ID之后、或数据库从备份恢复后变更ID回退时，同样要求全部重新加载
+"""
+
+import sqlite3
+from typing import Dict, List, Optional
+
+from query_module import statement
+
+
+# 记录变更的表
+JOURNAL_TABLES = ('employees', 'patterns', 'records')
+
+# 变更日志默认保留天数
+JOURNAL_RETENTION_DAYS = 30
+
+# 每次最多返回的变更数
+CHANGES_LIMIT = 500
+
+CHANGE_LOG_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS change_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER,
+        op TEXT NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def _journal_triggers(table: str) -> List[str]:
+    """生成一张表的变更日志触发器"""
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_journal
+        AFTER {event} ON {table}
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op)
+            VALUES ('{table}', {row}.id, '{event.lower()}');
+        END
+        '''
+        for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))
+    ]
+
+
+JOURNAL_SCHEMA = [CHANGE_LOG_SCHEMA] + [sql for table in JOURNAL_TABLES
+                                        for sql in _journal_triggers(table)]
+
+
+def create_change_journal(cursor: sqlite3.Cursor):
+    """
+    创建变更日志表及触发器（迁移步骤）
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+    """
+    for sql in JOURNAL_SCHEMA:
+        cursor.execute(sql)
+
+
+def append_reset(cursor: sqlite3.Cursor, tables=JOURNAL_TABLES):
+    """
+    追加整表重新加载标记，用于逐行记录没有意义的整表级操作
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+        tables: 需要客户端重新加载的表
+    """
+    cursor.executemany("INSERT INTO change_log (table_name, op) VALUES (?, 'reset')",
+                       [(table,) for table in tables])
+
+
+def changes_since(cursor: sqlite3.Cursor, change_id: Optional[int],
+                  limit: int = CHANGES_LIMIT) -> Dict:
+    """
+    读取变更ID之后的增量
+
+    Args:
+        cursor: 数据库游标
+        change_id: 客户端最后处理的变更ID；为空时只返回当前变更ID，并要求全部重新加载
+        limit: 最多返回的变更数
+
+    Returns:
+        {'last_change_id': 下次请求使用的变更ID, 'has_more': 是否还有未返回的变更,
+         'reset': 需要整表重新加载的表,
+         'changes': [{'change_id', 'table', 'op', 'id', 'row': 当前行或None}]}
+    """
+    cursor.execute(statement('select_change_log_bounds'))
+    first_id, last_id = cursor.fetchone()
+    first_id, last_id = first_id or 0, last_id or 0
+
+    # 初次请求、日志已清理到请求位置之后、或从备份恢复后变更ID回退
+    if change_id is None or change_id > last_id or (first_id and change_id < first_id - 1):
+        return {'last_change_id': last_id, 'has_more': False,
+                'reset': list(JOURNAL_TABLES), 'changes': []}
+
+    cursor.execute(statement('select_changes_since'), (change_id, limit + 1))
+    rows = cursor.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return {'last_change_id': change_id, 'has_more': False, 'reset': [], 'changes': []}
+
+    upto = rows[-1][0]
+    cursor.execute(statement('select_change_resets'), (change_id, upto))
+    reset = [row[0] for row in cursor.fetchall()]
+
+    changes = [
+        {'change_id': row[0], 'table': row[1], 'op': row[3], 'id': row[2], 'row': None}
+        for row in rows if row[3] != 'reset' and row[1] not in reset
+    ]
+
+    # 按表一次取回新增、修改行的当前内容；已不存在的行（随后被删除或归档）按删除处理
+    for table in JOURNAL_TABLES:
+        pending = {change['id']: change for change in changes
+                   if change['table'] == table and change['op'] != 'delete'}
+        if not pending:
+            continue
+
+        cursor.execute(statement(f'select_{table}_by_ids'), (_json_ids(pending),))
+        for row in cursor.fetchall():
+            pending.pop(row['id'])['row'] = dict(row)
+        for change in pending.values():
+            change['op'] = 'delete'
+
+    return {'last_change_id': upto, 'has_more': has_more, 'reset': reset, 'changes': changes}
+
+
+def _json_ids(ids) -> str:
+    """把ID集合编码为 json_each 可读取的数组"""
+    return '[' + ','.join(str(int(item_id)) for item_id in ids) + ']'
+
+
+def prune_change_log(cursor: sqlite3.Cursor, days: int = JOURNAL_RETENTION_DAYS) -> int:
+    """
+    删除早于保留天数的变更，至少保留最后一条以维持变更ID连续
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+        days: 保留天数
+
+    Returns:
+        删除的条数
+    """
+    cursor.execute('''
+        DELETE FROM change_log
+        WHERE changed_at < datetime('now', ?)
+          AND id < (SELECT MAX(id) FROM change_log)
+    ''', (f'-{int(days)} days',))
+    return cursor.rowcount
@@ -0,0 +1,128 @@
+import sqlite3
+from typing import Callable, List, Tuple, Union
+
+from archive_module import ARCHIVED_MONTHS_SCHEMA
+from cache_module import create_data_versions, create_pattern_prices_versions
+from journal_module import create_change_journal
+from price_module import create_pattern_prices
+from rollup_module import create_daily_totals
+from search_module import create_search_index
+
+
+SCHEMA_VERSION_KEY = 'schema_version'
+
+# 迁移步骤：(版本号, 说明, 语句列表)
+# 语句可以是 SQL 字符串，也可以是接收 cursor 的函数；每一步都必须可重复执行。
+# 新的迁移只能追加在末尾，已发布的版本号不可修改。
+Step = Union[str, Callable[[sqlite3.Cursor], None]]
+
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, '工资记录复合索引', [
+        # 按日期范围汇总时覆盖 WHERE/GROUP BY/SUM 所需的全部列，无需回表
+        '''
+        CREATE INDEX IF NOT EXISTS idx_records_date_employee_pattern
+        ON records (record_date, employee_id, pattern_id, count, total)
+        ''',
+        # 按员工筛选记录以及删除员工前的 COUNT(*) 检查
+        '''
+        CREATE INDEX IF NOT EXISTS idx_records_employee_date
+        ON records (employee_id, record_date)
+        ''',
+        # 按花型筛选记录以及删除花型前的 COUNT(*) 检查
+        '''
+        CREATE INDEX IF NOT EXISTS idx_records_pattern_date
+        ON records (pattern_id, record_date)
+        ''',
+    ]),
+    (2, '更新查询优化器统计信息', [
+        'ANALYZE',
+    ]),
+    (3, '工资记录分页索引', [
+        # 索引隐含 rowid，(record_date, id) 倒序键集分页无需排序
+        '''
+        CREATE INDEX IF NOT EXISTS idx_records_date
+        ON records (record_date)
+        ''',
+    ]),
+    (4, '按日汇总表及维护触发器', [
+        create_daily_totals,
+    ]),
+    (5, '数据版本表及维护触发器', [
+        create_data_versions,
+    ]),
+    (6, '花型单价历史表及维护触发器', [
+        create_pattern_prices,
+    ]),
+    (7, '单价历史数据版本触发器', [
+        create_pattern_prices_versions,
+    ]),
+    (8, '员工、花型名称及工资记录备注全文索引', [
+        create_search_index,
+    ]),
+    (9, '工资记录归档月份表', [
+        ARCHIVED_MONTHS_SCHEMA,
+    ]),
+    (10, '员工、花型、工资记录变更日志', [
+        create_change_journal,
+    ]),
+]
+
+
+def get_schema_version(cursor: sqlite3.Cursor) -> int:
+    """
+    读取当前数据库结构版本
+
+    Args:
+        cursor: 数据库游标
+
+    Returns:
+        结构版本号，未记录时为0
+    """
+    cursor.execute("SELECT value FROM settings WHERE key = ?", (SCHEMA_VERSION_KEY,))
+    row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    按顺序执行尚未应用的迁移，每个版本一个事务
+
+    Args:
+        conn: 数据库连接（settings 表必须已存在）
+
+    Returns:
+        迁移后的结构版本号
+    """
+    cursor = conn.cursor()
+    version = get_schema_version(cursor)
+
+    for target, description, steps in MIGRATIONS:
+        if target <= version:
+            continue
+
+        # 多个进程同时启动时，只有拿到写锁的一方执行迁移
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            version = get_schema_version(cursor)
+            if target <= version:
+                conn.rollback()
+                continue
+
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+
+            cursor.execute('''
+                INSERT OR REPLACE INTO settings (key, value)
+                VALUES (?, ?)
+            ''', (SCHEMA_VERSION_KEY, str(target)))
+
+            conn.commit()
+            version = target
+        except Exception as e:
+            conn.rollback()
+            raise RuntimeError(f"数据库迁移到版本 {target}（{description}）失败: {e}") from e
+
+    return version
@@ -0,0 +1,450 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from query_module import STATEMENT_CACHE_SIZE
+
+
+# 连接打开时应用的存储参数：WAL 模式下读写互不阻塞，
+# busy_timeout 让写冲突时等待而不是立即报 "database is locked"
+STORAGE_PROFILE = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,          # 毫秒
+    'synchronous': 'NORMAL',       # WAL 模式下 NORMAL 已能保证数据库不损坏
+    'cache_size': -16000,          # 负数表示 KiB，约 16MB 页缓存
+    'mmap_size': 134217728,        # 128MB 内存映射读
+    'temp_store': 'MEMORY'
+}
+
+
+# 等待写操作结果时检查写线程是否仍在运行的间隔（秒）
+WRITER_LIVENESS_INTERVAL = 1.0
+
+
+def open_connection(db_path: str, profile: Optional[Dict[str, Any]] = None) -> sqlite3.Connection:
+    """
+    打开连接并应用存储参数
+
+    Args:
+        db_path: 数据库文件路径
+        profile: PRAGMA 参数，默认使用 STORAGE_PROFILE
+
+    Returns:
+        可跨线程使用的连接，语句缓存大小为 STATEMENT_CACHE_SIZE
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    conn.row_factory = sqlite3.Row  # 启用字典访问
+
+    for name, value in (STORAGE_PROFILE if profile is None else profile).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+    return conn
+
+
+class PooledConnection:
+    """
+    连接池中借出的连接代理
+
+    除 close() 外的所有属性和方法都转发给底层的 sqlite3.Connection，
+    close() 不会真正关闭连接，而是把连接归还给连接池，
+    因此原有的 "conn = get_connection() ... finally: conn.close()" 写法无需修改。
+    """
+
+    def __init__(self, pool: 'ConnectionPool', conn: sqlite3.Connection):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_conn', conn)
+
+    def __getattr__(self, name):
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError("连接已归还给连接池")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    def close(self):
+        """归还连接到连接池"""
+        conn = object.__getattribute__(self, '_conn')
+        if conn is not None:
+            object.__setattr__(self, '_conn', None)
+            self._pool.release(conn)
+
+    def __del__(self):
+        # 异常路径上未调用 close() 的连接在代理被回收时归还，避免连接池被耗尽
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    有界、线程感知的SQLite连接池
+
+    - 连接以 check_same_thread=False 打开，可以在线程之间传递
+    - 同一线程再次获取连接时优先拿回自己上次使用的连接（Flask 线程复用）
+    - max_size=1 时相当于一个串行使用的长连接（pywebview js_api）
+    - 空闲超过 health_check_interval 的连接在借出前执行 SELECT 1 检查
+    """
+
+    def __init__(self, db_path: str, max_size: int = 5, timeout: float = 10.0,
+                 health_check_interval: float = 30.0, profile: Optional[Dict[str, Any]] = None):
+        """
+        初始化连接池
+
+        Args:
+            db_path: 数据库文件路径
+            max_size: 最大连接数
+            timeout: 连接耗尽时等待空闲连接的最长秒数
+            health_check_interval: 空闲多少秒后借出前需要做健康检查
+            profile: 连接打开时应用的 PRAGMA 参数，默认使用 STORAGE_PROFILE
+        """
+        if max_size < 1:
+            raise ValueError("max_size 必须大于0")
+
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.profile = profile
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: List[sqlite3.Connection] = []
+        self._last_used: Dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+        self._paused = 0
+        self._local = threading.local()
+
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建新的底层连接"""
+        return open_connection(self.db_path, self.profile)
+
+    def _take_idle(self) -> Optional[sqlite3.Connection]:
+        """取出空闲连接，优先返回当前线程上次使用的连接（需持有锁）"""
+        if not self._idle:
+            return None
+
+        preferred = getattr(self._local, 'conn', None)
+        if preferred is not None and preferred in self._idle:
+            self._idle.remove(preferred)
+            return preferred
+
+        return self._idle.pop()
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """检查连接是否可用"""
+        last_used = self._last_used.get(id(conn), 0)
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection):
+        """丢弃连接并释放名额"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+        with self._cond:
+            self._last_used.pop(id(conn), None)
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify_all()
+
+    def acquire(self) -> PooledConnection:
+        """
+        借出一个连接
+
+        Returns:
+            连接代理，调用 close() 即归还
+
+        Raises:
+            sqlite3.OperationalError: 连接池已关闭或等待超时
+        """
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            conn = None
+            create = False
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise sqlite3.OperationalError("连接池已关闭")
+
+                    if not self._paused:
+                        conn = self._take_idle()
+                        if conn is not None:
+                            break
+
+                        if self._size < self.max_size:
+                            self._size += 1
+                            create = True
+                            break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError("获取数据库连接超时，连接池已耗尽")
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+            elif not self._is_healthy(conn):
+                self._discard(conn)
+                continue
+            else:
+                with self._cond:
+                    self._reused += 1
+
+            self._local.conn = conn
+            return PooledConnection(self, conn)
+
+    def release(self, conn: sqlite3.Connection):
+        """
+        归还连接，未提交的事务会被回滚
+
+        Args:
+            conn: 底层连接
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+
+            self._last_used[id(conn)] = time.monotonic()
+            self._idle.append(conn)
+            # 唤醒全部等待者：等待借出的线程和 paused() 都在此条件上等待
+            self._cond.notify_all()
+
+    @contextmanager
+    def paused(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        暂停借出连接：等待借出中的连接全部归还并关闭空闲连接，退出时恢复借出
+
+        期间本进程没有连接打开数据库文件（包括临时 ATTACH 的归档库），
+        用于恢复备份等需要替换数据库文件的操作；等待借出的调用方阻塞至恢复。
+
+        Args:
+            timeout: 等待归还的最长秒数，默认使用连接池的 timeout
+
+        Raises:
+            sqlite3.OperationalError: 等待超时，借出中的连接未能全部归还
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+
+        with self._cond:
+            self._paused += 1
+            try:
+                while self._size > len(self._idle):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError("数据库正忙，等待读取操作结束超时")
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._paused -= 1
+                self._cond.notify_all()
+                raise
+
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._last_used.clear()
+
+        for conn in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._paused -= 1
+                self._cond.notify_all()
+
+    def close_all(self):
+        """关闭连接池，关闭所有空闲连接；借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._last_used.clear()
+            self._cond.notify_all()
+
+        for conn in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> Dict:
+        """
+        获取连接池统计信息
+
+        Returns:
+            连接数、空闲数及创建/复用/丢弃计数
+        """
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'created': self._created,
+                'reused': self._reused,
+                'discarded': self._discarded,
+                'closed': self._closed
+            }
+
+
+class WriteQueue:
+    """
+    单写线程队列
+
+    所有提交的写操作在同一个专用线程、同一个连接上依次执行，
+    写操作之间不再互相争锁；配合 WAL 模式，读连接可以与之并发运行。
+    """
+
+    _STOP = object()
+
+    def __init__(self, db_path: str, max_pending: int = 1000,
+                 profile: Optional[Dict[str, Any]] = None):
+        """
+        初始化写队列并启动写线程
+
+        Args:
+            db_path: 数据库文件路径
+            max_pending: 队列中最多等待的写操作数
+            profile: 连接打开时应用的 PRAGMA 参数，默认使用 STORAGE_PROFILE
+
+        Raises:
+            sqlite3.Error: 写连接打开失败（路径无效、文件被锁定、PRAGMA 失败等）
+        """
+        self.db_path = db_path
+        self.profile = profile
+
+        # 在调用线程上打开写连接，失败时由构造函数抛出，而不是让写线程在读取队列前退出
+        self._conn = open_connection(db_path, profile)
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """写线程主循环"""
+        conn = self._conn
+
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._STOP:
+                    break
+
+                future, func, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    future.set_result(func(conn, *args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+                finally:
+                    if conn.in_transaction:
+                        conn.rollback()
+        finally:
+            conn.close()
+            self._fail_pending()
+
+    def _fail_pending(self):
+        """写线程退出后，队列中剩余的写操作以异常结束，不让提交方一直等待"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not self._STOP:
+                item[0].set_exception(sqlite3.OperationalError("写线程已停止"))
+
+    def submit(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        在写线程上执行 func(conn, *args, **kwargs) 并等待结果
+
+        Args:
+            func: 写操作，第一个参数为写连接
+
+        Returns:
+            func 的返回值，func 抛出的异常会在调用线程重新抛出
+
+        Raises:
+            sqlite3.OperationalError: 写队列已关闭或写线程已停止
+        """
+        if self.on_writer_thread():
+            raise RuntimeError("不能在写线程内部再次提交写操作")
+        if self._closed:
+            raise sqlite3.OperationalError("写队列已关闭")
+        if not self._thread.is_alive():
+            raise sqlite3.OperationalError("写线程已停止")
+
+        future: Future = Future()
+        self._queue.put((future, func, args, kwargs))
+
+        # 写线程在入队前后退出时，剩余操作由 _fail_pending 结束；这里定期确认线程仍在运行
+        while True:
+            try:
+                return future.result(timeout=WRITER_LIVENESS_INTERVAL)
+            except FutureTimeout:
+                # 写操作自身抛出的 TimeoutError 原样传出
+                if future.done():
+                    raise
+                if not self._thread.is_alive():
+                    raise sqlite3.OperationalError("写线程已停止")
+
+    def on_writer_thread(self) -> bool:
+        """当前线程是否为写线程"""
+        return threading.current_thread() is self._thread
+
+    def close(self, timeout: float = 10.0):
+        """处理完已提交的写操作后停止写线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
@@ -0,0 +1,208 @@
+"""
+花型单价历史
+
+pattern_prices 记录每个花型自某日起生效的单价，工资记录按记录日期当天生效的单价计价，
+因此单价调整后补录以前的工作量仍然使用当时的单价。
+
+patterns.price 始终是当前单价；由触发器维护历史：
+    - 新增花型时写入一条自 BASE_EFFECTIVE_DATE 起生效的初始单价
+    - 直接修改 patterns.price 时写入一条自当天起生效的新单价
+    - 删除花型时删除其单价历史
+以后生效的单价到期时 patterns.price 不会自行变化，由 sync_current_prices 按天同步
+（Database 在启动时及日期变化后的首次读取前调用）。
+"""
+
+import sqlite3
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+
+# 初始单价的生效日期，早于任何工资记录
+BASE_EFFECTIVE_DATE = '0001-01-01'
+
+PATTERN_PRICES_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS pattern_prices (
+        pattern_id INTEGER NOT NULL,
+        effective_from DATE NOT NULL,
+        price REAL NOT NULL,
+        PRIMARY KEY (pattern_id, effective_from)
+    ) WITHOUT ROWID
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_patterns_insert_price
+    AFTER INSERT ON patterns
+    BEGIN
+        INSERT OR IGNORE INTO pattern_prices (pattern_id, effective_from, price)
+        VALUES (NEW.id, '{BASE_EFFECTIVE_DATE}', NEW.price);
+    END
+    ''',
+    # 当天已生效的单价与新单价相同时（例如 set_pattern_price 同步当前单价）不再重复记录
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_patterns_update_price
+    AFTER UPDATE OF price ON patterns
+    WHEN NEW.price <> OLD.price AND NEW.price IS NOT (
+        SELECT price FROM pattern_prices
+        WHERE pattern_id = NEW.id AND effective_from <= date('now', 'localtime')
+        ORDER BY effective_from DESC LIMIT 1
+    )
+    BEGIN
+        INSERT INTO pattern_prices (pattern_id, effective_from, price)
+        VALUES (NEW.id, date('now', 'localtime'), NEW.price)
+        ON CONFLICT (pattern_id, effective_from) DO UPDATE SET price = excluded.price;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_patterns_delete_price
+    AFTER DELETE ON patterns
+    BEGIN
+        DELETE FROM pattern_prices WHERE pattern_id = OLD.id;
+    END
+    ''',
+]
+
+# 按记录日期查询生效单价的标量子查询，{record_date} 和 {pattern} 替换为列名或 "?"，
+# 使用 "?" 时参数顺序为 (record_date, pattern)；没有历史时退回花型当前单价，花型不存在时为 NULL
+PRICE_AS_OF_SQL = '''
+    (SELECT COALESCE(
+        (SELECT pp.price FROM pattern_prices pp
+         WHERE pp.pattern_id = p.id AND pp.effective_from <= {record_date}
+         ORDER BY pp.effective_from DESC LIMIT 1),
+        p.price)
+     FROM patterns p WHERE p.id = {pattern})
+'''
+
+
+def create_pattern_prices(cursor: sqlite3.Cursor):
+    """
+    创建单价历史表及维护触发器，并以当前单价回填（迁移步骤）
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+    """
+    for sql in PATTERN_PRICES_SCHEMA:
+        cursor.execute(sql)
+
+    cursor.execute('''
+        INSERT OR IGNORE INTO pattern_prices (pattern_id, effective_from, price)
+        SELECT id, ?, price FROM patterns
+    ''', (BASE_EFFECTIVE_DATE,))
+
+
+def price_as_of(cursor: sqlite3.Cursor, pattern_id: int, record_date: str) -> Optional[float]:
+    """
+    查询花型在指定日期生效的单价（走 pattern_prices 主键索引）
+
+    Args:
+        cursor: 数据库游标
+        pattern_id: 花型ID
+        record_date: 记录日期
+
+    Returns:
+        单价，花型不存在时为 None
+    """
+    cursor.execute(
+        f"SELECT {PRICE_AS_OF_SQL.format(record_date='?', pattern='?')}",
+        (record_date, pattern_id)
+    )
+    return cursor.fetchone()[0]
+
+
+class PriceHistory:
+    """
+    单价历史的内存区间表
+
+    批量导入时一次加载全部单价历史，之后每行按日期二分查找，不再逐行查询数据库。
+    """
+
+    def __init__(self, rows: List[Tuple[int, str, float]]):
+        """
+        初始化区间表
+
+        Args:
+            rows: (pattern_id, effective_from, price)，须按 pattern_id、effective_from 升序
+        """
+        self._dates: Dict[int, List[str]] = {}
+        self._prices: Dict[int, List[float]] = {}
+
+        for pattern_id, effective_from, price in rows:
+            self._dates.setdefault(pattern_id, []).append(effective_from)
+            self._prices.setdefault(pattern_id, []).append(price)
+
+    @classmethod
+    def load(cls, cursor: sqlite3.Cursor) -> 'PriceHistory':
+        """
+        从数据库加载全部单价历史
+
+        Args:
+            cursor: 数据库游标
+
+        Returns:
+            区间表
+        """
+        cursor.execute('''
+            SELECT pattern_id, effective_from, price
+            FROM pattern_prices
+            ORDER BY pattern_id, effective_from
+        ''')
+        return cls([tuple(row) for row in cursor.fetchall()])
+
+    def price_as_of(self, pattern_id: int, record_date: str) -> Optional[float]:
+        """
+        查询花型在指定日期生效的单价
+
+        Args:
+            pattern_id: 花型ID
+            record_date: 记录日期（YYYY-MM-DD）
+
+        Returns:
+            单价，没有生效单价时为 None
+        """
+        dates = self._dates.get(pattern_id)
+        if not dates:
+            return None
+
+        index = bisect_right(dates, record_date) - 1
+        return self._prices[pattern_id][index] if index >= 0 else None
+
+
+def set_pattern_price(cursor: sqlite3.Cursor, pattern_id: int, price: float,
+                      effective_from: str):
+    """
+    记录自某日起生效的单价，并把 patterns.price 同步为当天生效的单价
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+        pattern_id: 花型ID
+        price: 单价
+        effective_from: 生效日期（YYYY-MM-DD）
+    """
+    cursor.execute('''
+        INSERT INTO pattern_prices (pattern_id, effective_from, price)
+        VALUES (?, ?, ?)
+        ON CONFLICT (pattern_id, effective_from) DO UPDATE SET price = excluded.price
+    ''', (pattern_id, effective_from, price))
+
+    cursor.execute(f'''
+        UPDATE patterns
+        SET price = {PRICE_AS_OF_SQL.format(record_date="date('now', 'localtime')", pattern='patterns.id')}
+        WHERE id = ?
+    ''', (pattern_id,))
+
+
+def sync_current_prices(cursor: sqlite3.Cursor) -> int:
+    """
+    把 patterns.price 同步为今天生效的单价，用于以后生效的单价到期之后
+
+    同步写入的单价与当天生效的单价相同，trg_patterns_update_price 不会再记录历史；
+    花型表的数据版本和变更日志照常由触发器更新。
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+
+    Returns:
+        单价发生变化的花型数
+    """
+    current = PRICE_AS_OF_SQL.format(record_date="date('now', 'localtime')", pattern='patterns.id')
+    cursor.execute(f"UPDATE patterns SET price = {current} WHERE price IS NOT {current}")
+    return cursor.rowcount
@@ -0,0 +1,364 @@
+"""
+SQL 语句目录
+
+桌面端 EmbroiderySystem 和API端 APIServer 都通过 Database 访问数据库，
+Database 执行的语句全部在此定义：
+    - STATEMENTS 是固定的参数化语句，按名称取用
+    - 列表查询的可选筛选条件按固定顺序拼接，ORDER BY 只接受白名单中的排序键，
+      因此语句文本只有有限的几种，不会拼入调用方传入的任何字符串
+语句文本固定后，连接上的 sqlite3 语句缓存（STATEMENT_CACHE_SIZE）即可命中，
+每条语句在每个连接上只编译一次。
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from search_module import fts_phrase, use_trigram
+
+
+# 每个连接缓存的已编译语句数，需大于目录中语句及其筛选组合的数量
+STATEMENT_CACHE_SIZE = 256
+
+RECORD_COLUMNS = '''
+    SELECT r.*, e.name as employee_name, p.name as pattern_name, p.price
+    FROM {records} r
+    JOIN employees e ON r.employee_id = e.id
+    JOIN patterns p ON r.pattern_id = p.id
+'''
+
+DAILY_SUMMARY_COLUMNS = '''
+    SELECT
+        r.record_date,
+        e.name as employee_name,
+        p.name as pattern_name,
+        r.total_count,
+        r.total_amount
+    FROM daily_totals r
+    JOIN employees e ON r.employee_id = e.id
+    JOIN patterns p ON r.pattern_id = p.id
+'''
+
+# {where}、{order_by} 只会被替换为本模块生成的片段
+STATEMENTS: Dict[str, str] = {
+    # 员工
+    'select_employees': "SELECT * FROM employees WHERE {where} ORDER BY {order_by}",
+    'insert_employee': "INSERT INTO employees (name, status) VALUES (?, ?)",
+    'update_employee': "UPDATE employees SET name = ?, status = ? WHERE id = ?",
+    'delete_employee': "DELETE FROM employees WHERE id = ?",
+    'employee_exists': "SELECT 1 FROM employees WHERE id = ?",
+    # 按日汇总计数，包含已归档的记录
+    'count_employee_records': "SELECT COALESCE(SUM(record_count), 0) FROM daily_totals WHERE employee_id = ?",
+
+    # 花型
+    'select_patterns': "SELECT * FROM patterns WHERE {where} ORDER BY {order_by}",
+    'insert_pattern': "INSERT INTO patterns (name, price) VALUES (?, ?)",
+    'insert_default_pattern': "INSERT OR IGNORE INTO patterns (name, price) VALUES (?, ?)",
+    'update_pattern': "UPDATE patterns SET name = ?, price = ? WHERE id = ?",
+    'update_pattern_name': "UPDATE patterns SET name = ? WHERE id = ?",
+    'delete_pattern': "DELETE FROM patterns WHERE id = ?",
+    'pattern_exists': "SELECT 1 FROM patterns WHERE id = ?",
+    'count_pattern_records': "SELECT COALESCE(SUM(record_count), 0) FROM daily_totals WHERE pattern_id = ?",
+    'select_pattern_prices': '''
+        SELECT effective_from, price
+        FROM pattern_prices
+        WHERE pattern_id = ?
+        ORDER BY effective_from DESC
+    ''',
+
+    # 工资记录
+    'select_records': RECORD_COLUMNS + " WHERE {where} ORDER BY {order_by}",
+    'select_records_page': RECORD_COLUMNS + '''
+        WHERE {where}
+        ORDER BY r.record_date DESC, r.id DESC
+        LIMIT ?
+    ''',
+    'count_records': "SELECT COUNT(*) FROM {records} r WHERE {where}",
+    'insert_record': '''
+        INSERT INTO records (employee_id, pattern_id, record_date, count, total, special, note)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'update_record': '''
+        UPDATE records
+        SET employee_id = ?, pattern_id = ?, record_date = ?, count = ?, total = ?,
+            special = ?, note = ?
+        WHERE id = ?
+    ''',
+    'delete_record': "DELETE FROM records WHERE id = ?",
+
+    # 统计报表（读取 daily_totals 日汇总表）
+    'select_daily_summary': DAILY_SUMMARY_COLUMNS + '''
+        WHERE {where}
+        ORDER BY r.record_date DESC, e.name, p.name
+    ''',
+    'select_monthly_summary': '''
+        SELECT
+            e.name as employee_name,
+            p.name as pattern_name,
+            SUM(r.total_count) as total_count,
+            SUM(r.total_amount) as total_amount
+        FROM daily_totals r
+        JOIN employees e ON r.employee_id = e.id
+        JOIN patterns p ON r.pattern_id = p.id
+        WHERE r.record_date >= ? AND r.record_date < ?
+        GROUP BY r.employee_id, r.pattern_id
+        ORDER BY e.name, p.name
+    ''',
+
+    'select_dashboard_stats': '''
+        SELECT
+            (SELECT COUNT(*) FROM employees) as employee_count,
+            (SELECT COUNT(*) FROM employees WHERE status = 'active') as active_employee_count,
+            (SELECT COUNT(*) FROM patterns) as pattern_count,
+            COALESCE(SUM(record_count), 0) as record_count,
+            COALESCE(SUM(total_count), 0) as total_count,
+            COALESCE(SUM(total_amount), 0) as total_wage
+        FROM daily_totals
+        WHERE record_date = ?
+    ''',
+
+    # 区间报表引擎（report_module），日期换算为自 1970-01-01 起的天数：
+    # julianday('1970-01-01') = 2440587.5
+    'select_report_daily_totals': '''
+        SELECT CAST(julianday(record_date) - 2440587.5 AS INTEGER),
+               employee_id, pattern_id, total_count, total_amount, record_count
+        FROM daily_totals
+        WHERE record_date >= ? AND record_date <= ?
+    ''',
+    'select_report_records': '''
+        SELECT CAST(julianday(record_date) - 2440587.5 AS INTEGER),
+               employee_id, pattern_id, count, total, 1
+        FROM {records}
+        WHERE record_date >= ? AND record_date <= ?
+    ''',
+    'select_employee_names': "SELECT id, name FROM employees",
+    'select_pattern_names': "SELECT id, name FROM patterns",
+
+    # 归档（archive_module）
+    'select_archived_months': '''
+        SELECT month, year, record_count, total_count, total_amount, archived_at
+        FROM archived_months
+        ORDER BY month
+    ''',
+
+    # 数据版本（cache_module）
+    'select_data_versions': "SELECT scope, version FROM data_versions",
+
+    # 变更日志（journal_module）
+    'select_change_log_bounds': "SELECT MIN(id), MAX(id) FROM change_log",
+    # 同一行只取最后一次变更
+    'select_changes_since': '''
+        SELECT id, table_name, row_id, op
+        FROM change_log
+        WHERE id IN (
+            SELECT MAX(id) FROM change_log WHERE id > ? GROUP BY table_name, row_id
+        )
+        ORDER BY id
+        LIMIT ?
+    ''',
+    'select_change_resets': '''
+        SELECT DISTINCT table_name
+        FROM change_log
+        WHERE id > ? AND id <= ? AND op = 'reset'
+    ''',
+    'select_employees_by_ids': "SELECT * FROM employees WHERE id IN (SELECT value FROM json_each(?))",
+    'select_patterns_by_ids': "SELECT * FROM patterns WHERE id IN (SELECT value FROM json_each(?))",
+    'select_records_by_ids': RECORD_COLUMNS + " WHERE r.id IN (SELECT value FROM json_each(?))",
+
+    # 全文搜索（search_module），FTS 查询按 bm25 相关度排序，LIKE 查询用于过短的关键词
+    'search_employees': '''
+        SELECT e.*
+        FROM employees_fts
+        JOIN employees e ON e.id = employees_fts.rowid
+        WHERE employees_fts MATCH ?
+        ORDER BY employees_fts.rank
+        LIMIT ?
+    ''',
+    'search_employees_like': "SELECT * FROM employees WHERE name LIKE ? ORDER BY name LIMIT ?",
+    'search_patterns': '''
+        SELECT p.*
+        FROM patterns_fts
+        JOIN patterns p ON p.id = patterns_fts.rowid
+        WHERE patterns_fts MATCH ?
+        ORDER BY patterns_fts.rank
+        LIMIT ?
+    ''',
+    'search_patterns_like': "SELECT * FROM patterns WHERE name LIKE ? ORDER BY name LIMIT ?",
+    'search_records': '''
+        SELECT r.*, e.name as employee_name, p.name as pattern_name, p.price,
+               snippet(records_fts, -1, '[', ']', '…', 12) as snippet
+        FROM records_fts
+        JOIN records r ON r.id = records_fts.rowid
+        JOIN employees e ON r.employee_id = e.id
+        JOIN patterns p ON r.pattern_id = p.id
+        WHERE records_fts MATCH ?
+        ORDER BY records_fts.rank
+        LIMIT ?
+    ''',
+    'search_records_like': RECORD_COLUMNS.replace(
+        'p.price', "p.price, NULL as snippet") + '''
+        WHERE r.note LIKE ? OR r.special LIKE ?
+        ORDER BY r.record_date DESC, r.id DESC
+        LIMIT ?
+    ''',
+
+    # 设置
+    'get_setting': "SELECT value FROM settings WHERE key = ?",
+    'set_setting': "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+}
+
+# 排序键白名单：键 -> ORDER BY 子句，'-' 前缀表示倒序
+# 子句与已有索引的列顺序一致，并以唯一列收尾保证顺序稳定
+SORT_KEYS: Dict[str, Dict[str, str]] = {
+    'employees': {
+        'id': 'id',
+        '-id': 'id DESC',
+        'name': 'name',                                # 唯一索引
+        '-name': 'name DESC',
+        'create_date': 'create_date, id',
+        '-create_date': 'create_date DESC, id DESC',
+        'status': 'status, name',
+        '-status': 'status DESC, name',
+    },
+    'patterns': {
+        'id': 'id',
+        '-id': 'id DESC',
+        'name': 'name',                                # 唯一索引
+        '-name': 'name DESC',
+        'price': 'price, name',
+        '-price': 'price DESC, name',
+        'create_date': 'create_date, id',
+        '-create_date': 'create_date DESC, id DESC',
+    },
+    'records': {
+        'id': 'r.id',
+        '-id': 'r.id DESC',
+        # idx_records_date（隐含 rowid）
+        'record_date': 'r.record_date, r.id',
+        '-record_date': 'r.record_date DESC, r.id DESC',
+        # idx_records_employee_date、idx_records_pattern_date
+        'employee_id': 'r.employee_id, r.record_date, r.id',
+        '-employee_id': 'r.employee_id DESC, r.record_date DESC, r.id DESC',
+        'pattern_id': 'r.pattern_id, r.record_date, r.id',
+        '-pattern_id': 'r.pattern_id DESC, r.record_date DESC, r.id DESC',
+    },
+}
+
+DEFAULT_SORT_KEYS = {
+    'employees': '-create_date',
+    'patterns': '-create_date',
+    'records': '-record_date',
+}
+
+# 员工、花型名称搜索条件：关键词足够长时走 trigram 全文索引，否则 LIKE
+NAME_SEARCH_FTS = "id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)"
+NAME_SEARCH_LIKE = "name LIKE ?"
+
+# 工资记录筛选条件，按此顺序拼接
+RECORD_FILTERS: List[Tuple[str, str]] = [
+    ('employee_id', 'r.employee_id = ?'),
+    ('pattern_id', 'r.pattern_id = ?'),
+    ('start_date', 'r.record_date >= ?'),
+    ('end_date', 'r.record_date <= ?'),
+]
+
+
+def order_clause(table: str, sort_key: Optional[str] = None) -> str:
+    """
+    把排序键转换为白名单中的 ORDER BY 子句
+
+    Args:
+        table: 'employees'、'patterns' 或 'records'
+        sort_key: 排序键，如 'name'、'-create_date'，也接受 'create_date DESC' 写法；
+                  为空时使用默认排序
+
+    Returns:
+        ORDER BY 子句（不含 ORDER BY）
+
+    Raises:
+        ValueError: 排序键不在白名单中
+    """
+    key = (sort_key or DEFAULT_SORT_KEYS[table]).strip()
+
+    parts = key.split()
+    if len(parts) == 2 and parts[1].upper() in ('ASC', 'DESC'):
+        key = ('-' if parts[1].upper() == 'DESC' else '') + parts[0]
+
+    clause = SORT_KEYS[table].get(key)
+    if clause is None:
+        raise ValueError(f"不支持的排序方式: {sort_key}")
+    return clause
+
+
+def name_filter(table: str, search: str = '') -> Tuple[str, List]:
+    """
+    生成员工或花型按名称搜索的 WHERE 条件
+
+    Args:
+        table: 'employees' 或 'patterns'
+        search: 搜索关键词
+
+    Returns:
+        (WHERE 条件, 参数列表)，没有关键词时为 '1=1'
+    """
+    if not search:
+        return '1=1', []
+
+    if use_trigram(search):
+        return NAME_SEARCH_FTS.format(table=table), [fts_phrase(search)]
+    return NAME_SEARCH_LIKE, [f"%{search}%"]
+
+
+def record_filter(employee_id: int = None, pattern_id: int = None,
+                  start_date: str = None, end_date: str = None,
+                  before: Tuple[str, int] = None) -> Tuple[str, List]:
+    """
+    生成工资记录（别名 r）的 WHERE 条件
+
+    Args:
+        employee_id: 员工ID
+        pattern_id: 花型ID
+        start_date: 开始日期
+        end_date: 结束日期
+        before: 键集分页位置 (record_date, id)，只取排在其后的记录
+
+    Returns:
+        (WHERE 条件, 参数列表)，没有条件时为 '1=1'
+    """
+    values = {
+        'employee_id': employee_id,
+        'pattern_id': pattern_id,
+        'start_date': start_date,
+        'end_date': end_date,
+    }
+
+    conditions = []
+    params = []
+
+    for name, condition in RECORD_FILTERS:
+        if values[name]:
+            conditions.append(condition)
+            params.append(values[name])
+
+    if before:
+        conditions.append("(r.record_date, r.id) < (?, ?)")
+        params.extend(before)
+
+    return ' AND '.join(conditions) or '1=1', params
+
+
+def statement(name: str, where: str = '1=1', order_by: str = '', records: str = 'records') -> str:
+    """
+    取目录中的语句，并填入本模块生成的 WHERE 条件、排序子句和工资记录数据源
+
+    Args:
+        name: 语句名称
+        where: record_filter 等生成的条件
+        order_by: order_clause 生成的排序子句
+        records: 工资记录数据源，跨越归档月份时为 archive_module.records_source() 生成的子查询
+
+    Returns:
+        SQL 语句
+    """
+    sql = STATEMENTS[name]
+    if '{' not in sql:
+        return sql
+    return sql.format(where=where, order_by=order_by, records=records)
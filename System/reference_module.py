@@ -0,0 +1,140 @@
+"""
+员工、花型参考数据缓存
+
+录入、导入等写入路径需要按ID校验员工和花型、按名称查找ID、按记录日期查找生效单价。
+ReferenceCache 一次加载员工表、花型表和单价历史，之后在内存中查找：
+    - 进程内的员工、花型增删改及单价设置后调用 invalidate() 立即失效
+    - 另一进程的修改通过 data_versions 中 'employees'、'patterns' 范围的版本号发现，
+      每次取用时只读取这两个版本号
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+from cache_module import read_data_versions
+from price_module import PriceHistory
+
+
+# 参考数据依赖的数据版本范围
+REFERENCE_SCOPES = ('employees', 'patterns')
+
+
+class ReferenceData:
+    """
+    某一时刻的员工、花型快照
+
+    快照被多个线程共享，调用方不得修改其中的字典。
+    """
+
+    def __init__(self, employees: Dict[int, Dict], patterns: Dict[int, Dict],
+                 prices: PriceHistory):
+        """
+        初始化快照
+
+        Args:
+            employees: 员工ID -> {'id', 'name', 'status'}
+            patterns: 花型ID -> {'id', 'name', 'price'}
+            prices: 单价历史区间表
+        """
+        self.employees = employees
+        self.patterns = patterns
+        self.employee_ids_by_name = {row['name']: row['id'] for row in employees.values()}
+        self.pattern_ids_by_name = {row['name']: row['id'] for row in patterns.values()}
+        self.prices = prices
+
+    @classmethod
+    def load(cls, cursor: sqlite3.Cursor) -> 'ReferenceData':
+        """
+        从数据库加载快照
+
+        Args:
+            cursor: 数据库游标
+
+        Returns:
+            参考数据快照
+        """
+        cursor.execute("SELECT id, name, status FROM employees")
+        employees = {row[0]: {'id': row[0], 'name': row[1], 'status': row[2]}
+                     for row in cursor.fetchall()}
+
+        cursor.execute("SELECT id, name, price FROM patterns")
+        patterns = {row[0]: {'id': row[0], 'name': row[1], 'price': row[2]}
+                    for row in cursor.fetchall()}
+
+        return cls(employees, patterns, PriceHistory.load(cursor))
+
+    def price_as_of(self, pattern_id: int, record_date: str) -> Optional[float]:
+        """
+        查询花型在指定日期生效的单价
+
+        Args:
+            pattern_id: 花型ID
+            record_date: 记录日期（YYYY-MM-DD）
+
+        Returns:
+            单价，没有单价历史时为当前单价，花型不存在时为 None
+        """
+        pattern = self.patterns.get(pattern_id)
+        if pattern is None:
+            return None
+
+        price = self.prices.price_as_of(pattern_id, record_date)
+        return pattern['price'] if price is None else price
+
+
+class ReferenceCache:
+    """按数据版本和显式失效刷新的参考数据缓存"""
+
+    def __init__(self):
+        """初始化缓存"""
+        self._lock = threading.Lock()
+        self._data: Optional[ReferenceData] = None
+        self._versions: Optional[Tuple[int, ...]] = None
+        self._loads = 0
+
+    def get(self, cursor: sqlite3.Cursor) -> ReferenceData:
+        """
+        获取当前参考数据，未加载、已失效或版本号变化时重新加载
+
+        Args:
+            cursor: 数据库游标
+
+        Returns:
+            参考数据快照
+        """
+        # 先读版本号再读数据，加载期间发生的修改最多导致下一次多加载一遍
+        versions = read_data_versions(cursor, REFERENCE_SCOPES)
+
+        with self._lock:
+            if self._data is not None and self._versions == versions:
+                return self._data
+
+        data = ReferenceData.load(cursor)
+
+        with self._lock:
+            self._data = data
+            self._versions = versions
+            self._loads += 1
+
+        return data
+
+    def invalidate(self):
+        """丢弃缓存，下次取用时重新加载"""
+        with self._lock:
+            self._data = None
+            self._versions = None
+
+    def stats(self) -> Dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            加载次数及当前缓存的员工数、花型数
+        """
+        with self._lock:
+            return {
+                'loads': self._loads,
+                'employees': len(self._data.employees) if self._data else 0,
+                'patterns': len(self._data.patterns) if self._data else 0
+            }
@@ -0,0 +1,276 @@
+"""
+区间报表引擎
+
+一次读取日期区间内的全部汇总行，转换为列式 NumPy 数组：
+    - 员工、花型为从0开始的分类编码（按名称排序）
+    - 日期为自 1970-01-01 起的天数（即 datetime64[D] 的整数值）
+之后的透视表、按日/周/月分桶和合计都用 np.bincount 向量化计算，
+季度、年度或任意区间只需一次查询，不再逐月调用 get_monthly_summary。
+rollup() 在同一份数组上一次算出 日×员工×花型、员工、花型、日 和总计各级汇总。
+
+数据源默认是 daily_totals 日汇总表（粒度与按日分桶相同，行数远少于工资记录），
+也可直接读取 records 表。
+"""
+
+import sqlite3
+from typing import Dict, List
+
+import numpy as np
+
+from query_module import statement
+
+
+# 数据源 -> query_module 中的语句名称
+REPORT_SOURCES = {
+    'daily_totals': 'select_report_daily_totals',
+    'records': 'select_report_records',
+}
+
+ROW_DTYPE = np.dtype([
+    ('day', 'i4'),
+    ('employee_id', 'i8'),
+    ('pattern_id', 'i8'),
+    ('count', 'i8'),
+    ('amount', 'f8'),
+    ('records', 'i8'),
+])
+
+PERIODS = ('day', 'week', 'month')
+
+
+class RangeReport:
+    """日期区间内的列式汇总数据"""
+
+    def __init__(self, rows: np.ndarray, employee_names: Dict[int, str],
+                 pattern_names: Dict[int, str]):
+        """
+        初始化报表
+
+        Args:
+            rows: ROW_DTYPE 结构化数组
+            employee_names: 员工ID -> 姓名
+            pattern_names: 花型ID -> 名称
+        """
+        self.day = rows['day']
+        self.count = rows['count']
+        self.amount = rows['amount']
+        self.records = rows['records']
+
+        self.employees, self.employee_code = self._encode(rows['employee_id'], employee_names)
+        self.patterns, self.pattern_code = self._encode(rows['pattern_id'], pattern_names)
+
+    @staticmethod
+    def _encode(ids: np.ndarray, names: Dict[int, str]):
+        """把ID列转换为按名称排序的分类编码，返回 (名称列表, 编码数组)"""
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        labels = [names.get(int(item_id), str(item_id)) for item_id in unique_ids]
+
+        # 按名称重排编码，使矩阵的行列顺序与 build_report_matrix 一致
+        order = sorted(range(len(labels)), key=labels.__getitem__)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+
+        return [labels[i] for i in order], rank[inverse]
+
+    @classmethod
+    def load(cls, cursor: sqlite3.Cursor, start_date: str, end_date: str,
+             source: str = 'daily_totals', records: str = 'records') -> 'RangeReport':
+        """
+        读取日期区间内的汇总行
+
+        Args:
+            cursor: 数据库游标
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            source: 'daily_totals' 或 'records'
+            records: 数据源为 records 时代替 records 表的子查询（包含已归档的记录）
+
+        Returns:
+            区间报表
+        """
+        # 按普通元组读取，np.fromiter 无需逐行转换 sqlite3.Row
+        cursor.row_factory = None
+        cursor.execute(statement(REPORT_SOURCES[source], records=records), (start_date, end_date))
+        rows = np.fromiter(cursor, dtype=ROW_DTYPE)
+
+        cursor.execute(statement('select_employee_names'))
+        employee_names = dict(cursor.fetchall())
+        cursor.execute(statement('select_pattern_names'))
+        pattern_names = dict(cursor.fetchall())
+
+        return cls(rows, employee_names, pattern_names)
+
+    def matrix(self) -> Dict:
+        """
+        员工×花型透视表
+
+        Returns:
+            与 database_module.build_report_matrix 结构相同的稠密矩阵
+        """
+        shape = (len(self.employees), len(self.patterns))
+        cell = self.employee_code * shape[1] + self.pattern_code
+        size = shape[0] * shape[1]
+
+        counts = np.bincount(cell, weights=self.count, minlength=size).reshape(shape)
+        amounts = np.bincount(cell, weights=self.amount, minlength=size).reshape(shape)
+
+        return {
+            'employees': self.employees,
+            'patterns': self.patterns,
+            'counts': counts.astype(np.int64).tolist(),
+            'amounts': amounts.tolist(),
+            'row_totals': {
+                'counts': counts.sum(axis=1).astype(np.int64).tolist(),
+                'amounts': amounts.sum(axis=1).tolist()
+            },
+            'column_totals': {
+                'counts': counts.sum(axis=0).astype(np.int64).tolist(),
+                'amounts': amounts.sum(axis=0).tolist()
+            },
+            'grand_total': {
+                'count': int(self.count.sum()),
+                'amount': float(self.amount.sum())
+            }
+        }
+
+    def bucket_keys(self, period: str) -> np.ndarray:
+        """
+        计算每行所属的时间桶
+
+        Args:
+            period: 'day'、'week'（周一开始）或 'month'
+
+        Returns:
+            与行对齐的桶编号（datetime64 的整数值）
+        """
+        if period == 'day':
+            return self.day
+        if period == 'week':
+            # 1970-01-01 是周四，加3后整除7得到以周一开始的周序号
+            return (self.day + 3) // 7
+        if period == 'month':
+            return self.day.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        raise ValueError(f"不支持的统计周期: {period}")
+
+    def buckets(self, period: str = 'month') -> List[Dict]:
+        """
+        按日、周或月分桶汇总
+
+        Args:
+            period: 'day'、'week'（周一开始）或 'month'
+
+        Returns:
+            按时间顺序的 [{'period': 标签, 'start_date', 'count', 'amount', 'records'}]，
+            周的标签为当周周一的日期
+        """
+        keys, inverse = np.unique(self.bucket_keys(period), return_inverse=True)
+
+        counts = np.bincount(inverse, weights=self.count, minlength=len(keys))
+        amounts = np.bincount(inverse, weights=self.amount, minlength=len(keys))
+        records = np.bincount(inverse, weights=self.records, minlength=len(keys))
+
+        if period == 'month':
+            starts = keys.astype('datetime64[M]').astype('datetime64[D]')
+            labels = keys.astype('datetime64[M]').astype(str)
+        elif period == 'week':
+            starts = (keys * 7 - 3).astype('datetime64[D]')
+            labels = starts.astype(str)
+        else:
+            starts = keys.astype('datetime64[D]')
+            labels = starts.astype(str)
+
+        return [
+            {
+                'period': str(label),
+                'start_date': str(start),
+                'count': int(count),
+                'amount': float(amount),
+                'records': int(record_count)
+            }
+            for label, start, count, amount, record_count
+            in zip(labels, starts.astype(str), counts, amounts, records)
+        ]
+
+    def totals(self) -> Dict:
+        """
+        区间合计
+
+        Returns:
+            {'count': 总针数, 'amount': 总金额, 'records': 记录条数}
+        """
+        return {
+            'count': int(self.count.sum()),
+            'amount': float(self.amount.sum()),
+            'records': int(self.records.sum())
+        }
+
+    def _group(self, keys: np.ndarray):
+        """按 keys 分组求和，返回 (分组键, 针数, 金额, 记录条数)，分组键升序"""
+        groups, inverse = np.unique(keys, return_inverse=True)
+
+        counts = np.bincount(inverse, weights=self.count, minlength=len(groups))
+        amounts = np.bincount(inverse, weights=self.amount, minlength=len(groups))
+        records = np.bincount(inverse, weights=self.records, minlength=len(groups))
+
+        return groups, counts.astype(np.int64), amounts, records.astype(np.int64)
+
+    @staticmethod
+    def _level(labels: Dict[str, List], counts: np.ndarray, amounts: np.ndarray,
+               records: np.ndarray) -> List[Dict]:
+        """把一级分组结果转换为字典列表"""
+        names = list(labels)
+        return [
+            dict(zip(names, values), total_count=count, total_amount=amount, record_count=record_count)
+            for *values, count, amount, record_count
+            in zip(*labels.values(), counts.tolist(), amounts.tolist(), records.tolist())
+        ]
+
+    def rollup(self) -> Dict:
+        """
+        多级汇总：日×员工×花型、员工、花型、日及总计
+
+        Returns:
+            {'details', 'employees', 'patterns', 'days', 'grand_total'}，
+            各级为按日期、姓名、花型名称升序的
+            [{..., 'total_count', 'total_amount', 'record_count'}]
+        """
+        employee_count = len(self.employees)
+        pattern_count = len(self.patterns)
+
+        # 日×员工×花型合成一个整数键，一次分组
+        cell = ((self.day.astype(np.int64) * employee_count + self.employee_code)
+                * pattern_count + self.pattern_code)
+        keys, counts, amounts, records = self._group(cell)
+        days, rest = np.divmod(keys, employee_count * pattern_count)
+        employee_codes, pattern_codes = np.divmod(rest, pattern_count)
+        details = self._level({
+            'record_date': days.astype('datetime64[D]').astype(str).tolist(),
+            'employee_name': [self.employees[code] for code in employee_codes.tolist()],
+            'pattern_name': [self.patterns[code] for code in pattern_codes.tolist()]
+        }, counts, amounts, records)
+
+        keys, counts, amounts, records = self._group(self.employee_code)
+        by_employee = self._level({'employee_name': [self.employees[code] for code in keys.tolist()]},
+                                  counts, amounts, records)
+
+        keys, counts, amounts, records = self._group(self.pattern_code)
+        by_pattern = self._level({'pattern_name': [self.patterns[code] for code in keys.tolist()]},
+                                 counts, amounts, records)
+
+        keys, counts, amounts, records = self._group(self.day)
+        by_day = self._level({'record_date': keys.astype('datetime64[D]').astype(str).tolist()},
+                             counts, amounts, records)
+
+        totals = self.totals()
+
+        return {
+            'details': details,
+            'employees': by_employee,
+            'patterns': by_pattern,
+            'days': by_day,
+            'grand_total': {
+                'total_count': totals['count'],
+                'total_amount': totals['amount'],
+                'record_count': totals['records']
+            }
+        }
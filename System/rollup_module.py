@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日汇总表 daily_totals
+
+按 (记录日期, 员工, 花型) 预先汇总工资记录，由 records 表上的触发器增量维护，
+所有写入路径（单条增删改、批量导入、桌面端和API端）都会自动同步。
+日报、月报直接读取该表，开销与员工数×花型数×天数相关，而与记录条数无关。
+
+用法：
+    python rollup_module.py [数据库路径]    # 从 records 全量重建 daily_totals
+"""
+
+import sqlite3
+import sys
+
+
+DAILY_TOTALS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS daily_totals (
+        record_date DATE NOT NULL,
+        employee_id INTEGER NOT NULL,
+        pattern_id INTEGER NOT NULL,
+        total_count INTEGER NOT NULL DEFAULT 0,
+        total_amount REAL NOT NULL DEFAULT 0,
+        record_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (record_date, employee_id, pattern_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_records_insert_daily_totals
+    AFTER INSERT ON records
+    BEGIN
+        INSERT INTO daily_totals (record_date, employee_id, pattern_id,
+                                  total_count, total_amount, record_count)
+        VALUES (NEW.record_date, NEW.employee_id, NEW.pattern_id, NEW.count, NEW.total, 1)
+        ON CONFLICT (record_date, employee_id, pattern_id) DO UPDATE SET
+            total_count = total_count + excluded.total_count,
+            total_amount = total_amount + excluded.total_amount,
+            record_count = record_count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_records_delete_daily_totals
+    AFTER DELETE ON records
+    BEGIN
+        UPDATE daily_totals
+        SET total_count = total_count - OLD.count,
+            total_amount = total_amount - OLD.total,
+            record_count = record_count - 1
+        WHERE record_date = OLD.record_date
+          AND employee_id = OLD.employee_id
+          AND pattern_id = OLD.pattern_id;
+
+        DELETE FROM daily_totals
+        WHERE record_date = OLD.record_date
+          AND employee_id = OLD.employee_id
+          AND pattern_id = OLD.pattern_id
+          AND record_count <= 0;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_records_update_daily_totals
+    AFTER UPDATE OF record_date, employee_id, pattern_id, count, total ON records
+    BEGIN
+        UPDATE daily_totals
+        SET total_count = total_count - OLD.count,
+            total_amount = total_amount - OLD.total,
+            record_count = record_count - 1
+        WHERE record_date = OLD.record_date
+          AND employee_id = OLD.employee_id
+          AND pattern_id = OLD.pattern_id;
+
+        DELETE FROM daily_totals
+        WHERE record_date = OLD.record_date
+          AND employee_id = OLD.employee_id
+          AND pattern_id = OLD.pattern_id
+          AND record_count <= 0;
+
+        INSERT INTO daily_totals (record_date, employee_id, pattern_id,
+                                  total_count, total_amount, record_count)
+        VALUES (NEW.record_date, NEW.employee_id, NEW.pattern_id, NEW.count, NEW.total, 1)
+        ON CONFLICT (record_date, employee_id, pattern_id) DO UPDATE SET
+            total_count = total_count + excluded.total_count,
+            total_amount = total_amount + excluded.total_amount,
+            record_count = record_count + 1;
+    END
+    ''',
+]
+
+
+def create_daily_totals(cursor: sqlite3.Cursor):
+    """
+    创建日汇总表及维护触发器，并从 records 回填（迁移步骤）
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+    """
+    for sql in DAILY_TOTALS_SCHEMA:
+        cursor.execute(sql)
+
+    rebuild_daily_totals(cursor)
+
+
+def rebuild_daily_totals(cursor: sqlite3.Cursor, records: str = 'records') -> int:
+    """
+    从 records 全量重建日汇总表，同时消除浮点增减累积的误差
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+        records: 代替 records 表的数据源，主库有已归档月份时须包含归档库
+
+    Returns:
+        重建后的汇总行数
+    """
+    cursor.execute("DELETE FROM daily_totals")
+    cursor.execute(f'''
+        INSERT INTO daily_totals (record_date, employee_id, pattern_id,
+                                  total_count, total_amount, record_count)
+        SELECT record_date, employee_id, pattern_id, SUM(count), SUM(total), COUNT(*)
+        FROM {records}
+        GROUP BY record_date, employee_id, pattern_id
+    ''')
+    return cursor.rowcount
+
+
+def main():
+    """命令行入口（经由 Database 执行，已归档的记录一并计入）"""
+    from database_module import Database
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'embroidery_system.db'
+
+    db = Database(db_path)
+    try:
+        result = db.rebuild_daily_totals()
+        if not result['success']:
+            raise RuntimeError(result['message'])
+        print(f"日汇总表重建完成，共 {result['data']['rows']} 行")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
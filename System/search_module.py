@@ -0,0 +1,117 @@
+"""
+全文搜索索引
+
+employees_fts、patterns_fts、records_fts 是外部内容（external content）FTS5 表，
+只保存索引，原文仍在 employees、patterns、records 中，由触发器保持同步。
+使用 trigram 分词器，中文无需分词，任意连续三个及以上字符都能命中索引；
+不足三个字符的关键词无法使用 trigram 索引，由调用方退回 LIKE 查询。
+"""
+
+import sqlite3
+from typing import List, Tuple
+
+
+# trigram 索引可匹配的最短关键词长度
+MIN_TRIGRAM_LENGTH = 3
+
+# (FTS表, 内容表, 索引列)
+SEARCH_TABLES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ('employees_fts', 'employees', ('name',)),
+    ('patterns_fts', 'patterns', ('name',)),
+    ('records_fts', 'records', ('note', 'special')),
+]
+
+
+def _search_schema(fts_table: str, table: str, columns: Tuple[str, ...]) -> List[str]:
+    """生成一张FTS表及其同步触发器的建表语句"""
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f"NEW.{column}" for column in columns)
+    old_values = ', '.join(f"OLD.{column}" for column in columns)
+
+    return [
+        f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            {column_list},
+            content='{table}',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_fts
+        AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {fts_table} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_fts
+        AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+            VALUES ('delete', OLD.id, {old_values});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_update_fts
+        AFTER UPDATE OF {column_list} ON {table}
+        BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+            VALUES ('delete', OLD.id, {old_values});
+            INSERT INTO {fts_table} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+        END
+        ''',
+    ]
+
+
+SEARCH_SCHEMA = [sql for args in SEARCH_TABLES for sql in _search_schema(*args)]
+
+
+def create_search_index(cursor: sqlite3.Cursor):
+    """
+    创建全文索引表及同步触发器，并从内容表重建索引（迁移步骤）
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+    """
+    for sql in SEARCH_SCHEMA:
+        cursor.execute(sql)
+
+    rebuild_search_index(cursor)
+
+
+def rebuild_search_index(cursor: sqlite3.Cursor):
+    """
+    从内容表全量重建全文索引
+
+    Args:
+        cursor: 数据库游标，调用方负责事务
+    """
+    for fts_table, _, _ in SEARCH_TABLES:
+        cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+
+def fts_phrase(keyword: str) -> str:
+    """
+    把关键词转换为FTS5短语查询，关键词中的运算符和引号按普通字符匹配
+
+    Args:
+        keyword: 搜索关键词
+
+    Returns:
+        MATCH 查询串
+    """
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def use_trigram(keyword: str) -> bool:
+    """
+    关键词能否使用 trigram 索引
+
+    Args:
+        keyword: 搜索关键词
+
+    Returns:
+        长度不小于 MIN_TRIGRAM_LENGTH 时为 True
+    """
+    return len(keyword) >= MIN_TRIGRAM_LENGTH
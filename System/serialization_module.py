@@ -0,0 +1,272 @@
+"""
+API响应序列化与压缩
+
+序列化：
+    安装了 orjson 时用 orjson，否则退回标准库 json（紧凑分隔符、不转义中文、不排序键）。
+    FastJSONProvider 接入 Flask 的 app.json，jsonify 和 request.get_json 都经由它。
+
+压缩：
+    JSON 响应超过 COMPRESS_MIN_SIZE 字节且客户端的 Accept-Encoding 接受时，
+    按 gzip、deflate 的优先顺序压缩；流式响应和已编码的响应不处理。
+    同一数据的压缩表示与未压缩表示 ETag 不同（追加 -gzip / -deflate 后缀），
+    etag_variants() 给出验证 If-None-Match 时应接受的全部形式。
+
+列式格式（可选）：
+    记录和报表默认按行返回对象数组，每行重复全部键名。指定 'columnar' 时改为
+    {'columns': [列名], 'rows': [[值]], 'dictionaries': {列名: [取值]}}，
+    员工名、花型名等重复度高的列字典编码，rows 中只存取值在字典中的下标。
+"""
+
+import datetime
+import decimal
+import gzip
+import json
+import uuid
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import Request, Response
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+SERIALIZER = 'orjson' if orjson is not None else 'json'
+
+# 小于该字节数的响应不压缩，压缩收益抵不上开销
+COMPRESS_MIN_SIZE = 1024
+
+# zlib 压缩级别（1最快，9最小）
+COMPRESS_LEVEL = 6
+
+# 按优先顺序排列的支持的编码
+ENCODINGS = ('gzip', 'deflate')
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson')
+
+# 响应格式：按行的对象数组，或列式
+RESPONSE_FORMATS = ('rows', 'columnar')
+
+# 列式格式中字典编码的列
+DICTIONARY_COLUMNS = ('employee_name', 'pattern_name')
+
+
+def _default(obj: Any) -> Any:
+    """序列化 JSON 不直接支持的类型"""
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj: Any) -> bytes:
+        """序列化为 UTF-8 编码的 JSON"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data) -> Any:
+        """解析 JSON 文本或字节"""
+        return orjson.loads(data)
+else:
+    _ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_default)
+
+    def dumps(obj: Any) -> bytes:
+        """序列化为 UTF-8 编码的 JSON"""
+        return _ENCODER.encode(obj).encode('utf-8')
+
+    def loads(data) -> Any:
+        """解析 JSON 文本或字节"""
+        return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """使用 dumps/loads 的 Flask JSON 提供者"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # 直接使用字节结果，省去一次解码再编码
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """
+    按 Accept-Encoding 选择压缩编码
+
+    Args:
+        request: 当前请求
+
+    Returns:
+        'gzip'、'deflate'，都不接受时为 None
+    """
+    for encoding in ENCODINGS:
+        if request.accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    压缩响应体
+
+    Args:
+        data: 原始字节
+        encoding: 'gzip' 或 'deflate'（zlib 格式）
+
+    Returns:
+        压缩后的字节
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, COMPRESS_LEVEL, mtime=0)
+    return zlib.compress(data, COMPRESS_LEVEL)
+
+
+def compress_response(response: Response, request: Request) -> Response:
+    """
+    按协商结果压缩 JSON 响应（Flask after_request 钩子）
+
+    Args:
+        response: 响应
+        request: 当前请求
+
+    Returns:
+        压缩后或原样的响应
+    """
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    encoding = negotiate_encoding(request)
+    data = response.get_data()
+    if encoding is None or len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+
+    return response
+
+
+def etag_variants(etag: str) -> List[str]:
+    """
+    同一数据各编码表示的 ETag
+
+    Args:
+        etag: 未压缩表示的 ETag（不含引号）
+
+    Returns:
+        [未压缩, gzip, deflate] 三种形式
+    """
+    return [etag] + [f"{etag}-{encoding}" for encoding in ENCODINGS]
+
+
+def to_columnar(rows: List[Dict], dictionary: Iterable[str] = DICTIONARY_COLUMNS) -> Dict:
+    """
+    把对象数组转换为列式格式
+
+    Args:
+        rows: 键相同的字典列表
+        dictionary: 需要字典编码的列，不存在的列忽略
+
+    Returns:
+        {'columns': [列名], 'rows': [[值]], 'dictionaries': {列名: [取值]}}，
+        字典编码列的值为取值在 dictionaries[列名] 中的下标，空值保持为 None
+    """
+    if not rows:
+        return {'columns': [], 'rows': [], 'dictionaries': {}}
+
+    columns = list(rows[0].keys())
+    encoded = {column: {} for column in dictionary if column in rows[0]}
+
+    def encode(column, value):
+        codes = encoded.get(column)
+        if codes is None or value is None:
+            return value
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    return {
+        'columns': columns,
+        'rows': [[encode(column, row[column]) for column in columns] for row in rows],
+        # dict 保持插入顺序，键的顺序即下标
+        'dictionaries': {column: list(codes) for column, codes in encoded.items()}
+    }
+
+
+def validate_format(response_format: str):
+    """
+    检查响应格式
+
+    Raises:
+        ValueError: 未知的响应格式
+    """
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f"未知的响应格式: {response_format}，可选: {', '.join(RESPONSE_FORMATS)}")
+
+
+def format_rows(rows: List[Dict], response_format: str = 'rows'):
+    """
+    按响应格式返回对象数组
+
+    Args:
+        rows: 字典列表
+        response_format: 'rows' 原样返回，'columnar' 转换为列式
+
+    Returns:
+        对象数组或列式结果
+
+    Raises:
+        ValueError: 未知的响应格式
+    """
+    validate_format(response_format)
+    if response_format == 'columnar':
+        return to_columnar(rows)
+    return rows
+
+
+def format_report(report: Dict, response_format: str = 'rows') -> Dict:
+    """
+    按响应格式返回报表，报表中的对象数组各自转换，其余值原样保留
+
+    Args:
+        report: 报表字典，如 get_rollup_report 的结果
+        response_format: 'rows' 或 'columnar'
+
+    Returns:
+        报表字典
+
+    Raises:
+        ValueError: 未知的响应格式
+    """
+    validate_format(response_format)
+    if response_format == 'rows':
+        return report
+
+    return {key: to_columnar(value) if isinstance(value, list) else value
+            for key, value in report.items()}
@@ -0,0 +1,65 @@
+"""测试公共夹具：临时目录中的数据库及测试数据"""
+
+import os
+import sys
+
+import pytest
+
+# 各模块按文件名互相导入，测试从 System 目录加载
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_module import APIServer  # noqa: E402
+from database_module import Database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """临时数据库，测试结束后停止写线程并关闭连接池"""
+    database = Database(str(tmp_path / 'test.db'))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def seeded(db):
+    """
+    两名员工、两个花型及 2023 年 1~3 月的 60 条工资记录
+
+    Returns:
+        (db, 员工ID列表, 花型ID列表)
+    """
+    employees = [db.add_employee(name)['data']['id'] for name in ('张三', '李四')]
+    patterns = [db.add_pattern(name, price)['data']['id']
+                for name, price in (('玫瑰', 0.5), ('牡丹', 1.25))]
+
+    for i in range(60):
+        result = db.add_record(employees[i % 2], patterns[i % 3 % 2],
+                               f'2023-{i % 3 + 1:02d}-{i % 28 + 1:02d}', 100 + i)
+        assert result['success'], result['message']
+
+    return db, employees, patterns
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """临时目录中的 API 服务（默认数据库路径相对当前目录）及测试客户端"""
+    monkeypatch.chdir(tmp_path)
+
+    server = APIServer()
+    yield server, server.app.test_client()
+    server.jobs.shutdown()
+    server.db.close()
+
+
+@pytest.fixture
+def seeded_api(api):
+    """写入员工、花型及 2023 年 1~2 月工资记录的 API 服务"""
+    server, client = api
+    employee = server.db.add_employee('张三')['data']['id']
+    pattern = server.db.add_pattern('玫瑰', 0.5)['data']['id']
+    server.db.add_records_bulk([
+        {'employee_id': employee, 'pattern_id': pattern,
+         'record_date': f'2023-{month:02d}-{day:02d}', 'count': 100 + day}
+        for month in (1, 2) for day in range(1, 21)
+    ])
+    return server, client, employee, pattern
@@ -0,0 +1,113 @@
+"""工资记录按月归档：移入归档库、跨库读取、恢复及批量修改的保护"""
+
+import os
+
+import pytest
+
+from archive_module import archive_path
+from tests.test_daily_totals import assert_daily_totals_match
+
+
+def test_archive_and_restore_month(seeded):
+    db, employees, patterns = seeded
+    records = db.get_records()
+    before = assert_daily_totals_match(db)
+
+    result = db.archive_month('2023-01')
+    assert result['success'], result['message']
+    assert result['data']['archived'] == 20
+    assert os.path.exists(archive_path(db.db_path, 2023))
+    # 归档只移动记录，日汇总不变
+    assert assert_daily_totals_match(db) == before
+
+    archived = db.get_archived_months()
+    assert [(m['month'], m['record_count']) for m in archived] == [('2023-01', 20)]
+    assert archived[0]['total_count'] == sum(r['count'] for r in records
+                                             if r['record_date'].startswith('2023-01'))
+
+    # 明细查询跨越归档月份时读取归档库
+    assert db.get_records() == records
+    assert db.get_monthly_summary(2023, 1)['grand_total']['count'] == archived[0]['total_count']
+
+    # 归档之后对其余月份的写入照常维护日汇总
+    db.add_record(employees[0], patterns[0], '2023-02-02', 5)
+    assert_daily_totals_match(db)
+
+    result = db.restore_month('2023-01')
+    assert result['success'], result['message']
+    assert result['data']['restored'] == 20
+    assert db.get_archived_months() == []
+    assert_daily_totals_match(db)
+
+
+def test_rebuild_includes_archived_records(seeded):
+    db, _, _ = seeded
+    db.archive_month('2023-02')
+    before = assert_daily_totals_match(db)
+
+    assert db.rebuild_daily_totals()['success']
+    assert assert_daily_totals_match(db) == before
+
+
+def test_archive_records_before_month(seeded):
+    db, _, _ = seeded
+
+    result = db.archive_records('2023-03')
+    assert result['success'], result['message']
+    assert [m['month'] for m in result['data']['months']] == ['2023-01', '2023-02']
+    assert len(db.get_records()) == 60
+
+
+@pytest.mark.parametrize('call, message', [
+    (lambda db: db.archive_month('2999-01'), '只能归档已结束的月份'),
+    (lambda db: db.archive_month('2023-13'), '月份格式错误'),
+    (lambda db: db.restore_month('2023-01'), '该月份未归档'),
+])
+def test_invalid_archive_requests(db, call, message):
+    result = call(db)
+    assert not result['success']
+    assert message in result['message']
+
+
+def test_bulk_writes_reject_archived_months(seeded):
+    db, employees, patterns = seeded
+    db.archive_month('2023-01')
+    records = db.get_records()
+
+    # 日期范围涉及已归档月份时整体拒绝，不只修改主库中的部分
+    for result in (
+        db.update_records_by_filter({'start_date': '2023-01-15', 'end_date': '2023-02-15'},
+                                    {'employee_id': employees[1]}),
+        db.update_records_by_filter({'employee_id': employees[0]}, {'pattern_id': patterns[1]}),
+        db.delete_records_by_filter({'end_date': '2023-01-31'}),
+        db.reprice_pattern_records(patterns[0]),
+        db.reprice_pattern_records(patterns[0], price=0.6, effective_from='2023-01-01'),
+    ):
+        assert not result['success']
+        assert result['message'] == '2023-01 已归档，请先恢复'
+
+    # 把记录改到已归档月份同样拒绝
+    result = db.update_records_by_filter({'start_date': '2023-02-01', 'end_date': '2023-02-28'},
+                                         {'record_date': '2023-01-31'})
+    assert result['message'] == '2023-01 已归档，请先恢复'
+
+    assert db.get_records() == records
+    assert [p['price'] for p in db.get_pattern_prices(patterns[0])] == [0.5]
+
+    # 不涉及归档月份的范围照常执行
+    result = db.delete_records_by_filter({'start_date': '2023-03-01'})
+    assert result['success'] and result['data']['affected'] == 20
+
+    db.restore_month('2023-01')
+    assert db.reprice_pattern_records(patterns[0])['success']
+    assert_daily_totals_match(db)
+
+
+def test_bulk_api_reports_archived_months(seeded_api):
+    server, client, _, _ = seeded_api
+    server.db.archive_month('2023-01')
+
+    body = client.delete('/api/records/bulk', json={'filter': {'start_date': '2023-01-01'}}).get_json()
+    assert not body['success']
+    assert '已归档，请先恢复' in body['message']
+    assert len(server.db.get_records()) == 40
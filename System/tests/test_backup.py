@@ -0,0 +1,84 @@
+"""在线备份与恢复"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from archive_module import attach_archives
+from tests.test_daily_totals import assert_daily_totals_match
+
+
+def test_backup_and_restore_with_archives(seeded):
+    db, employees, patterns = seeded
+    assert db.archive_month('2023-01')['success']
+    backup = db.create_backup()
+    assert backup['success'], backup['message']
+    name = backup['data']['name']
+    assert db.verify_backup(name)['success']
+
+    # 备份之后：删除记录、归档新的月份
+    db.delete_records_by_filter({'start_date': '2023-03-01', 'end_date': '2023-03-31'})
+    assert db.archive_month('2023-02')['success']
+
+    result = db.restore_backup(name)
+    assert result['success'], result['message']
+    assert result['data']['pre_restore_backup']
+
+    assert len(db.get_records()) == 60
+    assert [item['month'] for item in db.get_archived_months()] == ['2023-01']
+    assert_daily_totals_match(db)
+    # 暂存文件不会留在归档目录
+    archive_dir = os.path.join(os.path.dirname(db.db_path), 'archive')
+    assert all(filename.endswith('.db') for filename in os.listdir(archive_dir))
+
+
+def test_restore_waits_for_attached_readers(seeded):
+    db, _, _ = seeded
+    assert db.archive_month('2023-01')['success']
+    name = db.create_backup()['data']['name']
+
+    attached, released = threading.Event(), []
+
+    def reader():
+        conn = db.get_connection()
+        try:
+            with attach_archives(conn, db.db_path, [2023]):
+                attached.set()
+                time.sleep(0.3)
+                released.append(time.monotonic())
+        finally:
+            conn.close()
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    assert attached.wait(5)
+
+    result = db.restore_backup(name)
+    finished = time.monotonic()
+    thread.join()
+
+    assert result['success'], result['message']
+    assert released and finished >= released[0]
+    assert len(db.get_records()) == 60
+
+
+def test_pool_pause_times_out_while_connection_held(db):
+    conn = db.get_connection()
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            with db.pool.paused(timeout=0.1):
+                pass
+    finally:
+        conn.close()
+
+    # 超时后连接池照常借出
+    with db.pool.paused(timeout=1):
+        assert db.pool.stats()['idle'] == 0
+    db.get_connection().close()
+
+
+def test_restore_unknown_backup(db):
+    assert not db.restore_backup('missing')['success']
@@ -0,0 +1,39 @@
+"""单事务批量添加工资记录"""
+
+from tests.test_daily_totals import assert_daily_totals_match
+
+
+def test_valid_rows_inserted_invalid_rows_reported(seeded):
+    db, employees, patterns = seeded
+    result = db.add_records_bulk([
+        {'employee_id': employees[0], 'pattern_id': patterns[1],
+         'record_date': '2023-04-01', 'count': 10, 'note': '夜班'},
+        {'employee_id': employees[0], 'pattern_id': patterns[1], 'count': 1},
+        {'employee_id': 9999, 'pattern_id': patterns[1], 'record_date': '2023-04-01', 'count': 1},
+        {'employee_id': employees[0], 'pattern_id': 9999, 'record_date': '2023-04-01', 'count': 1},
+        {'employee_id': employees[0], 'pattern_id': patterns[1],
+         'record_date': '2023-04-01', 'count': 0},
+        {'employee_id': employees[0], 'pattern_id': patterns[1],
+         'record_date': '2023-13-01', 'count': 1},
+        {'employee_id': employees[1], 'pattern_id': patterns[0],
+         'record_date': '2023-04-02', 'count': '20'},
+    ])
+
+    assert result['success']
+    assert result['data']['inserted'] == 2
+    assert [error['index'] for error in result['data']['errors']] == [1, 2, 3, 4, 5]
+    assert result['data']['errors'][0]['message'] == '缺少字段 record_date'
+
+    records = db.get_records(start_date='2023-04-01', end_date='2023-04-30')
+    assert sorted((r['count'], r['total']) for r in records) == [(10, 12.5), (20, 10.0)]
+    assert_daily_totals_match(db)
+
+
+def test_bulk_endpoint(seeded_api):
+    server, client, employee, pattern = seeded_api
+    response = client.post('/api/records/bulk', json={'records': [
+        {'employee_id': employee, 'pattern_id': pattern, 'record_date': '2023-03-01', 'count': 5}
+    ]})
+    assert response.get_json()['data']['inserted'] == 1
+
+    assert client.post('/api/records/bulk', json={'records': []}).status_code == 400
@@ -0,0 +1,71 @@
+"""按筛选条件批量修改、删除工资记录"""
+
+from tests.test_daily_totals import assert_daily_totals_match
+
+
+def test_update_by_filter_reprices_and_keeps_totals(seeded):
+    db, employees, patterns = seeded
+    selected = db.get_records(employee_id=employees[0], start_date='2023-02-01',
+                              end_date='2023-02-28')
+
+    result = db.update_records_by_filter(
+        {'employee_id': employees[0], 'start_date': '2023-02-01', 'end_date': '2023-02-28'},
+        {'pattern_id': patterns[1]})
+    assert result['success'], result['message']
+    assert result['data']['affected'] == len(selected)
+
+    # 金额按新花型的单价重算
+    for record in db.get_records(employee_id=employees[0], start_date='2023-02-01',
+                                 end_date='2023-02-28'):
+        assert record['pattern_id'] == patterns[1]
+        assert record['total'] == record['count'] * 1.25
+    assert_daily_totals_match(db)
+
+
+def test_update_by_ids_moves_date(seeded):
+    db, employees, _ = seeded
+    ids = [record['id'] for record in db.get_records(employee_id=employees[1])[:3]]
+
+    result = db.update_records_by_filter({'ids': ids}, {'record_date': '2023-04-30'})
+    assert result['data']['affected'] == 3
+    assert sorted(r['id'] for r in db.get_records(start_date='2023-04-30',
+                                                  end_date='2023-04-30')) == sorted(ids)
+    assert_daily_totals_match(db)
+
+
+def test_delete_by_filter(seeded):
+    db, _, patterns = seeded
+    expected = len(db.get_records(pattern_id=patterns[1], start_date='2023-03-01',
+                                  end_date='2023-03-31'))
+
+    result = db.delete_records_by_filter({'pattern_id': patterns[1], 'start_date': '2023-03-01',
+                                          'end_date': '2023-03-31'})
+    assert result['data']['affected'] == expected
+    assert db.get_records(pattern_id=patterns[1], start_date='2023-03-01',
+                          end_date='2023-03-31') == []
+    assert_daily_totals_match(db)
+
+
+def test_invalid_requests_change_nothing(seeded):
+    db, employees, _ = seeded
+    assert not db.delete_records_by_filter({})['success']
+    assert not db.update_records_by_filter({'employee_id': employees[0]}, {})['success']
+    assert not db.update_records_by_filter({'employee_id': employees[0]},
+                                           {'employee_id': 9999})['success']
+    assert not db.update_records_by_filter({'start_date': '2023-02-30'},
+                                           {'record_date': '2023-04-01'})['success']
+    assert len(db.get_records()) == 60
+
+
+def test_bulk_endpoints(seeded_api):
+    _, client, employee, _ = seeded_api
+    response = client.put('/api/records/bulk', json={
+        'filter': {'start_date': '2023-01-01', 'end_date': '2023-01-05'},
+        'changes': {'record_date': '2023-03-01'}})
+    assert response.get_json()['data']['affected'] == 5
+
+    response = client.delete('/api/records/bulk', json={'filter': {'employee_id': employee}})
+    assert response.get_json()['data']['affected'] == 40
+
+    assert client.put('/api/records/bulk', json={'filter': {}}).status_code == 400
+    assert client.delete('/api/records/bulk', json={}).status_code == 400
@@ -0,0 +1,87 @@
+"""列式响应格式：列名、按列顺序的值数组及员工名、花型名的字典编码"""
+
+import pytest
+
+from serialization_module import format_report, format_rows, to_columnar
+
+
+def decode(table):
+    """把列式结果还原为对象数组"""
+    return [
+        {column: (table['dictionaries'][column][value]
+                  if column in table['dictionaries'] and value is not None else value)
+         for column, value in zip(table['columns'], row)}
+        for row in table['rows']
+    ]
+
+
+def test_to_columnar_shape():
+    rows = [
+        {'id': 1, 'employee_name': '张三', 'pattern_name': '玫瑰', 'count': 10},
+        {'id': 2, 'employee_name': '李四', 'pattern_name': '玫瑰', 'count': 20},
+        {'id': 3, 'employee_name': '张三', 'pattern_name': None, 'count': 30},
+    ]
+    table = to_columnar(rows)
+
+    assert table == {
+        'columns': ['id', 'employee_name', 'pattern_name', 'count'],
+        'rows': [[1, 0, 0, 10], [2, 1, 0, 20], [3, 0, None, 30]],
+        'dictionaries': {'employee_name': ['张三', '李四'], 'pattern_name': ['玫瑰']},
+    }
+    assert decode(table) == rows
+
+
+def test_to_columnar_edge_cases():
+    assert to_columnar([]) == {'columns': [], 'rows': [], 'dictionaries': {}}
+    # 不存在的字典列忽略，可指定其他列
+    assert to_columnar([{'a': 'x'}, {'a': 'x'}])['dictionaries'] == {}
+    assert to_columnar([{'a': 'x'}, {'a': 'x'}], dictionary=['a'])['rows'] == [[0], [0]]
+
+
+def test_format_rows_and_report():
+    rows = [{'employee_name': '张三', 'total_count': 5}]
+    assert format_rows(rows) is rows
+    assert format_rows(rows, 'columnar') == to_columnar(rows)
+
+    report = {'start_date': '2023-01-01', 'employees': rows, 'grand_total': {'total_count': 5}}
+    assert format_report(report) is report
+    columnar = format_report(report, 'columnar')
+    assert columnar['start_date'] == '2023-01-01'
+    assert columnar['grand_total'] == {'total_count': 5}
+    assert columnar['employees'] == to_columnar(rows)
+
+    with pytest.raises(ValueError, match='未知的响应格式'):
+        format_rows(rows, 'csv')
+    with pytest.raises(ValueError, match='未知的响应格式'):
+        format_report(report, 'csv')
+
+
+def test_records_api_columnar(seeded_api):
+    _, client, _, _ = seeded_api
+    rows = client.get('/api/records').get_json()['data']
+    table = client.get('/api/records?format=columnar').get_json()['data']
+
+    assert table['columns'] == list(rows[0])
+    assert len(table['rows']) == len(rows) == 40
+    assert table['dictionaries'] == {'employee_name': ['张三'], 'pattern_name': ['玫瑰']}
+    assert decode(table) == rows
+
+    # 分页响应同样按列返回
+    page = client.get('/api/records?format=columnar&limit=5').get_json()
+    assert decode(page['data']) == rows[:5]
+    assert page['next_cursor']
+
+    assert client.get('/api/records?format=csv').status_code == 400
+
+
+def test_rollup_api_columnar(seeded_api):
+    _, client, _, _ = seeded_api
+    query = {'start_date': '2023-01-01', 'end_date': '2023-01-31'}
+
+    rows = client.get('/api/reports/rollup', query_string=query).get_json()['data']
+    table = client.get('/api/reports/rollup',
+                       query_string={**query, 'format': 'columnar'}).get_json()['data']
+
+    for level in ('details', 'employees', 'patterns', 'days'):
+        assert decode(table[level]) == rows[level]
+    assert table['grand_total'] == rows['grand_total']
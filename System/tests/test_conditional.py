@@ -0,0 +1,62 @@
+"""条件GET：按数据版本号生成的 ETag 及 304 响应"""
+
+from datetime import datetime
+
+import api_module
+import database_module
+
+
+def test_etag_not_modified_until_write(seeded_api):
+    server, client, _, _ = seeded_api
+    first = client.get('/api/employees')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    cached = client.get('/api/employees', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    server.db.add_employee('李四')
+    changed = client.get('/api/employees', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_etag_scoped_to_months(seeded_api):
+    server, client, employee, pattern = seeded_api
+    url = '/api/records?start_date=2023-01-01&end_date=2023-01-31'
+    etag = client.get(url).headers['ETag']
+
+    # 其他月份的写入不影响一月的缓存
+    server.db.add_record(employee, pattern, '2023-02-25', 1)
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    server.db.add_record(employee, pattern, '2023-01-25', 1)
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_dashboard_etag_follows_today(seeded_api, monkeypatch):
+    """省略 date 时跨天后即使没有写入也返回新一天的统计"""
+    _, client, _, _ = seeded_api
+    clock = {'now': datetime(2023, 1, 5, 23, 59)}
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock['now']
+
+    monkeypatch.setattr(api_module, 'datetime', FakeDatetime)
+    monkeypatch.setattr(database_module, 'datetime', FakeDatetime)
+
+    first = client.get('/api/dashboard')
+    assert first.get_json()['data']['date'] == '2023-01-05'
+    etag = first.headers['ETag']
+    assert client.get('/api/dashboard', headers={'If-None-Match': etag}).status_code == 304
+
+    clock['now'] = datetime(2023, 1, 6, 0, 1)
+    second = client.get('/api/dashboard', headers={'If-None-Match': etag})
+    assert second.status_code == 200
+    assert second.get_json()['data']['date'] == '2023-01-06'
+    assert second.get_json()['data']['total_count'] == 106
+    assert second.headers['ETag'] != etag
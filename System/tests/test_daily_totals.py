@@ -0,0 +1,112 @@
+"""日汇总表触发器：任何写入之后 daily_totals 都与工资记录（含归档库）的聚合一致"""
+
+import sqlite3
+
+from database_module import Database
+
+
+def assert_daily_totals_match(db):
+    """daily_totals 与主库及归档库全部工资记录按 (日期, 员工, 花型) 的聚合逐行相同"""
+    conn = db.get_connection()
+    try:
+        with db._records_source(conn) as records:
+            expected = conn.execute(f'''
+                SELECT record_date, employee_id, pattern_id,
+                       SUM(count), ROUND(SUM(total), 6), COUNT(*)
+                FROM {records}
+                GROUP BY record_date, employee_id, pattern_id
+                ORDER BY record_date, employee_id, pattern_id
+            ''').fetchall()
+        actual = conn.execute('''
+            SELECT record_date, employee_id, pattern_id,
+                   total_count, ROUND(total_amount, 6), record_count
+            FROM daily_totals
+            ORDER BY record_date, employee_id, pattern_id
+        ''').fetchall()
+    finally:
+        conn.close()
+
+    assert [tuple(row) for row in actual] == [tuple(row) for row in expected]
+    return len(actual)
+
+
+def test_insert(seeded):
+    db, employees, patterns = seeded
+    assert assert_daily_totals_match(db) > 0
+
+    db.add_record(employees[0], patterns[1], '2023-02-10', 7)
+    db.add_record(employees[0], patterns[1], '2023-02-10', 8)
+    assert_daily_totals_match(db)
+
+
+def test_update_moves_between_groups(seeded):
+    db, employees, patterns = seeded
+    record = db.get_records(start_date='2023-01-01', end_date='2023-01-31')[0]
+
+    # 改员工、花型和日期，旧分组减少、新分组增加
+    result = db.update_record(record['id'], employees[1 - employees.index(record['employee_id'])],
+                              patterns[0], '2023-03-31', 1000)
+    assert result['success'], result['message']
+    assert_daily_totals_match(db)
+
+
+def test_delete_removes_empty_groups(seeded):
+    db, employees, patterns = seeded
+    record_id = db.add_record(employees[0], patterns[0], '2023-05-05', 1)['data']['id']
+    assert_daily_totals_match(db)
+
+    assert db.delete_record(record_id)['success']
+    assert_daily_totals_match(db)
+
+    conn = db.get_connection()
+    try:
+        left = conn.execute("SELECT COUNT(*) FROM daily_totals WHERE record_date = '2023-05-05'"
+                            ).fetchone()[0]
+    finally:
+        conn.close()
+    assert left == 0
+
+
+def test_summaries_read_daily_totals(seeded):
+    db, _, _ = seeded
+    records = db.get_records(start_date='2023-02-01', end_date='2023-02-28')
+
+    daily = db.get_daily_summary('2023-02-01', '2023-02-28')
+    assert sum(row['total_count'] for row in daily) == sum(r['count'] for r in records)
+
+    monthly = db.get_monthly_summary(2023, 2)
+    assert monthly['grand_total']['count'] == sum(r['count'] for r in records)
+    assert round(monthly['grand_total']['amount'], 6) == round(sum(r['total'] for r in records), 6)
+
+
+def test_rebuild_is_idempotent(seeded):
+    db, _, _ = seeded
+    before = assert_daily_totals_match(db)
+
+    assert db.rebuild_daily_totals()['success']
+    assert assert_daily_totals_match(db) == before
+
+
+def test_daily_totals_backfilled_on_upgrade(seeded):
+    db, _, _ = seeded
+    path = db.db_path
+    db.close()
+
+    # 退回到日汇总表出现之前的结构
+    conn = sqlite3.connect(path)
+    try:
+        triggers = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND sql LIKE '%daily_totals%'")]
+        for name in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.execute("DROP TABLE daily_totals")
+        conn.execute("UPDATE settings SET value = '3' WHERE key = 'schema_version'")
+        conn.commit()
+    finally:
+        conn.close()
+
+    upgraded = Database(path)
+    try:
+        assert assert_daily_totals_match(upgraded) > 0
+    finally:
+        upgraded.close()
@@ -0,0 +1,65 @@
+"""工作台统计：按日汇总表读取当日数据，结果按数据版本缓存"""
+
+from datetime import datetime
+
+import pytest
+
+
+def test_stats_for_date(seeded):
+    db, employees, patterns = seeded
+    records = db.get_records(start_date='2023-01-01', end_date='2023-01-01')
+
+    stats = db.get_dashboard_stats('2023-01-01')
+    assert stats['date'] == '2023-01-01'
+    assert stats['employee_count'] == 2
+    assert stats['active_employee_count'] == 2
+    assert stats['pattern_count'] == len(db.get_patterns())
+    assert stats['record_count'] == len(records) > 0
+    assert stats['total_count'] == sum(r['count'] for r in records)
+    assert stats['total_wage'] == pytest.approx(sum(r['total'] for r in records))
+
+    # 日期规范化，没有记录的日期为零
+    assert db.get_dashboard_stats('2023-1-1') == stats
+    empty = db.get_dashboard_stats('2023-06-30')
+    assert (empty['record_count'], empty['total_count'], empty['total_wage']) == (0, 0, 0)
+
+
+def test_defaults_to_today(seeded):
+    db, employees, patterns = seeded
+    today = datetime.now().strftime('%Y-%m-%d')
+    db.add_record(employees[0], patterns[1], today, 8)
+
+    stats = db.get_dashboard_stats()
+    assert stats['date'] == today
+    assert (stats['record_count'], stats['total_count']) == (1, 8)
+    assert stats['total_wage'] == pytest.approx(10.0)
+
+
+def test_cached_until_write(seeded):
+    db, employees, patterns = seeded
+
+    first = db.get_dashboard_stats('2023-01-01')
+    assert db.get_dashboard_stats('2023-01-01') is first
+
+    db.update_employee(employees[1], '李四', 'inactive')
+    second = db.get_dashboard_stats('2023-01-01')
+    assert second['active_employee_count'] == 1
+
+    db.add_record(employees[0], patterns[0], '2023-01-01', 10)
+    assert db.get_dashboard_stats('2023-01-01')['record_count'] == second['record_count'] + 1
+
+
+def test_invalid_date(db):
+    with pytest.raises(ValueError, match='日期格式错误'):
+        db.get_dashboard_stats('2023-13-01')
+
+
+def test_dashboard_api(seeded_api):
+    _, client, _, _ = seeded_api
+
+    data = client.get('/api/dashboard?date=2023-01-05').get_json()['data']
+    assert (data['record_count'], data['total_count']) == (1, 105)
+    assert data['total_wage'] == pytest.approx(52.5)
+
+    assert client.get('/api/dashboard').get_json()['data']['date'] == datetime.now().strftime('%Y-%m-%d')
+    assert client.get('/api/dashboard?date=bad').status_code == 400
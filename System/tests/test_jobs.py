@@ -0,0 +1,150 @@
+"""后台任务的取消、结果交付及任务接口"""
+
+import threading
+import time
+
+import pytest
+
+from job_module import JOB_CANCELLED, JOB_FAILED, JOB_SUCCEEDED, JobRunner
+
+
+def wait_finished(runner, job_id, timeout=5.0):
+    """等待任务结束并返回状态"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = runner.get_status(job_id)
+        if status['state'] in (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f'任务未在 {timeout} 秒内结束')
+
+
+@pytest.fixture
+def started():
+    """slow 任务开始运行的信号"""
+    return threading.Event()
+
+
+@pytest.fixture
+def runner(started):
+    """单工作线程的执行器：slow 一直运行到被取消，swallow 自行捕获取消异常"""
+    def slow(progress):
+        started.set()
+        while True:
+            progress(None, '处理中')
+            time.sleep(0.01)
+
+    def swallow(progress):
+        try:
+            slow(progress)
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+
+    def export(progress):
+        return {'success': True, 'message': '导出成功',
+                'data': {'file_content': 'UEsDBA==', 'filename': 'a.xlsx'}}
+
+    job_runner = JobRunner({'slow': slow, 'swallow': swallow, 'export': export}, workers=1)
+    yield job_runner
+    job_runner.shutdown(timeout=2)
+
+
+@pytest.mark.parametrize('kind', ['slow', 'swallow'])
+def test_cancel_running_job(runner, started, kind):
+    job = runner.submit(kind)
+    assert started.wait(5)
+
+    assert runner.cancel(job['id'])['message'] == '正在取消'
+    assert wait_finished(runner, job['id'])['state'] == JOB_CANCELLED
+
+
+def test_cancel_queued_job_never_runs(runner, started):
+    blocker = runner.submit('slow')
+    assert started.wait(5)
+
+    calls = []
+    runner.handlers['record'] = lambda progress: calls.append(1) or {'success': True}
+    queued = runner.submit('record')
+    assert runner.cancel(queued['id'])['state'] == JOB_CANCELLED
+
+    runner.cancel(blocker['id'])
+    wait_finished(runner, blocker['id'])
+    # 工作线程取到已取消的任务后直接跳过
+    runner._queue.join()
+    assert calls == []
+
+
+def test_cancel_finished_job_is_noop(runner):
+    job = runner.submit('export')
+    wait_finished(runner, job['id'])
+    assert runner.cancel(job['id'])['state'] == JOB_SUCCEEDED
+
+
+def test_file_delivered_once(runner):
+    job = runner.submit('export')
+    status = wait_finished(runner, job['id'])
+    assert 'file_content' not in status['result']['data']
+    assert 'result' not in runner.list_jobs()[0]
+
+    taken = runner.get_status(job['id'], take_file=True)
+    assert taken['result']['data']['file_content'] == 'UEsDBA=='
+
+    again = runner.get_status(job['id'], take_file=True)
+    assert 'file_content' not in again['result']['data']
+    assert again['result']['data']['file_released'] is True
+
+
+def test_submit_validation(runner):
+    with pytest.raises(ValueError):
+        runner.submit('missing')
+    with pytest.raises(ValueError):
+        runner.submit('export', ['not', 'a', 'dict'])
+
+
+@pytest.mark.parametrize('result', [None, 'ok', ['not', 'a', 'dict']])
+def test_non_dict_result_fails_job(runner, result):
+    runner.handlers['odd'] = lambda progress: result
+    job = runner.submit('odd')
+
+    status = wait_finished(runner, job['id'])
+    assert status['state'] == JOB_FAILED
+    assert '应为结果字典' in status['message']
+
+    # 工作线程仍在运行，后续任务照常执行
+    assert wait_finished(runner, runner.submit('export')['id'])['state'] == JOB_SUCCEEDED
+
+
+def wait_api_finished(client, job_id, timeout=10.0):
+    """轮询任务状态直到结束"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').get_json()['data']
+        if job['state'] in ('succeeded', 'failed', 'cancelled'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'任务未在 {timeout} 秒内结束')
+
+
+def test_export_file_downloaded_once(seeded_api):
+    _, client, _, _ = seeded_api
+    submitted = client.post('/api/jobs', json={'kind': 'export_monthly_summary',
+                                               'params': {'year': 2023, 'month': 1}})
+    assert submitted.status_code == 202
+    job_id = submitted.get_json()['data']['id']
+
+    job = wait_api_finished(client, job_id)
+    assert job['state'] == 'succeeded'
+    # 状态和列表都不带文件内容
+    assert 'file_content' not in job['result']['data']
+    assert all('result' not in item for item in client.get('/api/jobs').get_json()['data'])
+
+    download = client.get(f'/api/jobs/{job_id}/download')
+    assert download.status_code == 200
+    assert download.data[:2] == b'PK'
+    assert client.get(f'/api/jobs/{job_id}/download').status_code == 410
+
+
+def test_unknown_job(api):
+    _, client = api
+    assert client.post('/api/jobs', json={'kind': 'nope'}).status_code == 400
+    assert client.get('/api/jobs/missing').status_code == 404
@@ -0,0 +1,86 @@
+"""变更日志与增量获取"""
+
+import sqlite3
+
+from journal_module import JOURNAL_TABLES
+
+
+def test_changes_since_returns_rows(seeded):
+    db, employees, patterns = seeded
+    start = db.get_changes_since(None)
+    assert start['reset'] == list(JOURNAL_TABLES)
+
+    added = db.add_record(employees[0], patterns[0], '2023-03-03', 3)['data']['id']
+    record = db.get_records(start_date='2023-01-01', end_date='2023-01-31')[0]
+    db.delete_record(record['id'])
+
+    delta = db.get_changes_since(start['last_change_id'])
+    assert delta['reset'] == []
+    assert [(change['op'], change['id']) for change in delta['changes']] == [
+        ('insert', added), ('delete', record['id'])]
+    assert delta['changes'][0]['row']['count'] == 3
+
+    # 已处理到最新位置时没有增量
+    assert db.get_changes_since(delta['last_change_id'])['changes'] == []
+
+
+def test_changes_since_pages_with_has_more(seeded):
+    db, employees, patterns = seeded
+    start = db.get_changes_since(None)['last_change_id']
+    for day in range(1, 6):
+        db.add_record(employees[1], patterns[1], f'2023-03-{day:02d}', day)
+
+    first = db.get_changes_since(start, limit=3)
+    assert first['has_more'] and len(first['changes']) == 3
+    second = db.get_changes_since(first['last_change_id'], limit=3)
+    assert not second['has_more'] and len(second['changes']) == 2
+
+
+def test_archive_resets_records(seeded):
+    db, _, _ = seeded
+    start = db.get_changes_since(None)['last_change_id']
+    assert db.archive_month('2023-01')['success']
+
+    delta = db.get_changes_since(start)
+    # 归档的逐行删除不作为删除下发，客户端整表重新加载
+    assert delta['reset'] == ['records']
+    assert delta['changes'] == []
+
+
+def test_restore_backup_resets_all_tables(seeded):
+    db, employees, patterns = seeded
+    backup = db.create_backup()['data']['name']
+    db.add_record(employees[0], patterns[0], '2023-03-09', 9)
+
+    before = db.get_changes_since(None)['last_change_id']
+    versions = db.get_data_versions(['records', 'employees', 'patterns'])
+
+    result = db.restore_backup(backup)
+    assert result['success'], result['message']
+
+    # 变更ID和数据版本号不回退
+    delta = db.get_changes_since(before)
+    assert sorted(delta['reset']) == sorted(JOURNAL_TABLES)
+    assert delta['last_change_id'] > before
+    assert all(new > old for new, old in
+               zip(db.get_data_versions(['records', 'employees', 'patterns']), versions))
+    assert len(db.get_records()) == 60
+
+
+def test_prune_change_log_forces_reset(seeded):
+    db, employees, patterns = seeded
+    conn = sqlite3.connect(db.db_path)
+    try:
+        conn.execute("UPDATE change_log SET changed_at = datetime('now', '-2 days')")
+        conn.commit()
+    finally:
+        conn.close()
+    db.add_record(employees[0], patterns[0], '2023-03-09', 9)
+
+    result = db.prune_change_log(days=1)
+    assert result['success'] and result['data']['deleted'] > 0
+
+    # 已被清理的位置无法增量同步，之后的位置照常返回增量
+    assert sorted(db.get_changes_since(0)['reset']) == sorted(JOURNAL_TABLES)
+    latest = db.get_changes_since(None)['last_change_id']
+    assert db.get_changes_since(latest - 1)['changes'][0]['op'] == 'insert'
@@ -0,0 +1,70 @@
+"""数据库结构迁移"""
+
+import sqlite3
+
+import pytest
+
+import migration_module
+from migration_module import MIGRATIONS, get_schema_version, run_migrations
+
+
+def test_new_database_is_current(db):
+    conn = db.get_connection()
+    try:
+        assert get_schema_version(conn.cursor()) == MIGRATIONS[-1][0]
+    finally:
+        conn.close()
+
+
+def test_migrations_are_idempotent(db):
+    conn = sqlite3.connect(db.db_path)
+    try:
+        assert run_migrations(conn) == MIGRATIONS[-1][0]
+        conn.execute("UPDATE settings SET value = '0' WHERE key = 'schema_version'")
+        conn.commit()
+        # 每一步都可以重复执行
+        assert run_migrations(conn) == MIGRATIONS[-1][0]
+    finally:
+        conn.close()
+
+
+def test_covering_indexes(db):
+    conn = db.get_connection()
+    try:
+        indexes = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'records'")}
+        assert {'idx_records_date_employee_pattern', 'idx_records_employee_date',
+                'idx_records_pattern_date', 'idx_records_date'} <= indexes
+
+        # 按日期范围汇总只读索引，不回表
+        plan = ' '.join(row[3] for row in conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT employee_id, pattern_id, SUM(count), SUM(total) FROM records
+            WHERE record_date BETWEEN '2023-01-01' AND '2023-01-31'
+            GROUP BY employee_id, pattern_id
+        '''))
+        assert 'COVERING INDEX idx_records_date_employee_pattern' in plan
+    finally:
+        conn.close()
+
+
+def test_failed_migration_rolls_back(db, monkeypatch):
+    latest = MIGRATIONS[-1][0]
+
+    def broken(cursor):
+        cursor.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.OperationalError("boom")
+
+    monkeypatch.setattr(migration_module, 'MIGRATIONS',
+                        MIGRATIONS + [(latest + 1, '测试失败迁移', [broken])])
+
+    conn = sqlite3.connect(db.db_path)
+    try:
+        with pytest.raises(RuntimeError, match='测试失败迁移'):
+            run_migrations(conn)
+        # 版本号和失败步骤之前的修改都没有保留
+        assert get_schema_version(conn.cursor()) == latest
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'"
+                            ).fetchone() is None
+    finally:
+        conn.close()
@@ -0,0 +1,99 @@
+"""工资记录键集分页"""
+
+import pytest
+
+from database_module import DEFAULT_PAGE_SIZE
+
+
+def walk(db, limit, cursor=None, **filters):
+    """从游标（为空时从第一页）开始逐页读取，返回全部记录及页数"""
+    records, pages = [], 0
+    while True:
+        page = db.get_records_page(cursor=cursor, limit=limit, **filters)
+        records.extend(page['records'])
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            return records, pages
+
+
+def sort_key(record):
+    """分页顺序的排序键（倒序使用）"""
+    return record['record_date'], record['id']
+
+
+def test_pages_cover_all_records_in_order(seeded):
+    db, _, _ = seeded
+    records, pages = walk(db, 7)
+
+    assert pages == 9
+    assert len(records) == 60
+    assert len({record['id'] for record in records}) == 60
+    assert records == sorted(records, key=sort_key, reverse=True)
+
+
+def test_exact_multiple_has_no_empty_last_page(seeded):
+    db, _, _ = seeded
+    records, pages = walk(db, 20)
+    assert (len(records), pages) == (60, 3)
+
+
+def test_filters_and_total(seeded):
+    db, employees, _ = seeded
+    page = db.get_records_page(employee_id=employees[0], start_date='2023-02-01',
+                               end_date='2023-03-31', limit=4, with_total=True)
+    expected = db.get_records(employee_id=employees[0], start_date='2023-02-01',
+                              end_date='2023-03-31')
+
+    assert page['total'] == len(expected)
+    records, _ = walk(db, 4, employee_id=employees[0], start_date='2023-02-01',
+                      end_date='2023-03-31')
+    assert sorted(record['id'] for record in records) == sorted(record['id'] for record in expected)
+
+
+def test_cursor_is_stable_under_inserts(seeded):
+    db, employees, patterns = seeded
+    first = db.get_records_page(limit=10)
+
+    # 游标之前（更新的日期）插入的记录不影响后续页
+    db.add_record(employees[0], patterns[0], '2023-12-31', 1)
+    rest, _ = walk(db, 10, first['next_cursor'])
+
+    seen = [record['id'] for record in first['records'] + rest]
+    assert len(seen) == len(set(seen)) == 60
+
+
+def test_pages_span_archived_months(seeded):
+    db, _, _ = seeded
+    assert db.archive_month('2023-01')['success']
+
+    records, _ = walk(db, 8)
+    assert len(records) == 60
+    assert records == sorted(records, key=sort_key, reverse=True)
+
+
+def test_page_size_is_clamped(seeded):
+    db, _, _ = seeded
+    assert len(db.get_records_page(limit=0)['records']) == min(60, DEFAULT_PAGE_SIZE)
+    assert len(db.get_records_page(limit=-5)['records']) == 1
+
+
+def test_invalid_cursor(seeded):
+    db, _, _ = seeded
+    with pytest.raises(ValueError):
+        db.get_records_page(cursor='not-a-cursor')
+
+
+def test_records_pagination(seeded_api):
+    _, client, _, _ = seeded_api
+    ids, cursor = [], None
+    while True:
+        url = '/api/records?limit=15' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        ids.extend(record['id'] for record in body['data'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(ids) == len(set(ids)) == 40
+    assert client.get('/api/records?cursor=bad').status_code == 400
@@ -0,0 +1,106 @@
+"""连接池：复用、上限、线程亲和及归还时回滚"""
+
+import sqlite3
+
+import pytest
+
+from pool_module import ConnectionPool, PooledConnection
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """两个连接的连接池"""
+    connection_pool = ConnectionPool(str(tmp_path / 'pool.db'), max_size=2, timeout=0.2)
+    conn = connection_pool.acquire()
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.commit()
+    conn.close()
+    yield connection_pool
+    connection_pool.close_all()
+
+
+def test_connections_are_reused(pool):
+    for _ in range(5):
+        conn = pool.acquire()
+        assert isinstance(conn, PooledConnection)
+        conn.execute("SELECT 1").fetchone()
+        conn.close()
+
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['reused'] == 5
+    assert stats['idle'] == 1
+
+
+def test_pool_is_bounded(pool):
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquire()
+
+    held[0].close()
+    pool.acquire().close()
+    held[1].close()
+    assert pool.stats()['size'] == 2
+
+
+def test_thread_gets_its_own_connection_back(pool):
+    first = pool.acquire()
+    last = pool.acquire()
+    mine = last._conn
+    # 归还顺序使另一个连接排在空闲列表末尾
+    last.close()
+    first.close()
+
+    again = pool.acquire()
+    assert again._conn is mine
+    again.close()
+
+
+def test_release_rolls_back_open_transaction(pool):
+    conn = pool.acquire()
+    conn.execute("INSERT INTO items (name) VALUES ('a')")
+    assert conn.in_transaction
+    conn.close()
+
+    conn = pool.acquire()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_returned_proxy_is_unusable(pool):
+    conn = pool.acquire()
+    conn.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    # 重复 close 无副作用
+    conn.close()
+    assert pool.stats()['idle'] == 1
+
+
+def test_unhealthy_connection_is_discarded(tmp_path):
+    connection_pool = ConnectionPool(str(tmp_path / 'pool.db'), health_check_interval=0)
+    conn = connection_pool.acquire()
+    raw = conn._conn
+    conn.close()
+    raw.close()
+
+    conn = connection_pool.acquire()
+    try:
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+    finally:
+        conn.close()
+    assert connection_pool.stats()['discarded'] == 1
+    connection_pool.close_all()
+
+
+def test_closed_pool_refuses(pool):
+    pool.close_all()
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquire()
+
+
+def test_invalid_size(tmp_path):
+    with pytest.raises(ValueError):
+        ConnectionPool(str(tmp_path / 'pool.db'), max_size=0)
@@ -0,0 +1,109 @@
+"""花型单价历史：按记录日期生效的单价计价"""
+
+from datetime import date, timedelta
+
+import pytest
+
+
+def month_start(day: date) -> str:
+    """日期所在月份的第一天"""
+    return day.replace(day=1).isoformat()
+
+
+def test_records_priced_as_of_backdated_price(seeded):
+    db, employees, patterns = seeded
+    assert db.set_pattern_price(patterns[0], 2.0, '2023-06-01')['success']
+
+    before = db.add_record(employees[0], patterns[0], '2023-05-31', 10)['data']
+    after = db.add_record(employees[0], patterns[0], '2023-06-01', 10)['data']
+    assert (before['total'], after['total']) == (5.0, 20.0)
+
+    db.add_records_bulk([
+        {'employee_id': employees[0], 'pattern_id': patterns[0],
+         'record_date': day, 'count': 10} for day in ('2023-05-30', '2023-06-02')
+    ])
+    records = db.get_records(start_date='2023-05-30', end_date='2023-06-02')
+    assert sorted(r['total'] for r in records) == [5.0, 5.0, 20.0, 20.0]
+
+    # 更新记录时按新的记录日期取单价
+    db.update_record(before['id'], employees[0], patterns[0], '2023-06-05', 10)
+    assert db.get_records(start_date='2023-06-05', end_date='2023-06-05')[0]['total'] == 20.0
+
+
+def test_price_history_order_and_current_price(seeded):
+    db, _, patterns = seeded
+    db.set_pattern_price(patterns[0], 0.7, '2023-02-01')
+    future = (date.today() + timedelta(days=30)).isoformat()
+    db.set_pattern_price(patterns[0], 0.9, future)
+
+    history = db.get_pattern_prices(patterns[0])
+    assert [p['price'] for p in history] == [0.9, 0.7, 0.5]
+    # 当前单价为今天生效的单价，以后生效的单价不影响
+    assert {p['id']: p['price'] for p in db.get_patterns()}[patterns[0]] == 0.7
+    assert db.sync_current_prices() == 0
+
+
+def test_update_pattern_price_takes_effect_today(db):
+    employee = db.add_employee('张三')['data']['id']
+    pattern = db.add_pattern('玫瑰', 1.0)['data']['id']
+    last_month = date.today().replace(day=1) - timedelta(days=20)
+    db.add_record(employee, pattern, last_month.isoformat(), 100)
+
+    assert db.update_pattern(pattern, '玫瑰', 2.0)['success']
+    # 今天之前的记录仍按原单价，重算没有变化并说明原因
+    preview = db.reprice_pattern_records(pattern, month_start(last_month), dry_run=True)
+    assert preview['data'] == {'affected': 0, 'delta': 0}
+    assert '生效日期' in preview['message']
+    assert db.get_pattern_prices(pattern)[0]['effective_from'] == date.today().isoformat()
+
+
+def test_update_pattern_with_effective_from(db):
+    employee = db.add_employee('张三')['data']['id']
+    pattern = db.add_pattern('玫瑰', 1.0)['data']['id']
+    last_month = date.today().replace(day=1) - timedelta(days=20)
+    db.add_record(employee, pattern, last_month.isoformat(), 100)
+
+    result = db.update_pattern(pattern, '红玫瑰', 2.0, effective_from=month_start(last_month))
+    assert result['success'], result['message']
+
+    preview = db.reprice_pattern_records(pattern, month_start(last_month), dry_run=True)
+    assert preview['data'] == {'affected': 1, 'delta': 100.0}
+    assert {p['id']: (p['name'], p['price']) for p in db.get_patterns()}[pattern] == ('红玫瑰', 2.0)
+    assert [p['effective_from'] for p in db.get_pattern_prices(pattern)][0] == \
+        month_start(last_month)
+
+
+def test_update_pattern_invalid(db):
+    pattern = db.add_pattern('玫瑰', 1.0)['data']['id']
+    assert not db.update_pattern(pattern, '玫瑰', 2.0, effective_from='2023-02-30')['success']
+    assert not db.update_pattern(9999, '玫瑰', 2.0, effective_from='2023-02-01')['success']
+    assert [p['price'] for p in db.get_pattern_prices(pattern)] == [1.0]
+
+
+def test_pattern_update_endpoint_accepts_effective_from(seeded_api):
+    server, client, _, pattern = seeded_api
+    response = client.put(f'/api/patterns/{pattern}', json={
+        'name': '玫瑰', 'price': 1.0, 'effective_from': '2023-02-01'})
+    assert response.get_json()['success']
+
+    preview = client.post(f'/api/patterns/{pattern}/reprice', json={'dry_run': True}).get_json()
+    assert preview['data']['affected'] == 20
+
+
+def test_price_must_be_positive(seeded_api):
+    _, client, _, pattern = seeded_api
+    response = client.post(f'/api/patterns/{pattern}/prices',
+                           json={'price': -1, 'effective_from': '2023-02-01'})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('effective_from', ['2023-02-30', 'yesterday'])
+def test_set_price_rejects_bad_dates(seeded, effective_from):
+    db, _, patterns = seeded
+    assert not db.set_pattern_price(patterns[0], 1.0, effective_from)['success']
+
+
+def test_set_price_normalizes_date(seeded):
+    db, _, patterns = seeded
+    assert db.set_pattern_price(patterns[0], 1.0, '2023-2-1')['success']
+    assert db.get_pattern_prices(patterns[0])[0]['effective_from'] == '2023-02-01'
@@ -0,0 +1,97 @@
+"""区间报表引擎：列式数组上的透视、按日/周/月分桶及合计"""
+
+import numpy as np
+import pytest
+
+from report_module import ROW_DTYPE, RangeReport
+
+
+def days(date: str) -> int:
+    """日期换算为自 1970-01-01 起的天数"""
+    return int(np.datetime64(date, 'D').astype(np.int64))
+
+
+@pytest.fixture
+def report():
+    rows = np.array([
+        (days('2023-01-01'), 2, 20, 10, 5.0, 1),     # 周日
+        (days('2023-01-02'), 1, 10, 20, 10.0, 2),    # 周一
+        (days('2023-01-08'), 1, 20, 30, 15.0, 1),    # 周日
+        (days('2023-02-01'), 2, 10, 40, 20.0, 3),
+    ], dtype=ROW_DTYPE)
+    return RangeReport(rows, {1: '张三', 2: '李四'}, {10: '玫瑰', 20: '牡丹'})
+
+
+def test_matrix(report):
+    matrix = report.matrix()
+    assert matrix['employees'] == sorted(['张三', '李四'])
+    assert matrix['patterns'] == sorted(['玫瑰', '牡丹'])
+
+    i = matrix['employees'].index('张三')
+    j = matrix['patterns'].index('牡丹')
+    assert matrix['counts'][i][j] == 30
+    assert matrix['counts'][i][1 - j] == 20
+    assert matrix['row_totals']['counts'][i] == 50
+    assert matrix['column_totals']['amounts'][j] == 20.0
+    assert matrix['grand_total'] == {'count': 100, 'amount': 50.0}
+
+
+def test_buckets(report):
+    assert [(b['period'], b['count'], b['records']) for b in report.buckets('month')] == [
+        ('2023-01', 60, 4), ('2023-02', 40, 3)]
+
+    # 周从周一开始，标签为当周周一
+    assert [(b['period'], b['count']) for b in report.buckets('week')] == [
+        ('2022-12-26', 10), ('2023-01-02', 50), ('2023-01-30', 40)]
+
+    by_day = report.buckets('day')
+    assert [b['start_date'] for b in by_day] == ['2023-01-01', '2023-01-02', '2023-01-08', '2023-02-01']
+    assert by_day[1]['amount'] == 10.0
+
+    with pytest.raises(ValueError, match='不支持的统计周期'):
+        report.buckets('year')
+
+
+def test_totals(report):
+    assert report.totals() == {'count': 100, 'amount': 50.0, 'records': 7}
+
+
+def test_empty_range():
+    empty = RangeReport(np.empty(0, dtype=ROW_DTYPE), {}, {})
+    assert empty.buckets('week') == []
+    assert empty.matrix()['grand_total'] == {'count': 0, 'amount': 0.0}
+
+
+def test_range_report_matches_monthly_summary(seeded):
+    db, _, _ = seeded
+
+    report = db.get_range_report('2023-02-01', '2023-02-28')
+    monthly = db.get_monthly_summary(2023, 2)
+    assert report['matrix'] == {key: value for key, value in monthly.items()
+                                if key not in ('year', 'month')}
+
+
+def test_range_report_sources_agree(seeded):
+    db, _, _ = seeded
+    records = db.get_records(start_date='2023-01-01', end_date='2023-03-31')
+
+    by_totals = db.get_range_report('2023-01-01', '2023-03-31', 'week')
+    by_records = db.get_range_report('2023-01-01', '2023-03-31', 'week', source='records')
+
+    assert by_totals['buckets'] == by_records['buckets']
+    assert by_totals['totals'] == by_records['totals']
+    assert by_totals['totals']['records'] == len(records)
+    assert by_totals['totals']['count'] == sum(r['count'] for r in records)
+    assert [b['period'] for b in db.get_range_report('2023-01-01', '2023-03-31')['buckets']] == [
+        '2023-01', '2023-02', '2023-03']
+
+
+@pytest.mark.parametrize('args, message', [
+    (('2023-03-01', '2023-01-01'), '开始日期不能晚于结束日期'),
+    (('2023-01-01', '2023-01-31', 'quarter'), '不支持的统计周期'),
+    (('2023-01-01', '2023-01-31', 'month', 'patterns'), '不支持的数据源'),
+    (('2023-01-01', 'bad'), '日期格式错误'),
+])
+def test_invalid_range_report(db, args, message):
+    with pytest.raises(ValueError, match=message):
+        db.get_range_report(*args)
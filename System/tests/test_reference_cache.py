@@ -0,0 +1,69 @@
+"""员工、花型参考数据缓存"""
+
+import sqlite3
+
+from reference_module import ReferenceCache
+
+
+def test_snapshot_contents(seeded):
+    db, employees, patterns = seeded
+    db.set_pattern_price(patterns[0], 0.8, '2023-03-01')
+    reference = db.get_reference_data()
+
+    assert set(reference.employees) == set(employees)
+    assert reference.employee_ids_by_name['张三'] == employees[0]
+    assert reference.pattern_ids_by_name['牡丹'] == patterns[1]
+    assert reference.price_as_of(patterns[0], '2023-02-28') == 0.5
+    assert reference.price_as_of(patterns[0], '2023-03-01') == 0.8
+    assert reference.price_as_of(9999, '2023-03-01') is None
+
+
+def test_reused_until_data_changes(seeded):
+    db, employees, _ = seeded
+    first = db.get_reference_data()
+    assert db.get_reference_data() is first
+    loads = db.reference_cache.stats()['loads']
+
+    db.update_employee(employees[0], '张三丰', 'active')
+    second = db.get_reference_data()
+    assert second is not first
+    assert second.employees[employees[0]]['name'] == '张三丰'
+    assert db.reference_cache.stats()['loads'] == loads + 1
+
+
+def test_write_from_another_process_detected(seeded):
+    db, _, patterns = seeded
+    first = db.get_reference_data()
+
+    # 不经过本进程的写入只能通过数据版本号发现
+    conn = sqlite3.connect(db.db_path)
+    try:
+        conn.execute("UPDATE patterns SET name = '红玫瑰' WHERE id = ?", (patterns[0],))
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert db.get_reference_data().patterns[patterns[0]]['name'] == '红玫瑰'
+    assert db.get_reference_data() is not first
+
+
+def test_invalidate_forces_reload(db):
+    cache = ReferenceCache()
+    conn = db.get_connection()
+    try:
+        first = cache.get(conn.cursor())
+        assert cache.get(conn.cursor()) is first
+        cache.invalidate()
+        assert cache.get(conn.cursor()) is not first
+    finally:
+        conn.close()
+    assert cache.stats()['loads'] == 2
+
+
+def test_records_validated_against_cache(seeded):
+    db, employees, patterns = seeded
+    assert db.add_record(employees[0], 9999, '2023-03-01', 1)['message'] == '花型不存在'
+
+    # 新增的花型立即可用于录入
+    pattern = db.add_pattern('菊花', 2.0)['data']['id']
+    assert db.add_record(employees[0], pattern, '2023-03-01', 1)['data']['total'] == 2.0
@@ -0,0 +1,74 @@
+"""数据版本号及按版本失效的报表缓存"""
+
+from cache_module import ReportCache, month_scopes
+
+
+def test_data_versions_follow_writes(seeded):
+    db, employees, patterns = seeded
+    before = db.get_data_versions(['2023-01', '2023-02', 'records', 'employees', 'patterns'])
+
+    db.add_record(employees[0], patterns[0], '2023-01-15', 10)
+    after = db.get_data_versions(['2023-01', '2023-02', 'records', 'employees', 'patterns'])
+
+    # 只递增写入月份及 records，其他范围不变
+    assert after[0] > before[0]
+    assert after[1] == before[1]
+    assert after[2] > before[2]
+    assert after[3:] == before[3:]
+
+    db.update_employee(employees[0], '张三丰', 'active')
+    assert db.get_data_versions(['employees'])[0] > after[3]
+
+
+def test_cache_hits_until_version_changes():
+    cache = ReportCache(max_entries=4)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute('report', (1, 1), compute) == 1
+    assert cache.get_or_compute('report', (1, 1), compute) == 1
+    assert cache.get_or_compute('report', (2, 1), compute) == 2
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 1)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ReportCache(max_entries=2)
+    cache.get_or_compute('a', (1,), lambda: 'a')
+    cache.get_or_compute('b', (1,), lambda: 'b')
+    cache.get_or_compute('a', (1,), lambda: 'stale')
+    cache.get_or_compute('c', (1,), lambda: 'c')
+
+    # b 最久未用，被淘汰；a 仍命中
+    assert cache.get_or_compute('a', (1,), lambda: 'recomputed') == 'a'
+    assert cache.get_or_compute('b', (1,), lambda: 'recomputed') == 'recomputed'
+    assert cache.stats()['evictions'] == 2
+
+
+def test_month_scopes():
+    assert month_scopes('2023-11-05', '2024-02-01') == ['2023-11', '2023-12', '2024-01', '2024-02']
+    assert month_scopes(None, '2024-02-01') == ['records']
+    assert month_scopes('2000-01-01', '2024-01-01') == ['records']
+
+
+def test_reports_invalidated_by_writes(seeded):
+    db, employees, patterns = seeded
+    first = db.get_monthly_summary(2023, 1)
+    assert db.get_monthly_summary(2023, 1) is first
+
+    # 其他月份的写入不影响一月的缓存
+    db.add_record(employees[0], patterns[0], '2023-02-15', 10)
+    assert db.get_monthly_summary(2023, 1) is first
+
+    db.add_record(employees[0], patterns[0], '2023-01-15', 10)
+    second = db.get_monthly_summary(2023, 1)
+    assert second is not first
+    assert second['grand_total']['count'] == first['grand_total']['count'] + 10
+
+    # 员工改名同样使报表失效
+    db.update_employee(employees[0], '张三丰', 'active')
+    assert '张三丰' in db.get_monthly_summary(2023, 1)['employees']
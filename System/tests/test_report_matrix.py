@@ -0,0 +1,89 @@
+"""月工资汇总矩阵：员工×花型稠密矩阵及行、列、总合计"""
+
+import base64
+import io
+
+import pytest
+from openpyxl import load_workbook
+
+from database_module import build_report_matrix
+from excel_handler import ExcelHandler
+
+
+def test_build_report_matrix():
+    rows = [
+        {'employee_name': '李四', 'pattern_name': '牡丹', 'total_count': 10, 'total_amount': 12.5},
+        {'employee_name': '张三', 'pattern_name': '玫瑰', 'total_count': 100, 'total_amount': 50.0},
+        {'employee_name': '李四', 'pattern_name': '玫瑰', 'total_count': None, 'total_amount': None},
+    ]
+    matrix = build_report_matrix(rows)
+
+    assert matrix['employees'] == sorted(['张三', '李四'])
+    assert matrix['patterns'] == sorted(['玫瑰', '牡丹'])
+
+    i = matrix['employees'].index('李四')
+    j = matrix['patterns'].index('牡丹')
+    assert matrix['counts'][i][j] == 10
+    assert matrix['amounts'][i][j] == 12.5
+    # 没有记录的单元格及空值均为零
+    assert matrix['counts'][1 - i][j] == 0
+    assert matrix['counts'][i][1 - j] == 0
+
+    assert matrix['row_totals']['counts'][i] == 10
+    assert matrix['column_totals']['counts'][1 - j] == 100
+    assert matrix['grand_total'] == {'count': 110, 'amount': 62.5}
+
+
+def test_empty_matrix():
+    assert build_report_matrix([]) == {
+        'employees': [], 'patterns': [], 'counts': [], 'amounts': [],
+        'row_totals': {'counts': [], 'amounts': []},
+        'column_totals': {'counts': [], 'amounts': []},
+        'grand_total': {'count': 0, 'amount': 0},
+    }
+
+
+def test_monthly_summary_shape(seeded):
+    db, _, _ = seeded
+    records = db.get_records(start_date='2023-01-01', end_date='2023-01-31')
+    matrix = db.get_monthly_summary(2023, 1)
+
+    assert (matrix['year'], matrix['month']) == (2023, 1)
+    assert matrix['employees'] == sorted({r['employee_name'] for r in records})
+    assert matrix['patterns'] == sorted({r['pattern_name'] for r in records})
+
+    rows, columns = len(matrix['employees']), len(matrix['patterns'])
+    for key in ('counts', 'amounts'):
+        assert len(matrix[key]) == rows
+        assert all(len(row) == columns for row in matrix[key])
+        assert len(matrix['row_totals'][key]) == rows
+        assert len(matrix['column_totals'][key]) == columns
+
+    # 每个单元格等于对应员工、花型的记录之和
+    for i, employee in enumerate(matrix['employees']):
+        for j, pattern in enumerate(matrix['patterns']):
+            cell = [r for r in records if (r['employee_name'], r['pattern_name']) == (employee, pattern)]
+            assert matrix['counts'][i][j] == sum(r['count'] for r in cell)
+            assert matrix['amounts'][i][j] == pytest.approx(sum(r['total'] for r in cell))
+
+    for key in ('counts', 'amounts'):
+        assert matrix['row_totals'][key] == pytest.approx([sum(row) for row in matrix[key]])
+        assert matrix['column_totals'][key] == pytest.approx([sum(col) for col in zip(*matrix[key])])
+    assert matrix['grand_total']['count'] == sum(r['count'] for r in records)
+    assert matrix['grand_total']['amount'] == pytest.approx(sum(r['total'] for r in records))
+
+
+def test_monthly_summary_export(seeded):
+    db, _, _ = seeded
+    matrix = db.get_monthly_summary(2023, 2)
+
+    result = ExcelHandler(db).export_monthly_summary(2023, 2)
+    assert result['success'], result['message']
+    sheet = load_workbook(io.BytesIO(base64.b64decode(result['data']['file_content']))).active
+    rows = list(sheet.iter_rows(values_only=True))
+
+    assert list(rows[0]) == ['员工姓名'] + matrix['patterns'] + ['合计']
+    assert [row[0] for row in rows[1:]] == matrix['employees'] + ['合计']
+    assert rows[-1][-1] == f"{matrix['grand_total']['amount']:.2f}"
+
+    assert not ExcelHandler(db).export_monthly_summary(2023, 6)['success']
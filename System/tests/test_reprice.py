@@ -0,0 +1,97 @@
+"""按记录日期生效的单价重算历史记录金额"""
+
+import pytest
+
+from tests.test_daily_totals import assert_daily_totals_match
+
+
+def pattern_total(db, pattern_id, start_date, end_date):
+    """花型在日期范围内的金额合计"""
+    return sum(record['total'] for record in
+               db.get_records(pattern_id=pattern_id, start_date=start_date, end_date=end_date))
+
+
+def test_dry_run_reports_delta_without_writing(seeded):
+    db, _, patterns = seeded
+    assert db.set_pattern_price(patterns[0], 0.8, '2023-03-01')['success']
+    march = db.get_records(pattern_id=patterns[0], start_date='2023-03-01', end_date='2023-03-31')
+    before = pattern_total(db, patterns[0], '2023-01-01', '2023-03-31')
+
+    preview = db.reprice_pattern_records(patterns[0], '2023-03-01', '2023-03-31', dry_run=True)
+    assert preview['success']
+    assert preview['data']['affected'] == len(march)
+    assert preview['data']['delta'] == pytest.approx(sum(r['count'] for r in march) * 0.3)
+    assert preview['message'].startswith(f"预计重算 {len(march)} 条记录")
+    assert pattern_total(db, patterns[0], '2023-01-01', '2023-03-31') == before
+
+
+def test_reprice_uses_price_on_each_record_date(seeded):
+    db, _, patterns = seeded
+    db.set_pattern_price(patterns[0], 0.8, '2023-03-01')
+    before = pattern_total(db, patterns[0], '2023-01-01', '2023-03-31')
+
+    result = db.reprice_pattern_records(patterns[0])
+    assert result['data']['affected'] > 0
+    assert pattern_total(db, patterns[0], '2023-01-01', '2023-03-31') == \
+        pytest.approx(before + result['data']['delta'])
+
+    # 一月仍按原单价，三月起按新单价
+    for record in db.get_records(pattern_id=patterns[0]):
+        price = 0.5 if record['record_date'] < '2023-03-01' else 0.8
+        assert record['total'] == pytest.approx(record['count'] * price)
+    assert_daily_totals_match(db)
+
+    # 再次重算没有变化
+    assert db.reprice_pattern_records(patterns[0])['data']['affected'] == 0
+
+
+def test_price_and_effective_from_in_one_call(seeded):
+    db, _, patterns = seeded
+    later = db.get_records(pattern_id=patterns[1], start_date='2023-02-15', end_date='2023-02-28')
+    earlier = db.get_records(pattern_id=patterns[1], start_date='2023-02-01',
+                             end_date='2023-02-14')
+    assert later and earlier
+
+    preview = db.reprice_pattern_records(patterns[1], end_date='2023-02-28', dry_run=True,
+                                         price=2.0, effective_from='2023-02-15')
+    assert preview['data']['affected'] == len(later)
+    # 预览连同单价一起回滚
+    assert [p['price'] for p in db.get_pattern_prices(patterns[1])] == [1.25]
+
+    result = db.reprice_pattern_records(patterns[1], end_date='2023-02-28', price=2.0,
+                                        effective_from='2023-02-15')
+    assert result['data'] == preview['data']
+    assert pattern_total(db, patterns[1], '2023-02-15', '2023-02-28') == \
+        pytest.approx(sum(r['count'] for r in later) * 2.0)
+    # 生效日期之前的记录不变
+    assert pattern_total(db, patterns[1], '2023-02-01', '2023-02-14') == \
+        pytest.approx(sum(r['total'] for r in earlier))
+    assert_daily_totals_match(db)
+
+
+def test_nothing_to_reprice_explains_why(seeded):
+    db, _, patterns = seeded
+    result = db.reprice_pattern_records(patterns[0], '2023-03-01', '2023-03-31', dry_run=True)
+    assert result['data'] == {'affected': 0, 'delta': 0}
+    assert '生效日期' in result['message']
+
+
+def test_invalid_requests(seeded):
+    db, _, patterns = seeded
+    assert not db.reprice_pattern_records(9999)['success']
+    assert not db.reprice_pattern_records(patterns[0], start_date='2023-02-30')['success']
+    assert not db.reprice_pattern_records(patterns[0], price=1.0)['success']
+
+
+def test_reprice_endpoint(seeded_api):
+    server, client, _, pattern = seeded_api
+    url = f'/api/patterns/{pattern}/reprice'
+
+    preview = client.post(url, json={'price': 1.0, 'effective_from': '2023-02-01',
+                                     'dry_run': True}).get_json()
+    assert preview['data']['affected'] == 20
+    assert preview['data']['delta'] == pytest.approx(sum(100 + day for day in range(1, 21)) * 0.5)
+
+    assert client.post(url, json={'price': 'abc', 'effective_from': '2023-02-01'}
+                       ).status_code == 400
+    assert client.post(url, json={}).get_json()['data']['affected'] == 0
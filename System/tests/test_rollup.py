@@ -0,0 +1,70 @@
+"""多级汇总：一次读取得到 日×员工×花型、员工、花型、日及总计"""
+
+from collections import defaultdict
+
+import pytest
+
+
+def group(records, *keys):
+    """按字段分组累加针数、金额和条数"""
+    totals = defaultdict(lambda: [0, 0.0, 0])
+    for record in records:
+        total = totals[tuple(record[key] for key in keys)]
+        total[0] += record['count']
+        total[1] += record['total']
+        total[2] += 1
+    return totals
+
+
+def check_level(level, records, *keys):
+    expected = group(records, *keys)
+    assert [tuple(row[key] for key in keys) for row in level] == sorted(expected)
+    for row in level:
+        count, amount, record_count = expected[tuple(row[key] for key in keys)]
+        assert (row['total_count'], row['record_count']) == (count, record_count)
+        assert row['total_amount'] == pytest.approx(amount)
+
+
+@pytest.mark.parametrize('source', ['daily_totals', 'records'])
+def test_rollup_levels(seeded, source):
+    db, _, _ = seeded
+    records = db.get_records(start_date='2023-01-10', end_date='2023-02-20')
+
+    rollup = db.get_rollup_report('2023-01-10', '2023-02-20', source=source)
+    assert (rollup['start_date'], rollup['end_date']) == ('2023-01-10', '2023-02-20')
+
+    check_level(rollup['details'], records, 'record_date', 'employee_name', 'pattern_name')
+    check_level(rollup['employees'], records, 'employee_name')
+    check_level(rollup['patterns'], records, 'pattern_name')
+    check_level(rollup['days'], records, 'record_date')
+
+    grand_total = rollup['grand_total']
+    assert grand_total['total_count'] == sum(r['count'] for r in records)
+    assert grand_total['record_count'] == len(records)
+    assert grand_total['total_amount'] == pytest.approx(sum(r['total'] for r in records))
+
+
+def test_rollup_follows_writes(seeded):
+    db, employees, patterns = seeded
+
+    before = db.get_rollup_report('2023-01-01', '2023-01-31')
+    db.add_record(employees[0], patterns[1], '2023-01-31', 4)
+    after = db.get_rollup_report('2023-01-01', '2023-01-31')
+
+    assert after['grand_total']['total_count'] == before['grand_total']['total_count'] + 4
+    assert after['days'][-1] == {'record_date': '2023-01-31', 'total_count': 4,
+                                 'total_amount': 5.0, 'record_count': 1}
+
+
+def test_rollup_api(seeded_api):
+    _, client, _, _ = seeded_api
+
+    data = client.get('/api/reports/rollup',
+                      query_string={'start_date': '2023-02-01', 'end_date': '2023-02-05'}).get_json()['data']
+    assert [day['record_date'] for day in data['days']] == [f'2023-02-0{d}' for d in range(1, 6)]
+    assert data['employees'] == [{'employee_name': '张三', 'total_count': 515,
+                                  'total_amount': 257.5, 'record_count': 5}]
+
+    response = client.get('/api/reports/rollup', query_string={'start_date': '2023-02-05',
+                                                               'end_date': '2023-02-01'})
+    assert response.status_code == 400
@@ -0,0 +1,102 @@
+"""全文搜索：trigram 索引、短关键词的 LIKE 回退及触发器同步"""
+
+import pytest
+
+from search_module import fts_phrase, use_trigram
+
+
+@pytest.fixture
+def noted(seeded):
+    """给部分工资记录写入备注和特殊标记"""
+    db, employees, patterns = seeded
+    ids = {}
+    for key, (special, note) in {
+        'rush': ('加急', '客户要求周五前交付红色玫瑰'),
+        'redo': ('返工', '线头过多需要重新绣制'),
+        'plain': ('', '蓝色底布'),
+    }.items():
+        result = db.add_record(employees[0], patterns[0], '2023-04-01', 10, special, note)
+        ids[key] = result['data']['id']
+    return db, ids
+
+
+def test_trigram_threshold():
+    assert not use_trigram('玫瑰')
+    assert use_trigram('红玫瑰')
+    assert fts_phrase('a"b OR c') == '"a""b OR c"'
+
+
+def test_long_keyword_uses_index(noted):
+    db, ids = noted
+
+    records = db.search('红色玫瑰', scopes=['records'])['records']
+    assert [r['id'] for r in records] == [ids['rush']]
+    # FTS 查询附带高亮片段
+    assert '[红色玫瑰]' in records[0]['snippet']
+
+    # 特殊标记同样建了索引（三个字符以上）
+    db.add_record(records[0]['employee_id'], records[0]['pattern_id'], '2023-04-02', 5, '加急件')
+    assert len(db.search('加急件', scopes=['records'])['records']) == 1
+
+
+def test_short_keyword_falls_back_to_like(noted):
+    db, ids = noted
+
+    # 两个字符无法使用 trigram 索引，退回 LIKE 仍能命中，且没有高亮片段
+    records = db.search('返工', scopes=['records'])['records']
+    assert [r['id'] for r in records] == [ids['redo']]
+    assert records[0]['snippet'] is None
+
+    result = db.search('张', scopes=['employees', 'patterns'])
+    assert [e['name'] for e in result['employees']] == ['张三']
+    assert result['patterns'] == []
+
+    # 员工、花型列表的名称搜索也按长度选择索引或 LIKE
+    assert [p['name'] for p in db.get_patterns('玫瑰')] == ['玫瑰']
+
+
+def test_operators_matched_literally(noted):
+    db, _ = noted
+    assert db.search('线头 OR 蓝色', scopes=['records'])['records'] == []
+    assert db.search('"线头', scopes=['records'])['records'] == []
+
+
+def test_index_follows_updates_and_deletes(noted):
+    db, ids = noted
+    record = db.search('蓝色底布', scopes=['records'])['records'][0]
+
+    db.update_record(ids['plain'], record['employee_id'], record['pattern_id'],
+                     record['record_date'], record['count'], '', '绿色底布')
+    assert db.search('蓝色底布', scopes=['records'])['records'] == []
+    assert [r['id'] for r in db.search('绿色底布', scopes=['records'])['records']] == [ids['plain']]
+
+    db.delete_record(ids['plain'])
+    assert db.search('绿色底布', scopes=['records'])['records'] == []
+
+    employee = db.add_employee('王小明')['data']['id']
+    db.update_employee(employee, '王大明', 'active')
+    assert db.search('王小明', scopes=['employees'])['employees'] == []
+    assert len(db.search('王大明', scopes=['employees'])['employees']) == 1
+
+
+def test_invalid_search(db):
+    with pytest.raises(ValueError, match='搜索关键词不能为空'):
+        db.search('  ')
+    with pytest.raises(ValueError, match='不支持的搜索范围'):
+        db.search('张三', scopes=['settings'])
+
+
+def test_search_api(seeded_api):
+    server, client, employee, pattern = seeded_api
+    server.db.add_record(employee, pattern, '2023-03-01', 1, '', '客户加急单')
+
+    data = client.get('/api/search', query_string={'q': '加急单'}).get_json()['data']
+    assert [r['note'] for r in data['records']] == ['客户加急单']
+    assert data['employees'] == [] and data['patterns'] == []
+
+    data = client.get('/api/search', query_string={'q': '张', 'scope': 'employees'}).get_json()['data']
+    assert list(data) == ['employees']
+    assert data['employees'][0]['id'] == employee
+
+    assert client.get('/api/search').status_code == 400
+    assert client.get('/api/search', query_string={'q': '张三', 'scope': 'x'}).status_code == 400
@@ -0,0 +1,87 @@
+"""API响应序列化与压缩"""
+
+import datetime
+import decimal
+import gzip
+import json
+import zlib
+
+import numpy as np
+import pytest
+
+from serialization_module import compress, dumps, etag_variants, loads
+
+
+def test_dumps_compact_utf8():
+    data = dumps({'name': '张三', 'values': [1, 2.5, None, True]})
+    assert data == '{"name":"张三","values":[1,2.5,null,true]}'.encode('utf-8')
+    assert loads(data) == {'name': '张三', 'values': [1, 2.5, None, True]}
+
+
+def test_dumps_extra_types():
+    value = {
+        'date': datetime.date(2023, 1, 5),
+        'time': datetime.datetime(2023, 1, 5, 8, 30),
+        'decimal': decimal.Decimal('1.25'),
+        'tags': ('加急',),
+    }
+    assert json.loads(dumps(value)) == {
+        'date': '2023-01-05', 'time': '2023-01-05T08:30:00', 'decimal': '1.25', 'tags': ['加急'],
+    }
+    # 区间报表的 NumPy 数组直接序列化
+    assert json.loads(dumps(np.arange(3))) == [0, 1, 2]
+
+    with pytest.raises(TypeError):
+        dumps({'value': object()})
+
+
+@pytest.mark.parametrize('encoding, decompress', [
+    ('gzip', gzip.decompress),
+    ('deflate', zlib.decompress),
+])
+def test_compress_roundtrip(encoding, decompress):
+    data = dumps([{'employee_name': '张三', 'count': i} for i in range(200)])
+    compressed = compress(data, encoding)
+    assert len(compressed) < len(data)
+    assert decompress(compressed) == data
+    # gzip 头中不写时间戳，同一数据压缩结果固定
+    assert compress(data, encoding) == compressed
+
+
+def test_etag_variants():
+    assert etag_variants('abc') == ['abc', 'abc-gzip', 'abc-deflate']
+
+
+@pytest.mark.parametrize('encoding, decompress', [
+    ('gzip', gzip.decompress),
+    ('deflate', zlib.decompress),
+])
+def test_compression(seeded_api, encoding, decompress):
+    _, client, _, _ = seeded_api
+    plain = client.get('/api/records')
+    compressed = client.get('/api/records', headers={'Accept-Encoding': encoding})
+
+    assert compressed.headers['Content-Encoding'] == encoding
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert len(compressed.data) < len(plain.data)
+    assert json.loads(decompress(compressed.data)) == plain.get_json()
+
+    # 压缩表示的 ETag 带编码后缀，凭它重新验证同样得到 304
+    etag = compressed.headers['ETag']
+    assert etag.strip('"').endswith(f'-{encoding}')
+    revalidated = client.get('/api/records', headers={'Accept-Encoding': encoding,
+                                                      'If-None-Match': etag})
+    assert revalidated.status_code == 304
+
+
+def test_small_response_not_compressed(api):
+    _, client = api
+    response = client.get('/api/employees', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_json_request_body_parsed(seeded_api):
+    _, client, employee, _ = seeded_api
+    body = client.put(f'/api/employees/{employee}', json={'name': '张三丰', 'status': 'active'}).get_json()
+    assert body['success'], body['message']
+    assert client.get('/api/employees').get_json()['data'][0]['name'] == '张三丰'
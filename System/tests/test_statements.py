@@ -0,0 +1,79 @@
+"""SQL 语句目录：排序键白名单与固定语句文本"""
+
+import pytest
+
+from database_module import Database
+from query_module import SORT_KEYS, STATEMENT_CACHE_SIZE, STATEMENTS, order_clause, statement
+
+
+def test_sort_keys_accept_both_spellings():
+    assert order_clause('employees', '-name') == 'name DESC'
+    assert order_clause('employees', 'name DESC') == 'name DESC'
+    assert order_clause('records', 'record_date asc') == 'r.record_date, r.id'
+    assert order_clause('patterns') == SORT_KEYS['patterns']['-create_date']
+
+
+@pytest.mark.parametrize('sort_key', [
+    'name; DROP TABLE employees',
+    'salary',
+    '(SELECT 1)',
+    'name DESC, id',
+])
+def test_unknown_sort_key_rejected(sort_key):
+    with pytest.raises(ValueError, match='不支持的排序方式'):
+        order_clause('employees', sort_key)
+
+
+def test_database_rejects_unknown_order_by(seeded):
+    db, _, _ = seeded
+
+    with pytest.raises(ValueError):
+        db.get_employees(order_by='name; DROP TABLE employees')
+    with pytest.raises(ValueError):
+        db.get_records(order_by='total')
+
+    # 表未受影响
+    assert [e['name'] for e in db.get_employees(order_by='name')] == ['张三', '李四']
+
+
+def test_api_rejects_unknown_order_by(seeded_api):
+    _, client, _, _ = seeded_api
+
+    for url in ('/api/employees', '/api/patterns', '/api/records'):
+        response = client.get(url, query_string={'order_by': 'name; DROP TABLE employees'})
+        assert response.status_code == 400
+        assert '不支持的排序方式' in response.get_json()['message']
+
+    response = client.get('/api/records', query_string={'order_by': 'record_date ASC'})
+    dates = [r['record_date'] for r in response.get_json()['data']]
+    assert dates == sorted(dates)
+
+
+def test_statement_text_is_fixed():
+    with pytest.raises(KeyError):
+        statement('select_everything')
+
+    # 不含占位符的语句原样返回
+    assert statement('delete_employee') == STATEMENTS['delete_employee']
+
+    # 全部筛选与排序组合的语句文本数量在连接的语句缓存之内
+    variants = {
+        statement(name, where, order)
+        for name in STATEMENTS
+        for where in ('1=1', 'r.employee_id = ?')
+        for order in SORT_KEYS['records'].values()
+    }
+    assert len(variants) < STATEMENT_CACHE_SIZE
+
+
+def test_single_connection_pool(tmp_path):
+    """桌面端以单连接的连接池打开数据库，启动和读写都不会等待自身"""
+    db = Database(str(tmp_path / 'desktop.db'), pool_size=1, pool_timeout=1.0)
+    try:
+        employee = db.add_employee('张三')['data']['id']
+        pattern = db.get_patterns(order_by='name')[0]['id']
+        assert db.add_record(employee, pattern, '2023-01-05', 10)['success']
+        assert len(db.get_records()) == 1
+        assert db.get_monthly_summary(2023, 1)['grand_total']['count'] == 10
+    finally:
+        db.close()
@@ -0,0 +1,41 @@
+"""流式读取工资记录和日汇总"""
+
+import json
+
+
+def test_iter_records_matches_list(seeded):
+    db, employees, _ = seeded
+    streamed = list(db.iter_records(employee_id=employees[0], batch_size=7))
+    listed = db.get_records(employee_id=employees[0])
+
+    assert [record['id'] for record in streamed] == [record['id'] for record in listed]
+    assert streamed == sorted(streamed, key=lambda r: (r['record_date'], r['id']), reverse=True)
+
+
+def test_iter_records_releases_connection(seeded):
+    db, _, _ = seeded
+    records = db.iter_records(batch_size=5)
+    next(records)
+    assert db.pool.stats()['idle'] < db.pool.stats()['size']
+
+    # 提前关闭生成器也会归还连接
+    records.close()
+    stats = db.pool.stats()
+    assert stats['idle'] == stats['size']
+
+
+def test_iter_daily_summary_matches_list(seeded):
+    db, _, _ = seeded
+    streamed = list(db.iter_daily_summary('2023-02-01', '2023-02-28', batch_size=3))
+    assert streamed == db.get_daily_summary('2023-02-01', '2023-02-28')
+
+
+def test_stream_endpoint_json_lines(seeded_api):
+    server, client, employee, _ = seeded_api
+    response = client.get(f'/api/records/stream?employee_id={employee}&start_date=2023-02-01'
+                          '&end_date=2023-02-28')
+
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+    assert len(lines) == 20
+    assert {line['record_date'][:7] for line in lines} == {'2023-02'}
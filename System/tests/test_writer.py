@@ -0,0 +1,116 @@
+"""WAL 存储参数与单写线程队列"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from pool_module import WriteQueue
+
+
+@pytest.fixture
+def writer(tmp_path):
+    """带一张表的写队列"""
+    write_queue = WriteQueue(str(tmp_path / 'writer.db'))
+    write_queue.submit(lambda conn: conn.execute(
+        "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)"))
+    yield write_queue
+    write_queue.close()
+
+
+def insert(conn, name):
+    """写操作：插入一行并提交"""
+    cursor = conn.execute("INSERT INTO items (name) VALUES (?)", (name,))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def count(conn):
+    """读取行数"""
+    return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+
+def test_storage_profile_applied(db):
+    conn = db.get_connection()
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    finally:
+        conn.close()
+
+
+def test_results_and_exceptions_cross_threads(writer):
+    assert writer.submit(insert, 'a') == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        writer.submit(insert, 'a')
+
+
+def test_concurrent_submits_are_serialized(writer):
+    errors = []
+
+    def worker(n):
+        for i in range(20):
+            try:
+                writer.submit(insert, f'{n}-{i}')
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert writer.submit(count) == 160
+
+
+def test_open_transaction_rolled_back_after_task(writer):
+    writer.submit(lambda conn: conn.execute("INSERT INTO items (name) VALUES ('lost')"))
+    assert writer.submit(count) == 0
+
+
+def test_nested_submit_rejected(writer):
+    with pytest.raises(RuntimeError):
+        writer.submit(lambda conn: writer.submit(count))
+
+
+def test_open_failure_raised_in_constructor(tmp_path):
+    with pytest.raises(sqlite3.OperationalError):
+        WriteQueue(str(tmp_path / 'missing' / 'writer.db'))
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_submit_fails_fast_after_writer_died(writer):
+    # 关闭写连接后，任务结束时的回滚检查抛出异常，写线程退出
+    writer.submit(lambda conn: conn.close())
+    writer._thread.join(5)
+    assert not writer._thread.is_alive()
+
+    with pytest.raises(sqlite3.OperationalError):
+        writer.submit(count)
+
+
+def test_closed_queue_refuses(writer):
+    writer.close()
+    with pytest.raises(sqlite3.OperationalError):
+        writer.submit(count)
+
+
+def test_database_writes_from_many_threads(db):
+    errors = []
+
+    def worker(n):
+        for i in range(5):
+            result = db.add_employee(f'员工{n}-{i}')
+            if not result['success']:
+                errors.append(result['message'])
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(db.get_employees()) == 40